@@ -3,6 +3,10 @@ ASGI config for configs project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Async views such as ``user/login/async/`` run directly on the event loop here;
+their password checks are offloaded to ``core.user.hashing.password_pool``,
+which is started eagerly so the first logins after a deploy do not pay for it.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -14,3 +18,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'configs.settings')
 
 application = get_asgi_application()
+
+from core.user.hashing import password_pool  # noqa: E402
+
+password_pool.start()
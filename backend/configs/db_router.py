@@ -0,0 +1,213 @@
+"""
+Database router.
+
+PrimaryReplicaRouter spreads reads of the core apps over the aliases listed
+in DATABASE_REPLICAS and keeps every write on the primary. Replicas are
+health-checked every DATABASE_REPLICA_HEALTH_INTERVAL seconds and skipped
+while unreachable or lagging more than DATABASE_REPLICA_MAX_LAG. To read its
+own writes, a request sticks to the primary once it has written (unsafe
+methods from the start), and so does its account for DATABASE_STICKY_SECONDS
+afterwards; the account marker lives in Django's cache, so it holds across
+workers only with a shared cache backend. The window must cover
+DATABASE_REPLICA_MAX_LAG, the lag a replica may have and still be read.
+Outside a request (management commands, background threads) reads stay on
+the primary, and in-process caches refill with .using(primary_alias()) so
+they never store a replica's stale rows.
+
+configs.settings_production lists its read-only 'read' alias on the same
+SQLite file as the only replica, so this one router serves both setups.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============== REQUEST STICKINESS ==============
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def primary_alias():
+    return getattr(settings, 'DATABASE_PRIMARY', 'default')
+
+
+def _max_lag():
+    return getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 30)
+
+
+def _sticky_seconds():
+    return getattr(settings, 'DATABASE_STICKY_SECONDS', _max_lag())
+
+
+class _RequestState:
+    __slots__ = ('pinned', 'wrote', 'account_id')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.account_id = None
+
+
+_request_state = contextvars.ContextVar('db_request_state', default=None)
+
+
+def _sticky_cache():
+    return caches[getattr(settings, 'DATABASE_STICKY_CACHE_ALIAS', 'default')]
+
+
+def _sticky_key(account_id):
+    return f"dbpin:{account_id}"
+
+
+def set_request_account(account_id):
+    """
+    Record the authenticated account of the current request, pinning the
+    request to the primary when that account wrote within the sticky window
+    """
+    state = _request_state.get()
+    if state is None:
+        return
+    state.account_id = account_id
+    if not state.pinned and _sticky_cache().get(_sticky_key(account_id)):
+        state.pinned = True
+
+
+class PrimaryStickinessMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(pinned=request.method not in SAFE_METHODS)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        sticky_seconds = _sticky_seconds()
+        if state.wrote and state.account_id is not None and sticky_seconds:
+            _sticky_cache().set(_sticky_key(state.account_id), True, sticky_seconds)
+        return response
+
+
+# ============== REPLICA SELECTION ==============
+# Replication delay in seconds, per database vendor; vendors without an
+# entry (e.g. SQLite stand-in copies) report no lag
+LAG_QUERIES = {
+    'postgresql': 'SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)',
+}
+
+
+class ReplicaPool:
+    def __init__(self, aliases, selection='round_robin', interval=10, max_lag=30):
+        if selection not in ('round_robin', 'least_lag'):
+            raise ValueError(f"Unknown replica selection {selection!r}")
+        self.aliases = list(aliases)
+        self.selection = selection
+        self.interval = interval
+        self.max_lag = max_lag
+        # {alias: (healthy, lag seconds, check latency seconds)}
+        self.status = {alias: (True, 0.0, 0.0) for alias in self.aliases}
+        self._checked_at = 0.0
+        self._check_lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def _probe(self, alias):
+        connection = connections[alias]
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                lag = 0.0
+                query = LAG_QUERIES.get(connection.vendor)
+                if query:
+                    cursor.execute(query)
+                    lag = float(cursor.fetchone()[0] or 0)
+        except Exception:
+            logger.warning('Replica %s failed its health check', alias, exc_info=True)
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return False, float('inf'), float('inf')
+        return lag <= self.max_lag, lag, time.perf_counter() - started
+
+    def check(self):
+        self.status = {alias: self._probe(alias) for alias in self.aliases}
+        self._checked_at = time.monotonic()
+
+    def _maybe_check(self):
+        if time.monotonic() - self._checked_at < self.interval:
+            return
+        # One thread refreshes; the others keep using the previous status
+        if self._check_lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._check_lock.release()
+
+    def choose(self):
+        """A healthy replica alias, or None when there is none"""
+        self._maybe_check()
+        healthy = [alias for alias in self.aliases if self.status[alias][0]]
+        if not healthy:
+            return None
+        if self.selection == 'least_lag':
+            return min(healthy, key=lambda alias: self.status[alias][1:])
+        return healthy[next(self._turn) % len(healthy)]
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads of ROUTED_APP_LABELS models go to a replica, writes to the primary.
+    Install PrimaryStickinessMiddleware alongside it.
+    """
+    ROUTED_APP_LABELS = {'user', 'data_model'}
+
+    def __init__(self):
+        self.primary = primary_alias()
+        self.pool = ReplicaPool(
+            getattr(settings, 'DATABASE_REPLICAS', []),
+            selection=getattr(settings, 'DATABASE_REPLICA_SELECTION', 'round_robin'),
+            interval=getattr(settings, 'DATABASE_REPLICA_HEALTH_INTERVAL', 10),
+            max_lag=_max_lag(),
+        )
+        if self.pool.aliases and _sticky_seconds() < self.pool.max_lag:
+            raise ImproperlyConfigured(
+                f"DATABASE_STICKY_SECONDS ({_sticky_seconds()}) is shorter than DATABASE_REPLICA_MAX_LAG "
+                f"({self.pool.max_lag}): an account could read a replica that has not caught up with its write."
+            )
+
+    def db_for_read(self, model, **hints):
+        if not self.pool.aliases or model._meta.app_label not in self.ROUTED_APP_LABELS:
+            return None
+        state = _request_state.get()
+        if state is None or state.pinned or connections[self.primary].in_atomic_block:
+            return self.primary
+        return self.pool.choose() or self.primary
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {self.primary, *self.pool.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema through replication
+        return db == self.primary
@@ -0,0 +1,374 @@
+"""
+Prometheus metrics.
+
+Counters and histograms live in an in-process registry; recording one is a
+lock, a dict lookup and an add. MetricsMiddleware times every request per
+route and the database time it spent, and ``metrics_view`` serves the
+registry at /metrics in the Prometheus text format (version 0.0.4).
+
+With several worker processes set METRICS_DIR to a directory shared by them:
+each process then writes a snapshot of its registry there at most every
+METRICS_FLUSH_INTERVAL seconds (and on exit), and /metrics adds up the
+snapshots of all processes, so whichever worker answers the scrape reports
+the totals. Snapshots of exited workers are kept so counters never go
+backwards; empty the directory when the service is redeployed. Without
+METRICS_DIR only the answering process is reported.
+
+Outside DEBUG /metrics answers only scrapers that send METRICS_TOKEN or
+connect from an address in METRICS_ALLOWED_IPS; with neither configured it
+refuses every scrape.
+"""
+import atexit
+import glob
+import ipaddress
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from asyncio import iscoroutinefunction
+from bisect import bisect_left
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .profiling import record_queries
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def describe(self):
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        samples = self.registry.samples[self.name]
+        with self.registry.lock:
+            samples[key] = samples.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # One count per bucket (non-cumulative) plus +Inf, then sum
+        position = bisect_left(self.buckets, value)
+        samples = self.registry.samples[self.name]
+        with self.registry.lock:
+            sample = samples.get(key)
+            if sample is None:
+                sample = samples[key] = [0] * (len(self.buckets) + 2)
+            sample[position] += 1
+            sample[-1] += value
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+# ============== REGISTRY ==============
+class Registry:
+    def __init__(self, directory=None, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._path = None
+        self._next_flush = 0.0
+
+    def _register(self, cls, name, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(self, name, *args)
+                self.samples[name] = {}
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def snapshot(self):
+        """{name: description with 'samples': [[label values, value], ...]} of this process"""
+        with self.lock:
+            copies = {
+                name: [[list(key), list(value) if isinstance(value, list) else value]
+                       for key, value in samples.items()]
+                for name, samples in self.samples.items()
+            }
+        return {name: {**metric.describe(), 'samples': copies[name]} for name, metric in self.metrics.items()}
+
+    def reset(self):
+        # Also runs in a freshly forked child, where a lock held by another
+        # thread of the parent would never be released: replace, don't acquire
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.samples = {name: {} for name in self.metrics}
+        self._path = None
+        self._next_flush = 0.0
+
+    # ============== MULTI-PROCESS ==============
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR"""
+        if not self.directory or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if self._path is None:
+                os.makedirs(self.directory, exist_ok=True)
+                # Unique per process lifetime, so a recycled pid never overwrites older totals
+                self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex}.json")
+            handle, temp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            with os.fdopen(handle, 'w') as out:
+                json.dump(self.snapshot(), out)
+            os.replace(temp, self._path)
+            self._next_flush = time.monotonic() + self.flush_interval
+        finally:
+            self._flush_lock.release()
+
+    def maybe_flush(self):
+        if self.directory and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def collect(self):
+        """Snapshot merged over every process writing to METRICS_DIR"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, {**metric, 'samples': {}})
+                if target.get('buckets') != metric.get('buckets'):
+                    continue
+                for labels, value in metric['samples']:
+                    key = tuple(labels)
+                    current = target['samples'].get(key)
+                    if current is None:
+                        target['samples'][key] = value
+                    elif isinstance(value, list):
+                        target['samples'][key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = current + value
+        for metric in merged.values():
+            metric['samples'] = [[list(key), value] for key, value in metric['samples'].items()]
+        return merged
+
+
+# ============== EXPOSITION ==============
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def render(snapshot):
+    """Prometheus text exposition of a snapshot"""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        names = metric['labelnames']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for values, value in sorted(metric['samples']):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric['buckets']) + [math.inf], value[:-1]):
+                cumulative += count
+                bucket = _labels(names, values, 'le="%s"' % _number(bound))
+                lines.append(f"{name}_bucket{bucket} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, values)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(names, values)} {_number(cumulative)}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry(
+    directory=getattr(settings, 'METRICS_DIR', None),
+    flush_interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', 5),
+)
+counter = registry.counter
+histogram = registry.histogram
+
+# A forked child starts from zero; the parent keeps reporting what it recorded
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset)
+atexit.register(registry.flush)
+
+
+# ============== HTTP / DATABASE ==============
+REQUESTS = counter('wms_http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+REQUEST_SECONDS = histogram(
+    'wms_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'),
+    buckets=getattr(settings, 'METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS),
+)
+REQUEST_DB_SECONDS = histogram(
+    'wms_http_request_db_seconds', 'Time a request spent in database queries, by route', ('method', 'route'),
+    buckets=getattr(settings, 'METRICS_LATENCY_BUCKETS', DEFAULT_BUCKETS),
+)
+DB_QUERIES = counter('wms_db_queries_total', 'Database queries run while serving requests', ('alias',))
+DB_SECONDS = counter('wms_db_query_seconds_total', 'Time spent in database queries while serving requests', ('alias',))
+CACHE_LOOKUPS = counter('wms_cache_lookups_total', 'Cache lookups by cache and result (hit / miss)', ('cache', 'result'))
+
+# ============== AUTH ==============
+LOGINS = counter('wms_logins_total', 'Login attempts by outcome', ('outcome',))
+PASSWORD_HASH_SECONDS = histogram(
+    'wms_password_hash_seconds', 'Time to verify a password hash',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5),
+)
+TOKEN_REFRESHES = counter('wms_token_refreshes_total', 'Token refresh requests by outcome', ('outcome',))
+TOKENS_BLACKLISTED = counter('wms_tokens_blacklisted_total', 'Refresh tokens added to the blacklist')
+BLACKLIST_REJECTIONS = counter('wms_blacklist_rejections_total', 'Tokens rejected because they are blacklisted')
+
+LOGIN_OUTCOMES = {
+    200: 'success', 400: 'invalid_input', 401: 'invalid_credentials',
+    403: 'inactive', 404: 'no_profile', 503: 'busy',
+}
+REFRESH_OUTCOMES = {200: 'success', 400: 'invalid_input', 401: 'invalid_token'}
+
+
+def count_outcomes(metric, outcomes, default='error'):
+    """Count each response of a (sync or async) view on ``metric`` by its status code"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                metric.inc(outcome=outcomes.get(response.status_code, default))
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            metric.inc(outcome=outcomes.get(response.status_code, default))
+            return response
+        return wrapper
+    return decorator
+
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class _DbTimer:
+    """Query count and time of one request, per database alias"""
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = {}
+        self.duration = {}
+
+    def record(self, sql, params, many, connection, duration):
+        alias = connection.alias
+        self.count[alias] = self.count.get(alias, 0) + 1
+        self.duration[alias] = self.duration.get(alias, 0.0) + duration
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = _DbTimer()
+        started = time.perf_counter()
+        with record_queries(timer):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        # The route pattern, not the path, keeps label cardinality bounded
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None and match.route else UNMATCHED_ROUTE
+        REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+        REQUEST_DB_SECONDS.observe(sum(timer.duration.values()), method=request.method, route=route)
+        for alias, count in timer.count.items():
+            DB_QUERIES.inc(count, alias=alias)
+            DB_SECONDS.inc(timer.duration[alias], alias=alias)
+        registry.maybe_flush()
+        return response
+
+
+def _address_allowed(address, allowed):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    for entry in allowed:
+        try:
+            if address in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. The scraper sends
+    ``Authorization: Bearer <METRICS_TOKEN>`` or connects from
+    METRICS_ALLOWED_IPS; in DEBUG with neither set anyone may scrape.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if token and request.headers.get('Authorization') == f"Bearer {token}":
+        pass
+    elif allowed and _address_allowed(request.META.get('REMOTE_ADDR', ''), allowed):
+        pass
+    elif token:
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    elif allowed or not settings.DEBUG:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,160 @@
+"""
+Per-request database query profiling.
+
+record_queries() hooks every database connection with one
+connection.execute_wrapper() per request: each query is timed once and handed
+to every listener registered for the request, which are the profile below,
+the request metrics (configs.metrics) and the slow-query log
+(configs.slow_queries). Queries a listener runs itself, such as an EXPLAIN,
+are not recorded.
+
+QueryProfilingMiddleware listens on a sample of requests
+(QUERY_PROFILE_SAMPLE_RATE) and records the query count, the time spent in
+the database and how often each SQL shape ran. Results go out as a
+Server-Timing header and one JSON line at DEBUG on the ``wms.queries``
+logger. A request repeating a shape at least QUERY_PROFILE_N_PLUS_ONE_THRESHOLD
+times (the per-row lookup of an N+1) is logged as a warning instead.
+"""
+import contextvars
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('wms.queries')
+
+# "IN (%s, %s, %s)" and "VALUES (%s, %s), (%s, %s)" vary with the batch size
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_VALUES_LIST = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """SQL shape with literals and placeholder lists collapsed"""
+    sql = _LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _VALUES_LIST.sub(r'\1', sql)
+
+
+# ============== QUERY RECORDING ==============
+class QueryRecorder:
+    """
+    Execute wrapper that times each query and calls
+    ``listener.record(sql, params, many, connection, duration)`` on every
+    listener
+    """
+
+    def __init__(self):
+        self.listeners = []
+        self._recording = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._recording:
+            # A listener's own query
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self._recording = True
+            try:
+                for listener in self.listeners:
+                    listener.record(sql, params, many, context['connection'], duration)
+            finally:
+                self._recording = False
+
+
+_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+@contextmanager
+def record_queries(listener):
+    """
+    Feed ``listener`` every query run inside the block. Nested blocks share
+    the wrapper installed by the outermost one, so a query is timed once.
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.listeners.append(listener)
+        try:
+            yield
+        finally:
+            recorder.listeners.remove(listener)
+        return
+
+    recorder = QueryRecorder()
+    recorder.listeners.append(listener)
+    token = _recorder.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield
+    finally:
+        _recorder.reset(token)
+
+
+# ============== PROFILING ==============
+class QueryProfile:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, sql, params, many, connection, duration):
+        self.duration += duration
+        self.count += 1
+        self.shapes[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        """[(shape, count)] of shapes run at least ``threshold`` times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_PROFILE_ENABLED', True)
+        self.sample_rate = getattr(settings, 'QUERY_PROFILE_SAMPLE_RATE', 1.0)
+        self.threshold = getattr(settings, 'QUERY_PROFILE_N_PLUS_ONE_THRESHOLD', 10)
+
+    def __call__(self, request):
+        if not self.enabled or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = QueryProfile()
+        started = time.perf_counter()
+        with record_queries(profile):
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        response.headers['Server-Timing'] = ', '.join(filter(None, [
+            response.headers.get('Server-Timing'),
+            f'db;dur={profile.duration * 1000:.1f};desc="{profile.count} queries"',
+            f'app;dur={(total - profile.duration) * 1000:.1f}',
+        ]))
+        self._log(request, response, profile, total)
+        return response
+
+    def _log(self, request, response, profile, total):
+        repeated = profile.repeated(self.threshold)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.count,
+            'db_ms': round(profile.duration * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'duplicates': sum(count - 1 for count in profile.shapes.values()),
+            'n_plus_one': [{'sql': shape, 'count': count} for shape, count in repeated],
+        }
+        level = logging.WARNING if repeated else logging.DEBUG
+        logger.log(level, json.dumps(record))
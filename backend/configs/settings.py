@@ -46,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'configs.metrics.MetricsMiddleware',
+    'configs.profiling.QueryProfilingMiddleware',
+    'configs.slow_queries.SlowQueryMiddleware',
+    'configs.db_router.PrimaryStickinessMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -86,6 +90,24 @@ DATABASES = {
     }
 }
 
+# Reads of the core apps go to DATABASE_REPLICAS when any are listed. A local
+# stand-in replica is another alias on a copy of the file, refreshed with
+# `manage.py sync_replicas`, e.g.
+#     DATABASES['replica1'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': BASE_DIR / 'db.replica1.sqlite3',
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica1']
+DATABASE_ROUTERS = ['configs.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_SELECTION = 'round_robin'  # or 'least_lag'
+DATABASE_REPLICA_HEALTH_INTERVAL = 10  # seconds between replica health checks
+DATABASE_REPLICA_MAX_LAG = 30  # seconds; replicas lagging more are skipped
+# Reads stay on the primary this long after an account writes; shorter than
+# the lag a replica may have, it would let the account read stale rows
+DATABASE_STICKY_SECONDS = DATABASE_REPLICA_MAX_LAG
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -150,13 +172,18 @@ CORS_ALLOW_ALL_ORIGINS = True
 # REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.user.authentication.UserAccountJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.user.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.user.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -186,3 +213,109 @@ SIMPLE_JWT = {
     
     'JTI_CLAIM': 'jti',
 }
+
+
+# Account cache used by UserAccountJWTAuthentication (core.user.authentication)
+ACCOUNT_CACHE_SIZE = 4096
+ACCOUNT_CACHE_TTL = 300  # seconds
+
+# Seconds between pulls of new rows into the in-process token blacklist (core.user.blacklist)
+BLACKLIST_SYNC_INTERVAL = 5
+BLACKLIST_SYNC_OVERLAP = 60  # seconds each pull reaches back, for transactions that commit late
+BLACKLIST_FULL_SYNC_INTERVAL = 300  # seconds between full reloads
+
+# Write-behind of account_last_login on login (core.user.last_login)
+LAST_LOGIN_FLUSH_INTERVAL = 5  # seconds
+LAST_LOGIN_FLUSH_SIZE = 500
+
+# Password hashing pool used by the async login (core.user.hashing)
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_QUEUE = 64
+
+# Threads hashing passwords during bulk imports (core.user.bulk); None = CPU count
+BULK_IMPORT_HASH_WORKERS = None
+
+# Permission resolver (core.data_model.resolver)
+PERMISSION_CACHE_TTL = 300  # seconds
+
+# Pack roles, page permissions and branches into access tokens (core.user.claims)
+JWT_EMBED_PERMISSION_CLAIMS = False
+
+# App whose 'users' / 'accounts' pages guard the user, account and access-control
+# endpoints, and the role granted them by migration (core.user.permissions)
+MANAGER_APP_CODE = 'manager'
+MANAGER_ROLE_CODE = 'ADMIN'
+
+# Branch scoping of machine / line queries (core.data_model.scoping)
+BRANCH_SCOPE_CACHE_TTL = 300  # seconds
+BRANCH_SCOPE_UNRESTRICTED_ROLES = []  # role codes that see every branch
+
+# Render list endpoints from values_list() rows instead of DRF field objects (core.user.fast_serializers)
+FAST_LIST_SERIALIZERS = True
+
+# Encode / decode REST payloads with orjson when it is installed (core.user.renderers)
+FAST_JSON = True
+
+# Rendered reference lists (statuses, roles, permissions, apps, pages) keyed by
+# collection version (core.data_model.versions); any shared backend works too
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+REFERENCE_CACHE_ALIAS = 'default'
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24  # seconds; stale versions simply age out
+
+# Per-request query profiling (configs.profiling): Server-Timing header plus a
+# JSON line on the 'wms.queries' logger, sampled at QUERY_PROFILE_SAMPLE_RATE
+QUERY_PROFILE_ENABLED = True
+QUERY_PROFILE_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+QUERY_PROFILE_N_PLUS_ONE_THRESHOLD = 10  # repeats of one SQL shape flagged as N+1
+
+# Prometheus metrics served at /metrics (configs.metrics). With several worker
+# processes point METRICS_DIR at a directory they share (emptied on deploy)
+# so a scrape reports all of them.
+METRICS_ENABLED = True
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5  # seconds between snapshots written to METRICS_DIR
+# Outside DEBUG a scrape needs the token or an address in the allow-list
+METRICS_TOKEN = None  # when set, scrapers may send "Authorization: Bearer <token>"
+METRICS_ALLOWED_IPS = []  # addresses or networks, e.g. ['10.0.0.0/8']
+
+# Slow-query log (configs.slow_queries): queries over the threshold are written
+# with their plan to one file per process beside SLOW_QUERY_LOG_FILE
+# (slow_queries.<pid>.log); summarise them with `manage.py slow_queries`
+SLOW_QUERY_ENABLED = True
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_LOG_PARAMS = False  # parameters hold password hashes and emails; enable only to debug locally
+SLOW_QUERY_STACK_DEPTH = 8
+SLOW_QUERY_LOG_FILE = BASE_DIR / 'logs' / 'slow_queries.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_queries': {
+            'class': 'configs.slow_queries.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'wms': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'wms.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
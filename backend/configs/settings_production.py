@@ -0,0 +1,25 @@
+"""
+Production profile: DJANGO_SETTINGS_MODULE=configs.settings_production
+
+Runs SQLite in WAL mode with tuned pragmas (see configs.sqlite) and sends
+reads through a separate read-only connection, so a write such as a login's
+last-login update no longer blocks readers.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+from .sqlite import sqlite_databases
+
+DATABASES = sqlite_databases(BASE_DIR / 'db.sqlite3')
+
+# The read-only connection is routed as a replica (configs.db_router). It
+# reads the primary's own file, so it never lags and sees every commit at once
+DATABASE_ROUTERS = ['configs.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICAS = ['read']
+DATABASE_REPLICA_MAX_LAG = 0
+DATABASE_STICKY_SECONDS = 0
+
+# Profile a sample of requests only
+QUERY_PROFILE_SAMPLE_RATE = 0.05
+
+# Workers share their metrics through this directory; empty it on deploy
+METRICS_DIR = BASE_DIR / 'run' / 'metrics'
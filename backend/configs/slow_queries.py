@@ -0,0 +1,199 @@
+"""
+Slow-query log.
+
+SlowQueryMiddleware listens to every query of every request
+(configs.profiling.record_queries). A query that takes
+at least SLOW_QUERY_THRESHOLD_MS is written as one JSON line on the
+``wms.slow_queries`` logger, which settings route to a rotating file per
+process beside SLOW_QUERY_LOG_FILE (slow_queries.<pid>.log), so no two
+workers write or rotate the same file. A record holds:
+
+- the SQL, a fingerprint of its normalized shape and, with
+  SLOW_QUERY_LOG_PARAMS, its parameters; they are left out by default since
+  they carry password hashes, emails and other personal data
+- the duration and database alias
+- the view that ran it, and the project frames of the call stack
+- for SELECTs, the plan the database chose (EXPLAIN QUERY PLAN on SQLite,
+  EXPLAIN elsewhere)
+
+``manage.py slow_queries`` aggregates the logs of all processes by fingerprint.
+"""
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import time
+import traceback
+
+from django.conf import settings
+
+from .profiling import normalize_sql, record_queries
+
+
+logger = logging.getLogger('wms.slow_queries')
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+MAX_PARAM_LENGTH = 200
+
+
+def fingerprint(sql):
+    """Short stable id of the normalized SQL shape"""
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:16]
+
+
+_CONFIGS_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+def _stack_summary(depth):
+    """
+    The innermost ``depth`` frames of project code, outermost first; the
+    middleware and execute wrappers in configs are left out
+    """
+    root = str(settings.BASE_DIR)
+    frames = [
+        f"{os.path.relpath(frame.filename, root)}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root) and 'site-packages' not in frame.filename
+        and not frame.filename.startswith(_CONFIGS_DIR)
+    ]
+    return frames[-depth:]
+
+
+def _params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _params([value])[0] for key, value in params.items()}
+    return [value if isinstance(value, (int, float, bool, type(None))) else str(value)[:MAX_PARAM_LENGTH]
+            for value in params]
+
+
+class SlowQueryLogger:
+    def __init__(self, request, threshold, explain=True, log_params=False, stack_depth=8):
+        self.request = request
+        self.threshold = threshold
+        self.explain = explain
+        self.log_params = log_params
+        self.stack_depth = stack_depth
+
+    def record(self, sql, params, many, connection, duration):
+        if duration >= self.threshold:
+            self._log(sql, params, many, connection, duration)
+
+    def _plan(self, sql, params, connection):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+        if prefix is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        # Run from inside the recorder, which lets this query pass unrecorded
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        if connection.vendor == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [' '.join(str(value) for value in row) for row in rows]
+
+    def _log(self, sql, params, many, connection, duration):
+        match = getattr(self.request, 'resolver_match', None)
+        record = {
+            'at': time.time(),
+            'fingerprint': fingerprint(sql),
+            'duration_ms': round(duration * 1000, 2),
+            'alias': connection.alias,
+            'method': self.request.method,
+            'path': self.request.path,
+            'view': match.view_name if match is not None else None,
+            'sql': sql,
+            'params': _params(params) if self.log_params and not many else None,
+            'many': many,
+            'stack': _stack_summary(self.stack_depth),
+            'plan': self._plan(sql, params, connection) if self.explain and not many else None,
+        }
+        logger.warning(json.dumps(record, default=str))
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SLOW_QUERY_ENABLED', True)
+        self.threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+        self.explain = getattr(settings, 'SLOW_QUERY_EXPLAIN', True)
+        self.log_params = getattr(settings, 'SLOW_QUERY_LOG_PARAMS', False)
+        self.stack_depth = getattr(settings, 'SLOW_QUERY_STACK_DEPTH', 8)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        slow_log = SlowQueryLogger(request, self.threshold, self.explain, self.log_params, self.stack_depth)
+        with record_queries(slow_log):
+            return self.get_response(request)
+
+
+def process_log_path(path, pid):
+    """slow_queries.log -> slow_queries.<pid>.log"""
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.{pid}{ext}"
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler writing to the file of the current process (see
+    process_log_path). The name is picked on the first write of each process,
+    so workers forked after logging is configured get their own; the file is
+    always opened lazily and its directory created then.
+    """
+
+    def __init__(self, filename, mode='a', maxBytes=0, backupCount=0, encoding=None, delay=True, errors=None):
+        self.log_path = os.path.abspath(filename)
+        self._pid = None
+        super().__init__(filename, mode, maxBytes, backupCount, encoding, delay=True, errors=errors)
+
+    def emit(self, record):
+        pid = os.getpid()
+        if pid != self._pid:
+            if self.stream is not None:
+                # Inherited from the parent process
+                self.stream.close()
+                self.stream = None
+            self._pid = pid
+            self.baseFilename = process_log_path(self.log_path, pid)
+        super().emit(record)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def log_files(path):
+    """The per-process logs of ``path`` with their rotated backups, oldest first"""
+    root, ext = os.path.splitext(str(path))
+    own = re.compile(re.escape(root) + r'(\.\d+)?' + re.escape(ext) + r'(\.\d+)?')
+    names = [name for name in glob.glob(glob.escape(root) + '*') if own.fullmatch(name)]
+    return sorted(names, key=lambda name: (os.path.getmtime(name), name))
+
+
+def read_log(path):
+    """Records of every process's slow-query log and rotated backups, oldest file first"""
+    for name in log_files(path):
+        try:
+            handle = open(name)
+        except OSError:
+            # Rotated away since it was listed
+            continue
+        with handle:
+            for line in handle:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
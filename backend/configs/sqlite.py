@@ -0,0 +1,55 @@
+"""
+SQLite connection tuning shared by configs.settings_production and the
+bench_sqlite command.
+
+Every PRAGMA here is per connection except journal_mode, which WAL makes
+persistent in the database file; Django runs them through OPTIONS
+['init_command'] each time it opens a connection.
+"""
+
+# Writer: WAL lets readers proceed while a write is in progress, and
+# synchronous=NORMAL is durable across application crashes in WAL mode
+WRITER_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms to wait on a lock before "database is locked"
+    'cache_size': -64000,  # negative = KiB, i.e. 64 MB page cache
+    'mmap_size': 268435456,  # 256 MB of the file memory-mapped
+    'temp_store': 'MEMORY',
+}
+
+# Reader: same tuning, but refuses writes at the SQLite level
+READER_PRAGMAS = {
+    **{name: value for name, value in WRITER_PRAGMAS.items() if name != 'journal_mode'},
+    'query_only': 'ON',
+}
+
+
+def init_command(pragmas):
+    return '; '.join(f"PRAGMA {name}={value}" for name, value in pragmas.items())
+
+
+def sqlite_databases(path):
+    """DATABASES with a tuned read-write 'default' and a read-only 'read' alias on the same file"""
+    return {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': {
+                'init_command': init_command(WRITER_PRAGMAS),
+                # Take the write lock at BEGIN so concurrent writers queue on
+                # busy_timeout instead of failing when upgrading a read lock
+                'transaction_mode': 'IMMEDIATE',
+            },
+        },
+        'read': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': {
+                'init_command': init_command(READER_PRAGMAS),
+            },
+            'TEST': {
+                'MIRROR': 'default',
+            },
+        },
+    }
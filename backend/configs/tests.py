@@ -0,0 +1,348 @@
+import json
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from core.data_model import resolver, scoping
+from core.data_model.models import DmBranch, DmFactory, DmMappingAccountBranch, DmRoles
+from core.user.authentication import get_cached_account
+from core.user.models import UserAccounts
+from . import metrics
+from .db_router import PrimaryReplicaRouter, PrimaryStickinessMiddleware, set_request_account
+from .profiling import QueryProfile, QueryProfilingMiddleware, record_queries
+from .slow_queries import RotatingFileHandler, SlowQueryLogger, SlowQueryMiddleware, read_log
+
+
+# ============== METRICS ==============
+class RegistryTests(SimpleTestCase):
+    def make_registry(self, directory=None):
+        registry = metrics.Registry(directory=directory)
+        requests = registry.counter('requests_total', 'Requests', ('route',))
+        latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        return registry, requests, latency
+
+    def test_collect_adds_up_every_process_snapshot(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        first, first_requests, first_latency = self.make_registry(directory)
+        second, second_requests, second_latency = self.make_registry(directory)
+        first_requests.inc(route='a')
+        first_requests.inc(2, route='b')
+        second_requests.inc(3, route='a')
+        first_latency.observe(0.05, route='a')
+        second_latency.observe(5, route='a')
+        second.flush()
+
+        collected = first.collect()
+        self.assertEqual(len(os.listdir(directory)), 2)
+        self.assertEqual(sorted(collected['requests_total']['samples']), [[['a'], 4], [['b'], 2]])
+        self.assertEqual(collected['latency_seconds']['samples'], [[['a'], [1, 0, 1, 5.05]]])
+
+    def test_bucket_bounds_are_inclusive_and_cumulative(self):
+        registry, _, latency = self.make_registry()
+        for value in (0.1, 0.5, 1.0, 2.0):
+            latency.observe(value, route='a')
+        lines = metrics.render(registry.snapshot()).splitlines()
+        self.assertIn('latency_seconds_bucket{route="a",le="0.1"} 1.0', lines)
+        self.assertIn('latency_seconds_bucket{route="a",le="1.0"} 3.0', lines)
+        self.assertIn('latency_seconds_bucket{route="a",le="+Inf"} 4.0', lines)
+        self.assertIn('latency_seconds_count{route="a"} 4.0', lines)
+        self.assertIn('latency_seconds_sum{route="a"} 3.6', lines)
+
+    def test_label_values_are_escaped(self):
+        registry, requests, _ = self.make_registry()
+        requests.inc(route='say "hi"\\now\nplease')
+        self.assertIn(
+            'requests_total{route="say \\"hi\\"\\\\now\\nplease"} 1.0',
+            metrics.render(registry.snapshot()).splitlines(),
+        )
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_forked_child_starts_from_zero_with_free_locks(self):
+        metrics.TOKENS_BLACKLISTED.inc()
+        # Held by the parent across the fork, as another thread could be
+        with metrics.registry.lock:
+            pid = os.fork()
+            if pid == 0:
+                ok = False
+                try:
+                    registry = metrics.registry
+                    ok = (
+                        registry.lock.acquire(timeout=1)
+                        and not any(registry.samples.values())
+                        and registry._path is None
+                    )
+                finally:
+                    os._exit(0 if ok else 1)
+        deadline = time.monotonic() + 5
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                self.fail('The forked child deadlocked on a lock held by the parent')
+            time.sleep(0.01)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertTrue(metrics.registry.samples[metrics.TOKENS_BLACKLISTED.name])
+
+
+@override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=[])
+class MetricsAccessTests(SimpleTestCase):
+    def scrape(self, **headers):
+        return self.client.get('/metrics', **headers)
+
+    def test_refused_outside_debug_without_token_or_allow_list(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+    @override_settings(DEBUG=True)
+    def test_open_in_debug_without_token_or_allow_list(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE wms_http_requests_total counter', response.content.decode())
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8', '127.0.0.1'])
+    def test_allow_list(self):
+        self.assertEqual(self.scrape().status_code, 200)
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.scrape(REMOTE_ADDR='192.168.0.1').status_code, 403)
+
+
+# ============== QUERY RECORDING ==============
+@override_settings(QUERY_PROFILE_SAMPLE_RATE=1.0, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=True)
+class QueryRecordingTests(TestCase):
+    def test_nested_listeners_share_one_wrapper(self):
+        outer, inner = QueryProfile(), QueryProfile()
+        with record_queries(outer):
+            with record_queries(inner):
+                self.assertEqual(len(connection.execute_wrappers), 1)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 2')
+        self.assertEqual(connection.execute_wrappers, [])
+        self.assertEqual((outer.count, inner.count), (2, 1))
+
+    def test_explain_is_left_out_of_the_profile_and_metrics(self):
+        queries = metrics.DB_QUERIES.registry.samples[metrics.DB_QUERIES.name]
+        before = queries.get(('default',), 0)
+        with self.assertLogs('wms.queries', 'DEBUG') as profiled, \
+                self.assertLogs('wms.slow_queries', 'WARNING') as slow:
+            response = self.client.post(
+                '/user/login/', {'account_id': 'nobody', 'password': 'x'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 401)
+
+        slow_records = [json.loads(record.getMessage()) for record in slow.records]
+        self.assertEqual(len(slow_records), 1)
+        self.assertTrue(slow_records[0]['plan'])
+        self.assertEqual(json.loads(profiled.records[-1].getMessage())['queries'], 1)
+        self.assertEqual(queries.get(('default',), 0) - before, 1)
+        self.assertIn('queries"', response['Server-Timing'])
+
+
+@override_settings(QUERY_PROFILE_SAMPLE_RATE=1.0, QUERY_PROFILE_N_PLUS_ONE_THRESHOLD=3)
+class QueryProfilingMiddlewareTests(TestCase):
+    def get(self, repeats):
+        def view(request):
+            with connection.cursor() as cursor:
+                for value in range(repeats):
+                    cursor.execute('SELECT %s', [value])
+            response = HttpResponse()
+            response.headers['Server-Timing'] = 'view;dur=1.0'
+            return response
+        return QueryProfilingMiddleware(view)(RequestFactory().get('/profiled/'))
+
+    def test_server_timing_and_quiet_log(self):
+        with self.assertLogs('wms.queries', 'DEBUG') as logs:
+            response = self.get(2)
+        timings = response['Server-Timing'].split(', ')
+        self.assertEqual(timings[0], 'view;dur=1.0')
+        self.assertRegex(timings[1], r'^db;dur=\d+\.\d;desc="2 queries"$')
+        self.assertRegex(timings[2], r'^app;dur=\d+\.\d$')
+        self.assertEqual(logs.records[0].levelno, logging.DEBUG)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['queries'], record['duplicates'], record['n_plus_one']), (2, 1, []))
+
+    def test_shape_repeated_up_to_the_threshold_is_a_warning(self):
+        with self.assertLogs('wms.queries', 'WARNING') as logs:
+            self.get(3)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['n_plus_one'], [{'sql': 'SELECT %s', 'count': 3}])
+
+
+# ============== SLOW QUERIES ==============
+class SlowQueryLoggerTests(TestCase):
+    def log(self, sql, params, **options):
+        slow_log = SlowQueryLogger(RequestFactory().get('/'), threshold=0, **options)
+        with self.assertLogs('wms.slow_queries', 'WARNING') as logs:
+            with record_queries(slow_log):
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+        return json.loads(logs.records[0].getMessage())
+
+    def test_with_query_is_explained(self):
+        record = self.log('  with picked as (select %s as code) select code from picked', ['A'])
+        self.assertTrue(record['plan'])
+        self.assertNotIn('EXPLAIN failed', record['plan'][0])
+
+    def test_string_params_are_logged_as_is(self):
+        record = self.log('SELECT %s, %s, %s', ["it's", 7, None], log_params=True)
+        self.assertEqual(record['params'], ["it's", 7, None])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_params_are_left_out_by_default(self):
+        def view(request):
+            UserAccounts.objects.create(user_id='U-slow', account_id='slow', account_password='pbkdf2_sha256$secret')
+            return HttpResponse()
+
+        with self.assertLogs('wms.slow_queries', 'WARNING') as logs:
+            SlowQueryMiddleware(view)(RequestFactory().post('/'))
+        for record in logs.records:
+            self.assertIsNone(json.loads(record.getMessage())['params'])
+            self.assertNotIn('secret', record.getMessage())
+
+
+def _slow_record(fingerprint, duration_ms, at, view='v', plan=None):
+    return {
+        'at': at, 'fingerprint': fingerprint, 'duration_ms': duration_ms, 'view': view,
+        'sql': f"SELECT {fingerprint}", 'plan': plan, 'stack': [], 'params': None,
+    }
+
+
+class SlowQueryLogFilesTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'slow_queries.log')
+
+    def write(self, name, records, mtime):
+        path = os.path.join(os.path.dirname(self.path), name)
+        with open(path, 'w') as handle:
+            for record in records:
+                handle.write(json.dumps(record) + '\n')
+            handle.write('not json\n')
+        os.utime(path, (mtime, mtime))
+
+    def test_each_process_writes_its_own_file(self):
+        handler = RotatingFileHandler(self.path, maxBytes=1024, backupCount=2)
+        self.addCleanup(handler.close)
+        record = logging.makeLogRecord({'msg': json.dumps(_slow_record('a', 1, 1))})
+        handler.emit(record)
+        with mock.patch.object(os, 'getpid', return_value=4242):
+            # As in a worker forked after logging was configured
+            handler.emit(record)
+        names = sorted(os.listdir(os.path.dirname(self.path)))
+        self.assertEqual(names, sorted([f"slow_queries.{os.getpid()}.log", 'slow_queries.4242.log']))
+        self.assertEqual(len(list(read_log(self.path))), 2)
+
+    def test_read_log_reads_every_process_and_backup_oldest_first(self):
+        self.write('slow_queries.100.log.1', [_slow_record('a', 1, 1)], mtime=1000)
+        self.write('slow_queries.100.log', [_slow_record('a', 2, 3)], mtime=3000)
+        self.write('slow_queries.200.log', [_slow_record('b', 3, 2)], mtime=2000)
+        self.write('slow_queries.log', [_slow_record('c', 4, 0)], mtime=500)
+        self.write('other.log', [_slow_record('x', 5, 0)], mtime=500)
+        self.assertEqual([record['duration_ms'] for record in read_log(self.path)], [4, 1, 3, 2])
+
+    def test_command_groups_by_fingerprint(self):
+        self.write('slow_queries.100.log', [
+            _slow_record('a', 10, 1, view='users', plan=['old plan']),
+            _slow_record('b', 50, 2),
+        ], mtime=1000)
+        self.write('slow_queries.200.log', [
+            _slow_record('a', 30, 3, view='accounts', plan=['new plan']),
+            _slow_record('a', 20, 4, view='users', plan=['newest plan']),
+        ], mtime=2000)
+        out = StringIO()
+        call_command('slow_queries', file=self.path, json=True, stdout=out)
+        entries = {entry['fingerprint']: entry for entry in json.loads(out.getvalue())}
+
+        self.assertEqual(list(entries), ['a', 'b'])
+        self.assertEqual(
+            {key: entries['a'][key] for key in ('count', 'total_ms', 'max_ms', 'mean_ms', 'views', 'plan')},
+            {'count': 3, 'total_ms': 60.0, 'max_ms': 30, 'mean_ms': 20.0,
+             'views': {'users': 2, 'accounts': 1}, 'plan': ['newest plan']},
+        )
+        out = StringIO()
+        call_command('slow_queries', file=self.path, json=True, sort='max', view='users', stdout=out)
+        self.assertEqual([entry['fingerprint'] for entry in json.loads(out.getvalue())], ['a'])
+
+
+# ============== DATABASE ROUTING ==============
+class UnreachableReplicaRouter:
+    """Sends every read to an alias that does not exist"""
+
+    def db_for_read(self, model, **hints):
+        return 'no-such-replica'
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_REPLICA_MAX_LAG=30, DATABASE_STICKY_SECONDS=30)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.router = PrimaryReplicaRouter()
+        self.router.pool.choose = lambda: 'replica'
+
+    def read_in_request(self, method, account_id, write=False):
+        """The alias a read goes to inside a request of ``account_id``"""
+        def view(request):
+            set_request_account(account_id)
+            if write:
+                self.router.db_for_write(UserAccounts)
+            return self.router.db_for_read(UserAccounts)
+        return PrimaryStickinessMiddleware(view)(RequestFactory().generic(method, '/'))
+
+    def test_account_reads_the_primary_for_the_sticky_window_after_a_write(self):
+        self.assertEqual(self.read_in_request('GET', 'a'), 'replica')
+        self.assertEqual(self.read_in_request('POST', 'a'), 'default')
+        self.assertEqual(self.read_in_request('GET', 'a'), 'replica')
+        self.assertEqual(self.read_in_request('GET', 'a', write=True), 'default')
+        self.assertEqual(self.read_in_request('GET', 'a'), 'default')
+        self.assertEqual(self.read_in_request('GET', 'b'), 'replica')
+        # Outside a request
+        self.assertEqual(self.router.db_for_read(UserAccounts), 'default')
+
+    @override_settings(DATABASE_STICKY_SECONDS=0, DATABASE_REPLICA_MAX_LAG=0)
+    def test_no_stickiness_without_lag(self):
+        self.assertEqual(self.read_in_request('POST', 'a'), 'default')
+        self.assertEqual(self.read_in_request('GET', 'a'), 'replica')
+
+    @override_settings(DATABASE_STICKY_SECONDS=5)
+    def test_sticky_window_shorter_than_the_replica_lag_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            PrimaryReplicaRouter()
+
+
+class PrimaryRefillTests(TestCase):
+    def test_cache_refills_read_the_primary(self):
+        role = DmRoles.objects.create(role_code='ROUTED', role_name='Routed', created_by=0)
+        account = UserAccounts.objects.create(user_id='U-routed', account_id='routed', account_role=role)
+        branch = DmBranch.objects.create(
+            factory_code=DmFactory.objects.create(factory_code='RF', factory_name='RF'),
+            branch_type='T', branch_code='RB', branch_name='RB',
+        )
+        DmMappingAccountBranch.objects.create(account_id=account, branch_code=branch, role_code=role)
+
+        with override_settings(DATABASE_ROUTERS=['configs.tests.UnreachableReplicaRouter']):
+            self.assertEqual(get_cached_account('routed').pk, account.pk)
+            self.assertEqual(resolver.compile_permissions('routed').roles, {'ROUTED'})
+            self.assertEqual(scoping.get_account_branches('routed'), {'RB'})
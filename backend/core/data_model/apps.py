@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class DataModelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core.data_model'
\ No newline at end of file
+    name = 'core.data_model'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,269 @@
+"""
+Maintenance and queries for the DmPlantPath materialized-path index.
+
+Signals in core.data_model.signals call refresh_node() on save and
+remove_node() on delete. Writes that bypass signals (QuerySet.update(),
+bulk_create()) must call refresh_subtrees(), refresh_node() or rebuild()
+themselves.
+
+Codes are percent-escaped inside the path, so a code containing '/' cannot
+spill into its neighbours' prefix queries.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import DmBranch, DmFactory, DmMachine, DmMachineLine, DmPlantPath
+
+
+UPSERT_FIELDS = [
+    'node_code', 'depth', 'path', 'factory_code', 'branch_code', 'machine_code', 'line_id',
+]
+
+
+# ============== ROW BUILDERS ==============
+def _segment(code):
+    """A code escaped for use as one path segment"""
+    return str(code).replace('%', '%25').replace('/', '%2F')
+
+
+def build_path(*codes):
+    return '/' + ''.join(f"{_segment(code)}/" for code in codes)
+
+
+def _factory_row(factory_code):
+    return DmPlantPath(
+        node_type=DmPlantPath.NODE_FACTORY, node_pk=factory_code, node_code=factory_code,
+        depth=0, path=build_path(factory_code), factory_code=factory_code,
+    )
+
+
+def _branch_row(branch_id, branch_code, factory_code):
+    return DmPlantPath(
+        node_type=DmPlantPath.NODE_BRANCH, node_pk=str(branch_id), node_code=branch_code,
+        depth=1, path=build_path(factory_code, branch_code),
+        factory_code=factory_code, branch_code=branch_code,
+    )
+
+
+def _machine_row(machine_id, machine_code, branch_code, factory_code):
+    return DmPlantPath(
+        node_type=DmPlantPath.NODE_MACHINE, node_pk=str(machine_id), node_code=machine_code,
+        depth=2, path=build_path(factory_code, branch_code, machine_code),
+        factory_code=factory_code, branch_code=branch_code, machine_code=machine_code,
+    )
+
+
+def _line_row(line_id, line_code, machine_code, branch_code, factory_code):
+    return DmPlantPath(
+        node_type=DmPlantPath.NODE_LINE, node_pk=str(line_id), node_code=line_code,
+        depth=3, path=build_path(factory_code, branch_code, machine_code, line_id),
+        factory_code=factory_code, branch_code=branch_code, machine_code=machine_code,
+        line_id=line_id,
+    )
+
+
+def _line_rows(machines):
+    """Rows for every line of ``machines``, a {machine_code: (branch_code, factory_code)} map"""
+    lines = (
+        DmMachineLine.objects
+        .filter(machine_code__in=list(machines))
+        .values_list('id', 'line_code', 'machine_code')
+    )
+    return [
+        _line_row(line_id, line_code, machine_code, *machines[machine_code])
+        for line_id, line_code, machine_code in lines
+    ]
+
+
+def _upsert(rows):
+    DmPlantPath.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['node_type', 'node_pk'],
+        update_fields=UPSERT_FIELDS,
+        batch_size=1000,
+    )
+
+
+# ============== MAINTENANCE ==============
+def _has_moved(node_type, node_pk, **expected):
+    """True unless the indexed row exists with the expected codes"""
+    current = (
+        DmPlantPath.objects
+        .filter(node_type=node_type, node_pk=str(node_pk))
+        .values(*expected)
+        .first()
+    )
+    return current != expected
+
+
+def refresh_node(instance):
+    """Re-index a saved node, and its subtree when its position changed"""
+    if isinstance(instance, DmFactory):
+        _upsert([_factory_row(instance.factory_code)])
+
+    elif isinstance(instance, DmBranch):
+        branch_code, factory_code = instance.branch_code, instance.factory_code_id
+        if not _has_moved(DmPlantPath.NODE_BRANCH, instance.pk, branch_code=branch_code, factory_code=factory_code):
+            return
+        machine_rows = list(DmMachine.objects.filter(branch_code=branch_code).values_list('id', 'machine_code'))
+        rows = [_branch_row(instance.pk, branch_code, factory_code)]
+        rows += [
+            _machine_row(machine_id, machine_code, branch_code, factory_code)
+            for machine_id, machine_code in machine_rows
+        ]
+        machines = {machine_code: (branch_code, factory_code) for _, machine_code in machine_rows}
+        rows += _line_rows(machines)
+        _upsert(rows)
+
+    elif isinstance(instance, DmMachine):
+        branch_code = instance.branch_code_id
+        factory_code = DmBranch.objects.filter(branch_code=branch_code).values_list('factory_code', flat=True).first()
+        if factory_code is None:
+            return
+        if not _has_moved(
+            DmPlantPath.NODE_MACHINE, instance.pk,
+            machine_code=instance.machine_code, branch_code=branch_code, factory_code=factory_code,
+        ):
+            return
+        rows = [_machine_row(instance.pk, instance.machine_code, branch_code, factory_code)]
+        rows += _line_rows({instance.machine_code: (branch_code, factory_code)})
+        _upsert(rows)
+
+    elif isinstance(instance, DmMachineLine):
+        ancestors = (
+            DmMachine.objects
+            .filter(machine_code=instance.machine_code_id)
+            .values_list('branch_code', 'branch_code__factory_code')
+            .first()
+        )
+        if ancestors is None:
+            return
+        _upsert([_line_row(instance.pk, instance.line_code, instance.machine_code_id, *ancestors)])
+
+
+def refresh_subtrees(factory_codes=(), branch_codes=(), machine_codes=(), line_keys=()):
+    """
+    Re-index nodes written without signals, with one query per level: the
+    given factories, the given branches and machines with everything below
+    them, and the given (machine_code, line_code) lines
+    """
+    branch_codes, line_keys = set(branch_codes), set(line_keys)
+    rows = [_factory_row(factory_code) for factory_code in factory_codes]
+    if branch_codes:
+        rows += [
+            _branch_row(branch_id, branch_code, factory_code)
+            for branch_id, branch_code, factory_code in (
+                DmBranch.objects.filter(branch_code__in=branch_codes).values_list('id', 'branch_code', 'factory_code')
+            )
+        ]
+
+    machines = {}
+    if branch_codes or machine_codes:
+        for machine_id, machine_code, branch_code, factory_code in (
+            DmMachine.objects
+            .filter(Q(machine_code__in=set(machine_codes)) | Q(branch_code__in=branch_codes))
+            .values_list('id', 'machine_code', 'branch_code', 'branch_code__factory_code')
+        ):
+            machines[machine_code] = (branch_code, factory_code)
+            rows.append(_machine_row(machine_id, machine_code, branch_code, factory_code))
+
+    # Lines of other machines only need their own rows
+    line_machines = {machine_code for machine_code, _ in line_keys} - set(machines)
+    if line_machines:
+        machines.update(
+            (machine_code, (branch_code, factory_code))
+            for machine_code, branch_code, factory_code in (
+                DmMachine.objects.filter(machine_code__in=line_machines)
+                .values_list('machine_code', 'branch_code', 'branch_code__factory_code')
+            )
+        )
+    if machines:
+        rows += [
+            row for row in _line_rows(machines)
+            if row.machine_code not in line_machines or (row.machine_code, row.node_code) in line_keys
+        ]
+    if rows:
+        _upsert(rows)
+
+
+def remove_node(instance):
+    """Drop a deleted node and everything indexed under it"""
+    node_type = {
+        DmFactory: DmPlantPath.NODE_FACTORY,
+        DmBranch: DmPlantPath.NODE_BRANCH,
+        DmMachine: DmPlantPath.NODE_MACHINE,
+        DmMachineLine: DmPlantPath.NODE_LINE,
+    }[type(instance)]
+    path = (
+        DmPlantPath.objects
+        .filter(node_type=node_type, node_pk=str(instance.pk))
+        .values_list('path', flat=True)
+        .first()
+    )
+    if path is not None:
+        DmPlantPath.objects.filter(path__startswith=path).delete()
+
+
+def iter_all_rows():
+    """Index rows for the whole hierarchy, built with one query per level"""
+    factory_of_branch = {}
+    for factory_code in DmFactory.objects.values_list('factory_code', flat=True):
+        yield _factory_row(factory_code)
+    for branch_id, branch_code, factory_code in DmBranch.objects.values_list('id', 'branch_code', 'factory_code'):
+        factory_of_branch[branch_code] = factory_code
+        yield _branch_row(branch_id, branch_code, factory_code)
+
+    ancestors_of_machine = {}
+    for machine_id, machine_code, branch_code in DmMachine.objects.values_list('id', 'machine_code', 'branch_code'):
+        factory_code = factory_of_branch[branch_code]
+        ancestors_of_machine[machine_code] = (branch_code, factory_code)
+        yield _machine_row(machine_id, machine_code, branch_code, factory_code)
+
+    for line_id, line_code, machine_code in DmMachineLine.objects.values_list('id', 'line_code', 'machine_code').iterator(chunk_size=5000):
+        yield _line_row(line_id, line_code, machine_code, *ancestors_of_machine[machine_code])
+
+
+def rebuild(batch_size=5000):
+    """Recreate the whole index in one transaction, returning the row count"""
+    total = 0
+    with transaction.atomic():
+        DmPlantPath.objects.all().delete()
+        batch = []
+        for row in iter_all_rows():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                DmPlantPath.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            DmPlantPath.objects.bulk_create(batch)
+            total += len(batch)
+    return total
+
+
+# ============== QUERIES ==============
+ANCESTOR_COLUMNS = {
+    DmPlantPath.NODE_FACTORY: 'factory_code',
+    DmPlantPath.NODE_BRANCH: 'branch_code',
+    DmPlantPath.NODE_MACHINE: 'machine_code',
+}
+
+
+def descendants(node_type, node_code, of_type=None):
+    """
+    Index rows below a factory, branch or machine, optionally limited to
+    one node type, e.g. descendants('factory', 'F1', of_type='line')
+    """
+    rows = DmPlantPath.objects.filter(**{ANCESTOR_COLUMNS[node_type]: node_code}).exclude(node_type=node_type)
+    if of_type is not None:
+        rows = rows.filter(node_type=of_type)
+    return rows
+
+
+def ancestors(node_type, node_pk):
+    """
+    The index row of a node, which carries factory_code, branch_code and
+    machine_code of all its ancestors; None when the node is unknown
+    """
+    return DmPlantPath.objects.filter(node_type=node_type, node_pk=str(node_pk)).first()
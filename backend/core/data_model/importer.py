@@ -0,0 +1,392 @@
+"""
+Bulk upsert of plant master data from CSV / XLSX.
+
+The file is a flattened hierarchy, one row per machine line (or per machine,
+branch or factory when the lower columns are blank):
+
+    factory_code, factory_name, branch_code, branch_type, branch_name,
+    machine_code, machine_name, line_code, line_name
+
+Rows are streamed in chunks. Each chunk is diffed against the database with
+one query per level, and only new or changed rows are written, with
+bulk_create(update_conflicts=True) on each table's natural key. Blank name
+columns keep the stored value. Since the upserts bypass model signals, each
+chunk re-indexes the DmPlantPath rows of the nodes it created or moved, and
+the collection versions are bumped once at the end.
+
+Each chunk is written in a savepoint and the foreign keys of the rows it wrote
+are checked there; when the database rejects it the chunk is replayed row by
+row, and the rows it still rejects are reported like validation errors.
+Unreadable files (bad encoding, malformed CSV, corrupt XLSX) raise
+ImportFileError, which rolls the whole import back.
+"""
+import copy
+import csv
+import io
+import zipfile
+from itertools import islice
+
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from . import hierarchy
+from .models import DmBranch, DmFactory, DmMachine, DmMachineLine
+from .tree import TREE_COLLECTIONS
+from .versions import bump_version
+
+
+COLUMNS = [
+    'factory_code', 'factory_name',
+    'branch_code', 'branch_type', 'branch_name',
+    'machine_code', 'machine_name',
+    'line_code', 'line_name',
+]
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+# ============== READERS ==============
+def _clean(row):
+    cleaned = {}
+    for column in COLUMNS:
+        value = row.get(column)
+        if value is not None:
+            value = str(value).strip()
+        cleaned[column] = value or None
+    return cleaned
+
+
+def read_csv(handle):
+    """Yield cleaned rows from a text file handle"""
+    reader = csv.DictReader(handle)
+    try:
+        missing = {'factory_code'} - set(reader.fieldnames or [])
+        if missing:
+            raise ImportFileError(f"Missing column(s): {', '.join(sorted(missing))}")
+        for row in reader:
+            yield _clean(row)
+    except UnicodeDecodeError:
+        raise ImportFileError('The file is not valid UTF-8; save it as CSV UTF-8.')
+    except csv.Error as e:
+        raise ImportFileError(f"Malformed CSV at line {reader.line_num}: {e}")
+
+
+def read_xlsx(handle):
+    """Yield cleaned rows from the first sheet of an XLSX workbook"""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ImportFileError('XLSX import requires the openpyxl package; upload CSV instead.')
+
+    try:
+        workbook = load_workbook(handle, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise ImportFileError('The file is not a readable XLSX workbook.')
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        if 'factory_code' not in header:
+            raise ImportFileError('Missing column(s): factory_code')
+        for values in rows:
+            yield _clean(dict(zip(header, values)))
+    finally:
+        workbook.close()
+
+
+def _read_csv_path(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        yield from read_csv(handle)
+
+
+def open_rows(path_or_file, filename=None):
+    """Pick a reader from the file name; accepts a path or a binary file object"""
+    name = (filename or getattr(path_or_file, 'name', None) or str(path_or_file)).lower()
+    if name.endswith('.xlsx'):
+        return read_xlsx(path_or_file)
+    if name.endswith('.csv'):
+        if isinstance(path_or_file, (str, bytes)) or hasattr(path_or_file, '__fspath__'):
+            return _read_csv_path(path_or_file)
+        return read_csv(io.TextIOWrapper(path_or_file, encoding='utf-8-sig', newline=''))
+    raise ImportFileError('Unsupported file type; use .csv or .xlsx')
+
+
+# ============== IMPORT ==============
+class ImportReport:
+    LEVELS = ('factories', 'branches', 'machines', 'lines')
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.counts = {level: {'created': 0, 'updated': 0, 'unchanged': 0} for level in self.LEVELS}
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append({'row': row_number, 'error': message})
+
+    @property
+    def changed(self):
+        return any(count['created'] or count['updated'] for count in self.counts.values())
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            **self.counts,
+            'errors': self.errors,
+        }
+
+
+class _Level:
+    """
+    Pending upserts of one table within a chunk. With ``has_parent`` the first
+    value is the parent's code, and a change of it moves the node in the tree.
+    """
+
+    def __init__(self, report_key, existing, seen, has_parent=False):
+        self.report_key = report_key
+        self.existing = existing
+        self.seen = seen
+        self.has_parent = has_parent
+        self.pending = {}
+        # Keys written by diff(), and the subset created or moved
+        self.changed = []
+        self.moved = []
+
+    def current(self, key):
+        if key in self.pending:
+            return self.pending[key]
+        if key in self.seen:
+            return self.seen[key]
+        return self.existing.get(key)
+
+    def put(self, key, values):
+        self.pending[key] = values
+
+    def diff(self, report):
+        """Count and collect the keys that need writing"""
+        counts = report.counts[self.report_key]
+        for key, values in self.pending.items():
+            previous = self.seen.get(key, self.existing.get(key))
+            if previous is None:
+                counts['created'] += 1
+                self.changed.append(key)
+                self.moved.append(key)
+            elif previous != values:
+                counts['updated'] += 1
+                self.changed.append(key)
+                if self.has_parent and previous[0] != values[0]:
+                    self.moved.append(key)
+            elif key not in self.seen:
+                counts['unchanged'] += 1
+            self.seen[key] = values
+
+
+def _merge_name(level, key, name, index):
+    """Take the row's value for a field, falling back to the stored one"""
+    if name is not None:
+        return name
+    current = level.current(key)
+    return current[index] if current is not None else None
+
+
+def _process_chunk(chunk, report, seen, dry_run):
+    factory_codes = {row['factory_code'] for _, row in chunk if row['factory_code']}
+    branch_codes = {row['branch_code'] for _, row in chunk if row['branch_code']}
+    machine_codes = {row['machine_code'] for _, row in chunk if row['machine_code']}
+
+    factories = _Level('factories', {
+        code: (name,)
+        for code, name in DmFactory.objects.filter(factory_code__in=factory_codes).values_list('factory_code', 'factory_name')
+    }, seen['factories'])
+    branches = _Level('branches', {
+        code: (factory_code, branch_type, name)
+        for code, factory_code, branch_type, name in DmBranch.objects.filter(branch_code__in=branch_codes)
+        .values_list('branch_code', 'factory_code', 'branch_type', 'branch_name')
+    }, seen['branches'], has_parent=True)
+    machines = _Level('machines', {
+        code: (branch_code, name)
+        for code, branch_code, name in DmMachine.objects.filter(machine_code__in=machine_codes)
+        .values_list('machine_code', 'branch_code', 'machine_name')
+    }, seen['machines'], has_parent=True)
+    lines = _Level('lines', {
+        (machine_code, line_code): (name,)
+        for machine_code, line_code, name in DmMachineLine.objects.filter(machine_code__in=machine_codes)
+        .values_list('machine_code', 'line_code', 'line_name')
+    }, seen['lines'])
+
+    for row_number, row in chunk:
+        factory_code, branch_code = row['factory_code'], row['branch_code']
+        machine_code, line_code = row['machine_code'], row['line_code']
+
+        if not factory_code:
+            report.add_error(row_number, 'factory_code is required.')
+            continue
+        if line_code and not machine_code:
+            report.add_error(row_number, 'machine_code is required when line_code is given.')
+            continue
+        if machine_code and not branch_code:
+            report.add_error(row_number, 'branch_code is required when machine_code is given.')
+            continue
+
+        factory_name = _merge_name(factories, factory_code, row['factory_name'], 0)
+        if factory_name is None:
+            report.add_error(row_number, f"factory_name is required for new factory {factory_code}.")
+            continue
+
+        branch = None
+        if branch_code:
+            branch_type = _merge_name(branches, branch_code, row['branch_type'], 1)
+            branch_name = _merge_name(branches, branch_code, row['branch_name'], 2)
+            if branch_type is None or branch_name is None:
+                report.add_error(row_number, f"branch_type and branch_name are required for new branch {branch_code}.")
+                continue
+            branch = (factory_code, branch_type, branch_name)
+
+        machine = None
+        if machine_code:
+            machine_name = _merge_name(machines, machine_code, row['machine_name'], 1)
+            if machine_name is None:
+                report.add_error(row_number, f"machine_name is required for new machine {machine_code}.")
+                continue
+            machine = (branch_code, machine_name)
+
+        line = None
+        if line_code:
+            line_name = _merge_name(lines, (machine_code, line_code), row['line_name'], 0)
+            if line_name is None:
+                report.add_error(row_number, f"line_name is required for new line {machine_code}/{line_code}.")
+                continue
+            line = (line_name,)
+
+        factories.put(factory_code, (factory_name,))
+        if branch:
+            branches.put(branch_code, branch)
+        if machine:
+            machines.put(machine_code, machine)
+        if line:
+            lines.put((machine_code, line_code), line)
+
+    for level in (factories, branches, machines, lines):
+        level.diff(report)
+    if dry_run:
+        return None
+
+    DmFactory.objects.bulk_create(
+        [DmFactory(factory_code=code, factory_name=factories.pending[code][0]) for code in factories.changed],
+        update_conflicts=True, unique_fields=['factory_code'], update_fields=['factory_name'],
+        batch_size=1000,
+    )
+    DmBranch.objects.bulk_create(
+        [
+            DmBranch(branch_code=code, factory_code_id=values[0], branch_type=values[1], branch_name=values[2])
+            for code in branches.changed for values in [branches.pending[code]]
+        ],
+        update_conflicts=True, unique_fields=['branch_code'],
+        update_fields=['factory_code', 'branch_type', 'branch_name'], batch_size=1000,
+    )
+    DmMachine.objects.bulk_create(
+        [
+            DmMachine(machine_code=code, branch_code_id=values[0], machine_name=values[1])
+            for code in machines.changed for values in [machines.pending[code]]
+        ],
+        update_conflicts=True, unique_fields=['machine_code'],
+        update_fields=['branch_code', 'machine_name'], batch_size=1000,
+    )
+    DmMachineLine.objects.bulk_create(
+        [
+            DmMachineLine(machine_code_id=key[0], line_code=key[1], line_name=lines.pending[key][0])
+            for key in lines.changed
+        ],
+        update_conflicts=True, unique_fields=['machine_code', 'line_code'],
+        update_fields=['line_name'], batch_size=1000,
+    )
+    return factories, branches, machines, lines
+
+
+def _check_parents(branches, machines, lines):
+    """
+    Raise IntegrityError when a written row points at a missing parent.
+    Foreign keys are deferred to commit, so they are checked here, on the
+    chunk's own rows, while its savepoint can still roll back.
+    """
+    orphans = (
+        (
+            DmBranch.objects.filter(branch_code__in=branches.changed)
+            .exclude(Exists(DmFactory.objects.filter(factory_code=OuterRef('factory_code')))),
+            'branch_code',
+        ),
+        (
+            DmMachine.objects.filter(machine_code__in=machines.changed)
+            .exclude(Exists(DmBranch.objects.filter(branch_code=OuterRef('branch_code')))),
+            'machine_code',
+        ),
+        (
+            DmMachineLine.objects.filter(machine_code__in={machine_code for machine_code, _ in lines.changed})
+            .exclude(Exists(DmMachine.objects.filter(machine_code=OuterRef('machine_code')))),
+            'line_code',
+        ),
+    )
+    for rows, code_field in orphans:
+        orphan = rows.values_list(code_field, flat=True).first()
+        if orphan is not None:
+            raise IntegrityError(f"{rows.model._meta.db_table}.{code_field}={orphan} has no parent row")
+
+
+def _apply_chunk(chunk, report, seen, dry_run):
+    """
+    Run _process_chunk in a savepoint; on a database error roll it back,
+    restore the report and return the error
+    """
+    state = (copy.deepcopy(report.counts), len(report.errors), {level: dict(keys) for level, keys in seen.items()})
+    try:
+        with transaction.atomic():
+            levels = _process_chunk(chunk, report, seen, dry_run)
+            if levels is not None:
+                factories, branches, machines, lines = levels
+                _check_parents(branches, machines, lines)
+                hierarchy.refresh_subtrees(
+                    factory_codes=factories.moved, branch_codes=branches.moved,
+                    machine_codes=machines.moved, line_keys=lines.moved,
+                )
+    except (IntegrityError, DataError) as e:
+        counts, error_count, seen_keys = state
+        report.counts = counts
+        del report.errors[error_count:]
+        for level, keys in seen_keys.items():
+            seen[level].clear()
+            seen[level].update(keys)
+        return e
+    return None
+
+
+def import_master_data(rows, dry_run=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Upsert factories, branches, machines and lines from an iterable of row
+    dicts (see open_rows), returning an ImportReport. Rows with errors are
+    skipped; everything else is applied in a single transaction.
+    """
+    report = ImportReport(dry_run)
+    seen = {level: {} for level in ImportReport.LEVELS}
+    numbered = enumerate(rows, start=2)  # row 1 is the header
+
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            report.rows += len(chunk)
+            if _apply_chunk(chunk, report, seen, dry_run) is None:
+                continue
+            for row in chunk:
+                error = _apply_chunk([row], report, seen, dry_run)
+                if error is not None:
+                    report.add_error(row[0], f"Rejected by the database: {error}")
+
+        if not dry_run and report.changed:
+            bump_version(*TREE_COLLECTIONS)
+    return report
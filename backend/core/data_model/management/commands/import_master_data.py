@@ -0,0 +1,29 @@
+import json
+from contextlib import closing
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.data_model.importer import DEFAULT_CHUNK_SIZE, ImportFileError, import_master_data, open_rows
+
+
+class Command(BaseCommand):
+    help = 'Upsert factories, branches, machines and lines from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows diffed per batch')
+
+    def handle(self, *args, **options):
+        try:
+            with closing(open_rows(options['path'])) as rows:
+                report = import_master_data(rows, dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        except (ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        summary = report.as_dict()
+        summary.pop('errors')
+        summary['errors'] = len(report.errors)
+        self.stdout.write(json.dumps(summary, indent=2))
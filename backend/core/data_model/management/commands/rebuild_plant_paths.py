@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.data_model.hierarchy import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DmPlantPath factory/branch/machine/line index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per statement')
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} plant nodes"))
@@ -0,0 +1,224 @@
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.data_model import hierarchy
+from core.data_model.models import (
+    DmAppName,
+    DmAppPageName,
+    DmBranch,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+    DmMappingAccountRole,
+    DmMappingRolePermission,
+    DmPermissions,
+    DmRoles,
+)
+from core.data_model.versions import COLLECTIONS, bump_version
+from core.user.models import UserAccounts, UserCustomUsers, UserStatus
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate production-sized users, accounts, plant hierarchy and permission mappings '
+        'with bulk_create; the same --seed always produces the same data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Users, each with an account')
+        parser.add_argument('--factories', type=int, default=50)
+        parser.add_argument('--branches-per-factory', type=int, default=4)
+        parser.add_argument('--machines', type=int, default=5000)
+        parser.add_argument('--lines', type=int, default=50000, help='Machine lines, spread evenly over machines')
+        parser.add_argument('--roles', type=int, default=20)
+        parser.add_argument('--permissions', type=int, default=8)
+        parser.add_argument('--apps', type=int, default=10)
+        parser.add_argument('--pages-per-app', type=int, default=20)
+        parser.add_argument('--role-permission-density', type=float, default=0.5,
+                            help='Fraction of (role, page, permission) combinations granted')
+        parser.add_argument('--branches-per-account', type=int, default=3)
+        parser.add_argument('--roles-per-account', type=int, default=2)
+        parser.add_argument('--apps-per-account', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--prefix', default='S', help='Prefix of every generated code, to keep runs apart')
+        parser.add_argument('--password', default='password123', help='Password of every generated account')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+
+        if UserAccounts.objects.filter(account_id__startswith=f"{self.prefix}-acc-").exists():
+            raise CommandError(f"Data with prefix {self.prefix!r} already exists; pass another --prefix.")
+        if options['machines'] < 1 and options['lines']:
+            raise CommandError('Lines need at least one machine.')
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            reference = self._reference(options)
+            branches = self._plant(options)
+            self._role_permissions(reference, options['role_permission_density'])
+            self._people(reference, branches, options)
+
+            # bulk_create bypasses the signals that keep these in step
+            bump_version(*COLLECTIONS.values())
+            paths = hierarchy.rebuild()
+            self.stdout.write(f"  {'plant path index':<28} {paths:>9} rows")
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s"))
+
+    def _insert(self, model, objects, label):
+        started = time.perf_counter()
+        count = 0
+        for chunk in _chunks(objects, self.batch_size):
+            model.objects.bulk_create(chunk, batch_size=self.batch_size)
+            count += len(chunk)
+        self.stdout.write(f"  {label:<28} {count:>9} rows  {time.perf_counter() - started:6.1f}s")
+        return count
+
+    # ============== REFERENCE DATA ==============
+    def _reference(self, options):
+        p = self.prefix
+        statuses = list(UserStatus.objects.values_list('status_id', flat=True))
+        if not statuses:
+            statuses = [
+                status.status_id for status in UserStatus.objects.bulk_create(
+                    [UserStatus(status_name=name, created_by=0) for name in ('Active', 'Inactive', 'Locked')]
+                )
+            ]
+
+        roles = [f"{p}-role-{i}" for i in range(options['roles'])]
+        self._insert(DmRoles, (
+            DmRoles(role_code=code, role_name=f"Role {i}", created_by=0) for i, code in enumerate(roles)
+        ), 'roles')
+
+        permissions = [
+            permission.permission_id for permission in DmPermissions.objects.bulk_create([
+                DmPermissions(permission_name=f"{p} permission {i}", created_by=0)
+                for i in range(options['permissions'])
+            ])
+        ]
+        self.stdout.write(f"  {'permissions':<28} {len(permissions):>9} rows")
+
+        apps = [f"{p}-app-{i}" for i in range(options['apps'])]
+        self._insert(DmAppName, (DmAppName(app_code=code, app_name=f"App {i}") for i, code in enumerate(apps)), 'apps')
+
+        pages = [(app, f"{app}-page-{j}") for app in apps for j in range(options['pages_per_app'])]
+        self._insert(DmAppPageName, (
+            DmAppPageName(app_code_id=app, page_code=page, page_name=f"Page {page}") for app, page in pages
+        ), 'app pages')
+
+        return {'statuses': statuses, 'roles': roles, 'permissions': permissions, 'apps': apps, 'pages': pages}
+
+    # ============== PLANT HIERARCHY ==============
+    def _plant(self, options):
+        p = self.prefix
+        factories = [f"{p}-F{i:03d}" for i in range(options['factories'])]
+        self._insert(DmFactory, (
+            DmFactory(factory_code=code, factory_name=f"Factory {i}") for i, code in enumerate(factories)
+        ), 'factories')
+
+        branches = [
+            (factory, f"{factory}-B{j:02d}") for factory in factories for j in range(options['branches_per_factory'])
+        ]
+        self._insert(DmBranch, (
+            DmBranch(factory_code_id=factory, branch_type=self.rng.choice(('PROD', 'WH', 'QA')),
+                     branch_code=code, branch_name=f"Branch {code}")
+            for factory, code in branches
+        ), 'branches')
+        branch_codes = [code for _, code in branches]
+        if not branch_codes and options['machines']:
+            raise CommandError('Machines need at least one branch.')
+
+        machines = [f"{p}-M{i:06d}" for i in range(options['machines'])]
+        self._insert(DmMachine, (
+            DmMachine(branch_code_id=self.rng.choice(branch_codes), machine_code=code, machine_name=f"Machine {i}")
+            for i, code in enumerate(machines)
+        ), 'machines')
+
+        def lines():
+            for i in range(options['lines']):
+                machine = machines[i % len(machines)]
+                number = i // len(machines)
+                yield DmMachineLine(machine_code_id=machine, line_code=f"L{number:03d}", line_name=f"Line {number}")
+
+        self._insert(DmMachineLine, lines(), 'machine lines')
+        return branch_codes
+
+    # ============== PERMISSION MATRICES ==============
+    def _role_permissions(self, reference, density):
+        rng = self.rng
+
+        def grants():
+            for role in reference['roles']:
+                for app, page in reference['pages']:
+                    for permission in reference['permissions']:
+                        if rng.random() < density:
+                            yield DmMappingRolePermission(
+                                role_code_id=role, app_code_id=app, page_code_id=page,
+                                permission_id_id=permission, created_by=0,
+                            )
+
+        self._insert(DmMappingRolePermission, grants(), 'role permissions')
+
+    # ============== USERS AND ACCOUNTS ==============
+    def _people(self, reference, branches, options):
+        rng = self.rng
+        p = self.prefix
+        # One hash shared by every account: hashing per account would take hours
+        password = make_password(options['password'])
+        roles = reference['roles']
+
+        def account_ids():
+            return (f"{p}-acc-{i:07d}" for i in range(options['users']))
+
+        def accounts_and_users():
+            for chunk in _chunks(range(options['users']), self.batch_size):
+                accounts = UserAccounts.objects.bulk_create([
+                    UserAccounts(
+                        user_id=f"{p}{i:07d}", account_id=f"{p}-acc-{i:07d}", account_password=password,
+                        account_role_id=rng.choice(roles) if roles and rng.random() < 0.8 else None,
+                    )
+                    for i in chunk
+                ])
+                for i, account in zip(chunk, accounts):
+                    yield UserCustomUsers(
+                        user_id=account.user_id, user_name=f"user{i}", user_full_name=f"Seeded User {i}",
+                        user_email=f"user{i}@example.com" if rng.random() < 0.9 else None,
+                        user_status_id=rng.choice(reference['statuses']), user_account=account,
+                    )
+
+        self._insert(UserCustomUsers, accounts_and_users(), 'users + accounts')
+
+        def sample(population, k):
+            return rng.sample(population, min(k, len(population)))
+
+        self._insert(DmMappingAccountRole, (
+            DmMappingAccountRole(account_id_id=account_id, role_code_id=role, created_by=0)
+            for account_id in account_ids() for role in sample(roles, options['roles_per_account'])
+        ), 'account roles')
+        self._insert(DmMappingAccountApp, (
+            DmMappingAccountApp(account_id_id=account_id, app_code_id=app, created_by=0)
+            for account_id in account_ids() for app in sample(reference['apps'], options['apps_per_account'])
+        ), 'account apps')
+        if roles:
+            self._insert(DmMappingAccountBranch, (
+                DmMappingAccountBranch(account_id_id=account_id, branch_code_id=branch, role_code_id=rng.choice(roles))
+                for account_id in account_ids() for branch in sample(branches, options['branches_per_account'])
+            ), 'account branches')
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_model', '0005_dmfactory_dmbranch_dmmachine_dmmachineline_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DmCollectionVersion',
+            fields=[
+                ('collection', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dm_collection_version',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_model', '0006_dmcollectionversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DmPlantPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_type', models.CharField(choices=[('factory', 'Factory'), ('branch', 'Branch'), ('machine', 'Machine'), ('line', 'Machine line')], max_length=10)),
+                ('node_pk', models.CharField(max_length=50)),
+                ('node_code', models.CharField(max_length=50)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('path', models.CharField(max_length=255)),
+                ('factory_code', models.CharField(max_length=50)),
+                ('branch_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('machine_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('line_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'dm_plant_path',
+                'indexes': [models.Index(fields=['node_type', 'node_code'], name='idx_plant_path_node'), models.Index(fields=['factory_code', 'node_type'], name='idx_plant_path_factory'), models.Index(fields=['branch_code', 'node_type'], name='idx_plant_path_branch'), models.Index(fields=['machine_code', 'node_type'], name='idx_plant_path_machine'), models.Index(fields=['path'], name='idx_plant_path_path')],
+                'unique_together': {('node_type', 'node_pk')},
+            },
+        ),
+    ]
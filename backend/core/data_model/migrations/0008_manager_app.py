@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import migrations
+
+
+MANAGER_PAGES = {'users': 'Users', 'accounts': 'Accounts'}
+
+
+def create_manager_app(apps, schema_editor):
+    """
+    The manager app and pages guarding the user, account and access-control
+    endpoints (core.user.permissions), granted to the administrator role.
+    Accounts already holding that role are mapped to the app, so existing
+    administrators keep their access; others get it from `manage.py grant_manager`.
+    """
+    db = schema_editor.connection.alias
+    DmAppName = apps.get_model('data_model', 'DmAppName')
+    DmAppPageName = apps.get_model('data_model', 'DmAppPageName')
+    DmPermissions = apps.get_model('data_model', 'DmPermissions')
+    DmRoles = apps.get_model('data_model', 'DmRoles')
+    DmMappingRolePermission = apps.get_model('data_model', 'DmMappingRolePermission')
+    DmMappingAccountRole = apps.get_model('data_model', 'DmMappingAccountRole')
+    DmMappingAccountApp = apps.get_model('data_model', 'DmMappingAccountApp')
+    UserAccounts = apps.get_model('user', 'UserAccounts')
+
+    app, _ = DmAppName.objects.using(db).get_or_create(
+        app_code=getattr(settings, 'MANAGER_APP_CODE', 'manager'), defaults={'app_name': 'Manager'}
+    )
+    role, _ = DmRoles.objects.using(db).get_or_create(
+        role_code=getattr(settings, 'MANAGER_ROLE_CODE', 'ADMIN'),
+        defaults={'role_name': 'Administrator', 'created_by': 0},
+    )
+    permission = DmPermissions.objects.using(db).filter(permission_name='Manage').first()
+    if permission is None:
+        permission = DmPermissions.objects.using(db).create(permission_name='Manage', created_by=0)
+    for page_code, page_name in MANAGER_PAGES.items():
+        page, _ = DmAppPageName.objects.using(db).get_or_create(
+            page_code=page_code, defaults={'app_code': app, 'page_name': page_name}
+        )
+        DmMappingRolePermission.objects.using(db).get_or_create(
+            role_code=role, app_code=app, page_code=page, permission_id=permission,
+            defaults={'created_by': 0},
+        )
+
+    admins = set(
+        UserAccounts.objects.using(db).filter(account_role=role).values_list('account_id', flat=True)
+    ) | set(
+        DmMappingAccountRole.objects.using(db).filter(role_code=role).values_list('account_id', flat=True)
+    )
+    for account_id in admins:
+        DmMappingAccountApp.objects.using(db).get_or_create(
+            account_id_id=account_id, app_code=app, defaults={'created_by': 0}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_model', '0007_dmplantpath'),
+        ('user', '0004_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_manager_app, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def rebuild_plant_paths(apps, schema_editor):
+    # Index the hierarchy that existed before 0007 created the table
+    from core.data_model import hierarchy
+
+    hierarchy.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_model', '0008_manager_app'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dmplantpath',
+            name='path',
+            field=models.CharField(max_length=475),
+        ),
+        migrations.RunPython(rebuild_plant_paths, migrations.RunPython.noop),
+    ]
@@ -25,11 +25,24 @@ class DmBranch(models.Model):
         return f"{self.factory_code.factory_code}-{self.branch_code}"
 
 
+class BranchScopedQuerySet(models.QuerySet):
+    """
+    QuerySet of a model whose rows belong to a branch. The model names the
+    lookup from itself to DmBranch.branch_code in ``branch_scope_field``.
+    """
+
+    def for_branches(self, branch_codes):
+        return self.filter(**{f"{self.model.branch_scope_field}__in": list(branch_codes)})
+
+
 class DmMachine(models.Model):
     branch_code = models.ForeignKey(DmBranch, to_field='branch_code', db_column='branch_code', on_delete=models.CASCADE)
     machine_code = models.CharField(max_length=50, unique=True)
     machine_name = models.CharField(max_length=100)
 
+    objects = BranchScopedQuerySet.as_manager()
+    branch_scope_field = 'branch_code'
+
     class Meta:
         db_table = "dm_machine"
         unique_together = ("branch_code", "machine_code")
@@ -40,11 +53,64 @@ class DmMachineLine(models.Model):
     line_code = models.CharField(max_length=20)
     line_name = models.CharField(max_length=100)
 
+    objects = BranchScopedQuerySet.as_manager()
+    branch_scope_field = 'machine_code__branch_code'
+
     class Meta:
         db_table = "dm_machine_line"
         unique_together = ("machine_code", "line_code")
 
 
+class DmPlantPath(models.Model):
+    """
+    Materialized-path index over DmFactory / DmBranch / DmMachine /
+    DmMachineLine.
+
+    One row per node carrying every ancestor code, so subtree ("all lines
+    under factory X") and ancestor ("which factory owns line L") questions
+    are a single indexed lookup instead of three FK hops. Maintained by
+    core.data_model.hierarchy through signals; rebuild it with
+    ``manage.py rebuild_plant_paths``.
+    """
+    NODE_FACTORY = 'factory'
+    NODE_BRANCH = 'branch'
+    NODE_MACHINE = 'machine'
+    NODE_LINE = 'line'
+    NODE_TYPES = [
+        (NODE_FACTORY, 'Factory'),
+        (NODE_BRANCH, 'Branch'),
+        (NODE_MACHINE, 'Machine'),
+        (NODE_LINE, 'Machine line'),
+    ]
+
+    node_type = models.CharField(max_length=10, choices=NODE_TYPES)
+    node_pk = models.CharField(max_length=50)
+    node_code = models.CharField(max_length=50)
+    depth = models.PositiveSmallIntegerField()
+    # Three codes of up to 50 characters, each escaped one taking three (see
+    # core.data_model.hierarchy), a line id of up to 20 digits and five slashes
+    path = models.CharField(max_length=3 * 50 * 3 + 20 + 5)
+
+    factory_code = models.CharField(max_length=50)
+    branch_code = models.CharField(max_length=50, null=True, blank=True)
+    machine_code = models.CharField(max_length=50, null=True, blank=True)
+    line_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'dm_plant_path'
+        unique_together = ('node_type', 'node_pk')
+        indexes = [
+            models.Index(fields=['node_type', 'node_code'], name='idx_plant_path_node'),
+            models.Index(fields=['factory_code', 'node_type'], name='idx_plant_path_factory'),
+            models.Index(fields=['branch_code', 'node_type'], name='idx_plant_path_branch'),
+            models.Index(fields=['machine_code', 'node_type'], name='idx_plant_path_machine'),
+            models.Index(fields=['path'], name='idx_plant_path_path'),
+        ]
+
+    def __str__(self):
+        return self.path
+
+
 class DmRoles(models.Model):
     role_id = models.AutoField(primary_key=True)
     role_code = models.CharField(max_length=50, unique=True)
@@ -165,4 +231,23 @@ class DmMappingAccountSpecialPermission(models.Model):
     updated_by = models.IntegerField(null=True, blank=True)
 
     class Meta:
-        db_table = 'dm_mapping_account_special_permission'
\ No newline at end of file
+        db_table = 'dm_mapping_account_special_permission'
+
+class DmCollectionVersion(models.Model):
+    """
+    Change counter per master-data collection.
+
+    Bumped by core.data_model.signals on every save/delete and read by the
+    API to build ETag / Last-Modified headers, so unchanged collections can
+    be answered with 304 without serializing anything. Lives in the database
+    so all workers agree on the current version.
+    """
+    collection = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dm_collection_version'
+
+    def __str__(self):
+        return f"{self.collection} v{self.version}"
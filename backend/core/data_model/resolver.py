@@ -0,0 +1,156 @@
+"""
+Effective permission resolver.
+
+Compiles an account's roles, app assignments and special allow/deny
+overrides into a compact in-process structure so that a permission check
+is a set lookup instead of a chain of joins over the varchar code FKs.
+
+Entries are dropped by the receivers in ``core.data_model.signals`` whenever
+one of the mapping tables changes, and expire after ``PERMISSION_CACHE_TTL``
+seconds so that workers which did not see the write still converge.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from configs.db_router import primary_alias
+from configs.metrics import CACHE_LOOKUPS
+from core.user.models import UserAccounts
+from .models import (
+    DmMappingAccountApp,
+    DmMappingAccountRole,
+    DmMappingAccountSpecialPermission,
+    DmMappingRolePermission,
+)
+
+
+DEFAULT_CACHE_TTL = 300
+
+
+class EffectivePermissions:
+    """Compiled rights of a single account"""
+    __slots__ = ('account_id', 'roles', 'apps', 'grants', 'compiled_at')
+
+    def __init__(self, account_id, roles, apps, grants):
+        self.account_id = account_id
+        self.roles = frozenset(roles)
+        self.apps = frozenset(apps)
+        # {(app_code, page_code, permission_id)}
+        self.grants = frozenset(grants)
+        self.compiled_at = time.monotonic()
+
+    def has_app(self, app_code):
+        return app_code in self.apps
+
+    def has_permission(self, app_code, page_code, permission_id):
+        return (app_code, page_code, permission_id) in self.grants
+
+    def pages(self, app_code):
+        """Page codes of an app the account holds at least one permission on"""
+        return {page for app, page, _ in self.grants if app == app_code}
+
+    def __repr__(self):
+        return f"<EffectivePermissions {self.account_id}: {len(self.grants)} grants>"
+
+
+_cache = {}
+_lock = threading.Lock()
+_generation = 0
+
+
+def _cache_ttl():
+    return getattr(settings, 'PERMISSION_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+
+def compile_permissions(account_id):
+    """
+    Build the effective permissions of an account from the database.
+
+    Roles come from the account's own role plus DmMappingAccountRole. Role
+    grants only count for apps the account is actively mapped to; special
+    permissions are applied last, allows first and then denies, so an explicit
+    deny always wins. Everything is read from the primary, as the result is
+    cached.
+    """
+    db = primary_alias()
+    roles = set(
+        DmMappingAccountRole.objects.using(db)
+        .filter(account_id=account_id)
+        .values_list('role_code', flat=True)
+    )
+    primary_role = (
+        UserAccounts.objects.using(db)
+        .filter(account_id=account_id)
+        .values_list('account_role', flat=True)
+        .first()
+    )
+    if primary_role:
+        roles.add(primary_role)
+
+    apps = set(
+        DmMappingAccountApp.objects.using(db)
+        .filter(account_id=account_id, is_active=True)
+        .values_list('app_code', flat=True)
+    )
+
+    grants = set()
+    if roles and apps:
+        grants.update(
+            DmMappingRolePermission.objects.using(db)
+            .filter(role_code__in=roles, app_code__in=apps)
+            .values_list('app_code', 'page_code', 'permission_id')
+        )
+
+    denied = set()
+    special = (
+        DmMappingAccountSpecialPermission.objects.using(db)
+        .filter(account_id=account_id)
+        .values_list('page_code__app_code', 'page_code', 'permission_id', 'is_allowed')
+    )
+    for app_code, page_code, permission_id, is_allowed in special:
+        key = (app_code, page_code, permission_id)
+        if is_allowed:
+            grants.add(key)
+        else:
+            denied.add(key)
+    grants -= denied
+
+    return EffectivePermissions(account_id, roles, apps, grants)
+
+
+def get_effective_permissions(account_id):
+    """Return the cached EffectivePermissions of an account, compiling on miss"""
+    entry = _cache.get(account_id)
+    if entry is not None and time.monotonic() - entry.compiled_at < _cache_ttl():
+        CACHE_LOOKUPS.inc(cache='permissions', result='hit')
+        return entry
+
+    CACHE_LOOKUPS.inc(cache='permissions', result='miss')
+    generation = _generation
+    entry = compile_permissions(account_id)
+    with _lock:
+        # Skip the store if an invalidation ran while we were compiling,
+        # otherwise a stale result could outlive the change.
+        if generation == _generation:
+            _cache[account_id] = entry
+    return entry
+
+
+def has_permission(account_id, app_code, page_code, permission_id):
+    return get_effective_permissions(account_id).has_permission(app_code, page_code, permission_id)
+
+
+def has_app(account_id, app_code):
+    return get_effective_permissions(account_id).has_app(app_code)
+
+
+def invalidate(account_id=None):
+    """Drop one account's compiled permissions, or all of them"""
+    global _generation
+    with _lock:
+        _generation += 1
+        if account_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(account_id, None)
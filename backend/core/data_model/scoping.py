@@ -0,0 +1,123 @@
+"""
+Branch-level row scoping driven by DmMappingAccountBranch.
+
+Models whose rows belong to a branch use BranchScopedQuerySet (see
+core.data_model.models), which filters in SQL with an IN on the indexed
+branch_code column, or a single join to it. This module resolves which
+branches the caller may see: once per request, from a per-account cache that
+the receivers in ``core.data_model.signals`` drop when the mapping changes.
+Views apply it through the BranchScopeFilter backend.
+
+Accounts holding one of BRANCH_SCOPE_UNRESTRICTED_ROLES see every branch.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from rest_framework.filters import BaseFilterBackend
+
+from configs.db_router import primary_alias
+from core.user.cache import TTLCache
+from .models import DmMappingAccountBranch
+from .resolver import get_effective_permissions
+
+
+DEFAULT_CACHE_TTL = 300
+
+branch_cache = TTLCache(
+    maxsize=getattr(settings, 'ACCOUNT_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'BRANCH_SCOPE_CACHE_TTL', DEFAULT_CACHE_TTL),
+    name='branch_scope',
+)
+_lock = threading.Lock()
+_generation = 0
+
+
+def get_account_branches(account_id):
+    """Return the frozenset of branch codes mapped to an account, read from the primary on a miss"""
+    branches = branch_cache.get(account_id)
+    if branches is not None:
+        return branches
+
+    generation = _generation
+    branches = frozenset(
+        DmMappingAccountBranch.objects.using(primary_alias())
+        .filter(account_id=account_id)
+        .values_list('branch_code', flat=True)
+    )
+    with _lock:
+        # Same guard as the permission resolver: never store a result
+        # computed across an invalidation
+        if generation == _generation:
+            branch_cache.set(account_id, branches)
+    return branches
+
+
+def invalidate(account_id=None):
+    global _generation
+    with _lock:
+        _generation += 1
+        if account_id is None:
+            branch_cache.clear()
+        else:
+            branch_cache.delete(account_id)
+
+
+def _is_unrestricted(account_id):
+    roles = getattr(settings, 'BRANCH_SCOPE_UNRESTRICTED_ROLES', ())
+    return bool(roles) and not get_effective_permissions(account_id).roles.isdisjoint(roles)
+
+
+def get_request_branches(request):
+    """
+    Branch codes the caller may see, or None when unrestricted. Resolved
+    once and kept on the request.
+    """
+    try:
+        return request._branch_scope
+    except AttributeError:
+        pass
+
+    account_id = getattr(request.user, 'account_id', None)
+    if account_id is None:
+        branches = frozenset()
+    elif _is_unrestricted(account_id):
+        branches = None
+    else:
+        branches = get_account_branches(account_id)
+    request._branch_scope = branches
+    return branches
+
+
+def scope_queryset(request, queryset):
+    """Restrict a BranchScopedQuerySet to the caller's branches"""
+    branches = get_request_branches(request)
+    if branches is None:
+        return queryset
+    if not branches:
+        return queryset.none()
+    return queryset.for_branches(branches)
+
+
+def in_scope(request, branch_code):
+    branches = get_request_branches(request)
+    return branches is None or branch_code in branches
+
+
+def branch_scope_tag(request):
+    """Short digest of the caller's branch set, for ETags of scoped responses"""
+    branches = get_request_branches(request)
+    if branches is None:
+        return 'all'
+    return hashlib.blake2s(','.join(sorted(branches)).encode(), digest_size=6).hexdigest()
+
+
+
+class BranchScopeFilter(BaseFilterBackend):
+    """
+    DRF filter backend for views over branch-scoped models:
+        filter_backends = [BranchScopeFilter]
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return scope_queryset(request, queryset)
@@ -0,0 +1,97 @@
+from rest_framework import serializers
+from .models import (
+    DmFactory,
+    DmBranch,
+    DmMachine,
+    DmMachineLine,
+    DmRoles,
+    DmPermissions,
+    DmAppName,
+    DmAppPageName,
+    DmMappingAccountRole,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+)
+
+
+AUDIT_FIELDS = ['created_at', 'created_by', 'updated_at', 'updated_by']
+
+
+# ============== PLANT SERIALIZERS ==============
+class DmFactorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmFactory
+        fields = ['factory_code', 'factory_name']
+
+
+class DmBranchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmBranch
+        fields = ['id', 'factory_code', 'branch_type', 'branch_code', 'branch_name']
+        read_only_fields = ['id']
+
+
+class DmMachineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmMachine
+        fields = ['id', 'branch_code', 'machine_code', 'machine_name']
+        read_only_fields = ['id']
+
+
+class DmMachineLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmMachineLine
+        fields = ['id', 'machine_code', 'line_code', 'line_name']
+        read_only_fields = ['id']
+
+
+# ============== ROLE / PERMISSION SERIALIZERS ==============
+class DmRolesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmRoles
+        fields = ['role_id', 'role_code', 'role_name', 'role_description'] + AUDIT_FIELDS
+        read_only_fields = ['role_id'] + AUDIT_FIELDS
+
+
+class DmPermissionsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmPermissions
+        fields = ['permission_id', 'permission_name', 'permission_description'] + AUDIT_FIELDS
+        read_only_fields = ['permission_id'] + AUDIT_FIELDS
+
+
+# ============== APP SERIALIZERS ==============
+class DmAppNameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmAppName
+        fields = ['app_id', 'app_code', 'app_name']
+        read_only_fields = ['app_id']
+
+
+class DmAppPageNameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmAppPageName
+        fields = ['page_id', 'app_code', 'page_code', 'page_name']
+        read_only_fields = ['page_id']
+
+
+# ============== MAPPING SERIALIZERS ==============
+class DmMappingAccountRoleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmMappingAccountRole
+        fields = ['id', 'account_id', 'role_code'] + AUDIT_FIELDS
+        read_only_fields = ['id'] + AUDIT_FIELDS
+
+
+class DmMappingAccountAppSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmMappingAccountApp
+        fields = ['id', 'account_id', 'app_code', 'is_active', 'created_at', 'created_by']
+        read_only_fields = ['id', 'created_at', 'created_by']
+
+
+class DmMappingAccountBranchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DmMappingAccountBranch
+        fields = ['id', 'account_id', 'branch_code', 'role_code']
+        read_only_fields = ['id']
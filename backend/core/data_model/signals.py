@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.user.models import UserAccounts
+from . import hierarchy, resolver, scoping
+from .versions import COLLECTIONS, register_collection
+from .models import (
+    DmBranch,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+    DmMappingAccountRole,
+    DmMappingAccountSpecialPermission,
+    DmMappingRolePermission,
+)
+
+
+# ============== PERMISSION RESOLVER INVALIDATION ==============
+@receiver([post_save, post_delete], sender=DmMappingAccountRole)
+@receiver([post_save, post_delete], sender=DmMappingAccountApp)
+@receiver([post_save, post_delete], sender=DmMappingAccountSpecialPermission)
+def invalidate_account_permissions(sender, instance, **kwargs):
+    resolver.invalidate(instance.account_id_id)
+
+
+@receiver([post_save, post_delete], sender=DmMappingRolePermission)
+def invalidate_role_permissions(sender, instance, **kwargs):
+    # A role grant can affect any number of accounts
+    resolver.invalidate()
+
+
+@receiver([post_save, post_delete], sender=UserAccounts)
+def invalidate_account_role(sender, instance, **kwargs):
+    resolver.invalidate(instance.account_id)
+
+
+# ============== BRANCH SCOPE INVALIDATION ==============
+@receiver([post_save, post_delete], sender=DmMappingAccountBranch)
+def invalidate_account_branches(sender, instance, **kwargs):
+    scoping.invalidate(instance.account_id_id)
+
+
+# ============== COLLECTION VERSIONS ==============
+for model, collection in list(COLLECTIONS.items()):
+    register_collection(model, collection)
+
+
+# ============== PLANT PATH INDEX ==============
+@receiver(post_save, sender=DmFactory)
+@receiver(post_save, sender=DmBranch)
+@receiver(post_save, sender=DmMachine)
+@receiver(post_save, sender=DmMachineLine)
+def refresh_plant_path(sender, instance, **kwargs):
+    hierarchy.refresh_node(instance)
+
+
+@receiver(post_delete, sender=DmFactory)
+@receiver(post_delete, sender=DmBranch)
+@receiver(post_delete, sender=DmMachine)
+@receiver(post_delete, sender=DmMachineLine)
+def remove_plant_path(sender, instance, **kwargs):
+    hierarchy.remove_node(instance)
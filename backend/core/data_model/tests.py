@@ -0,0 +1,415 @@
+import csv
+import importlib
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.user.authentication import account_cache
+from core.user.models import UserAccounts
+from core.user.permissions import grant_manager
+from core.user.tokens import get_tokens_for_user
+from . import hierarchy, importer, resolver
+from .models import (
+    DmAppName,
+    DmAppPageName,
+    DmBranch,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+    DmMappingAccountRole,
+    DmMappingAccountSpecialPermission,
+    DmMappingRolePermission,
+    DmPermissions,
+    DmPlantPath,
+    DmRoles,
+)
+from .versions import bump_version
+
+
+# ============== HIERARCHY ==============
+class PlantPathTests(TestCase):
+    def test_slash_in_code_stays_inside_its_segment(self):
+        factory = DmFactory.objects.create(factory_code='F', factory_name='F')
+        DmBranch.objects.create(factory_code=factory, branch_type='T', branch_code='X', branch_name='X')
+        # Unescaped, this factory's path would be '/F/X/', the path of branch X above
+        slashed = DmFactory.objects.create(factory_code='F/X', factory_name='F/X')
+
+        self.assertEqual(
+            DmPlantPath.objects.get(node_type=DmPlantPath.NODE_FACTORY, node_pk='F/X').path, '/F%2FX/'
+        )
+        slashed.delete()
+        self.assertTrue(DmPlantPath.objects.filter(node_type=DmPlantPath.NODE_BRANCH, node_code='X').exists())
+
+    def test_path_column_fits_the_longest_escaped_line_path(self):
+        code = '/' * 50
+        path = hierarchy.build_path(code, code, code, 2 ** 63 - 1)
+        self.assertLessEqual(len(path), DmPlantPath._meta.get_field('path').max_length)
+
+    def test_migration_indexes_existing_nodes(self):
+        factory = DmFactory.objects.create(factory_code='F', factory_name='F')
+        branch = DmBranch.objects.create(factory_code=factory, branch_type='T', branch_code='B', branch_name='B')
+        machine = DmMachine.objects.create(branch_code=branch, machine_code='M', machine_name='M')
+        line = DmMachineLine.objects.create(machine_code=machine, line_code='L', line_name='L')
+        # As for nodes created before 0007 added the table
+        DmPlantPath.objects.all().delete()
+
+        migration = importlib.import_module('core.data_model.migrations.0009_plant_path_length_backfill')
+        migration.rebuild_plant_paths(None, None)
+        self.assertEqual(hierarchy.ancestors(DmPlantPath.NODE_LINE, line.pk).path, f"/F/B/M/{line.pk}/")
+
+
+# ============== PLANT TREE ==============
+class PlantTreeScopeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = DmRoles.objects.create(role_code='R', role_name='R', created_by=0)
+        cls.admin_role = DmRoles.objects.create(role_code='ALL-BRANCHES', role_name='All branches', created_by=0)
+        for factory_code, branch_codes in (('F1', ('B1', 'B2')), ('F2', ('B3',))):
+            factory = DmFactory.objects.create(factory_code=factory_code, factory_name=factory_code)
+            for branch_code in branch_codes:
+                branch = DmBranch.objects.create(
+                    factory_code=factory, branch_type='T', branch_code=branch_code, branch_name=branch_code
+                )
+                machine = DmMachine.objects.create(
+                    branch_code=branch, machine_code=f"M-{branch_code}", machine_name='M'
+                )
+                DmMachineLine.objects.create(machine_code=machine, line_code='L1', line_name='L')
+
+        cls.scoped = UserAccounts.objects.create(user_id='U1', account_id='scoped', account_role=role)
+        cls.other = UserAccounts.objects.create(user_id='U2', account_id='other', account_role=role)
+        cls.admin = UserAccounts.objects.create(user_id='U3', account_id='admin', account_role=cls.admin_role)
+        DmMappingAccountBranch.objects.create(account_id=cls.scoped, branch_code_id='B2', role_code=role)
+        DmMappingAccountBranch.objects.create(account_id=cls.other, branch_code_id='B3', role_code=role)
+
+    def get(self, account, query=''):
+        access = get_tokens_for_user(account)['access']
+        return self.client.get(f"/data-model/tree/{query}", HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def branch_codes(self, response):
+        return [branch['branch_code'] for factory in response.json() for branch in factory['branches']]
+
+    def test_tree_only_holds_the_callers_branches(self):
+        response = self.get(self.scoped)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([factory['factory_code'] for factory in response.json()], ['F1'])
+        self.assertEqual(self.branch_codes(response), ['B2'])
+        self.assertEqual(response.json()[0]['branches'][0]['machines'][0]['lines'][0]['line_code'], 'L1')
+
+    def test_machine_and_line_lists_only_hold_the_callers_branches(self):
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {get_tokens_for_user(self.scoped)['access']}"}
+        machines = self.client.get('/data-model/machines/', **auth).json()
+        self.assertEqual([machine['machine_code'] for machine in machines], ['M-B2'])
+        lines = self.client.get('/data-model/machine-lines/', **auth).json()
+        self.assertEqual([line['machine_code'] for line in lines], ['M-B2'])
+        other = DmMachine.objects.get(machine_code='M-B1')
+        self.assertEqual(self.client.get(f"/data-model/machines/{other.pk}/", **auth).status_code, 404)
+
+    @override_settings(BRANCH_SCOPE_UNRESTRICTED_ROLES=['ALL-BRANCHES'])
+    def test_unrestricted_role_sees_every_branch(self):
+        self.assertEqual(self.branch_codes(self.get(self.admin)), ['B1', 'B2', 'B3'])
+
+    def test_etag_differs_per_scope(self):
+        scoped, other = self.get(self.scoped), self.get(self.other)
+        self.assertNotEqual(scoped['ETag'], other['ETag'])
+        access = get_tokens_for_user(self.other)['access']
+        response = self.client.get(
+            '/data-model/tree/', HTTP_AUTHORIZATION=f"Bearer {access}", HTTP_IF_NONE_MATCH=scoped['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.branch_codes(response), ['B3'])
+
+    @override_settings(BRANCH_SCOPE_UNRESTRICTED_ROLES=['ALL-BRANCHES'])
+    def test_versions_are_read_once(self):
+        self.get(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum('dm_collection_version' in query['sql'] for query in queries), 1)
+
+    def test_filters_outside_scope_are_forbidden(self):
+        self.assertEqual(self.get(self.scoped, '?branch=B1').status_code, 403)
+        self.assertEqual(self.get(self.scoped, '?factory=F2').status_code, 403)
+        self.assertEqual(self.get(self.scoped, '?factory=F9').status_code, 404)
+        response = self.get(self.scoped, '?factory=F1')
+        self.assertEqual([branch['branch_code'] for branch in response.json()['branches']], ['B2'])
+
+
+# ============== CONDITIONAL GET ==============
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = UserAccounts.objects.create(user_id='U-reader', account_id='reader')
+        grant_manager(cls.account)
+        cls.factory = DmFactory.objects.create(factory_code='CF', factory_name='Conditional')
+        DmFactory.objects.create(factory_code='CG', factory_name='Other')
+
+    def setUp(self):
+        resolver.invalidate()
+        account_cache.clear()
+        # Versions restart with every rolled-back test, so cached bodies must not outlive one
+        caches['default'].clear()
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {get_tokens_for_user(self.account)['access']}"}
+
+    def get(self, path, **headers):
+        return self.client.get(path, **self.auth, **headers)
+
+    def test_list_answers_304_until_a_write(self):
+        response = self.get('/data-model/factories/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        cached = self.get('/data-model/factories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(cached.content, b'')
+
+        created = self.client.post(
+            '/data-model/factories/', {'factory_code': 'CH', 'factory_name': 'New'},
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(created.status_code, 201)
+        response = self.get('/data-model/factories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('CH', [factory['factory_code'] for factory in response.json()])
+
+    def test_if_modified_since_answers_304(self):
+        response = self.get('/data-model/factories/')
+        cached = self.get('/data-model/factories/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_detail_etag_names_the_record(self):
+        first = self.get('/data-model/factories/CF/')
+        second = self.get('/data-model/factories/CG/')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.get('/data-model/factories/CG/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.assertEqual(self.get('/data-model/factories/CF/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_queryset_update_needs_an_explicit_bump(self):
+        etag = self.get('/data-model/factories/')['ETag']
+        DmFactory.objects.filter(pk=self.factory.pk).update(factory_name='Renamed')
+        self.assertEqual(self.get('/data-model/factories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_version('factory')
+        response = self.get('/data-model/factories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', [factory['factory_name'] for factory in response.json()])
+
+    def test_machine_etag_varies_with_the_branch_scope(self):
+        role = DmRoles.objects.create(role_code='CR', role_name='CR', created_by=0)
+        for code in ('CB1', 'CB2'):
+            branch = DmBranch.objects.create(factory_code=self.factory, branch_type='T', branch_code=code, branch_name=code)
+            DmMachine.objects.create(branch_code=branch, machine_code=f"M-{code}", machine_name='M')
+        etags = {}
+        for code in ('CB1', 'CB2'):
+            account = UserAccounts.objects.create(user_id=f"U-{code}", account_id=code.lower(), account_role=role)
+            DmMappingAccountBranch.objects.create(account_id=account, branch_code_id=code, role_code=role)
+            access = get_tokens_for_user(account)['access']
+            etags[code] = self.client.get('/data-model/machines/', HTTP_AUTHORIZATION=f"Bearer {access}")['ETag']
+        self.assertNotEqual(etags['CB1'], etags['CB2'])
+
+        response = self.client.get(
+            '/data-model/machines/', HTTP_AUTHORIZATION=f"Bearer {access}", HTTP_IF_NONE_MATCH=etags['CB1']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([machine['machine_code'] for machine in response.json()], ['M-CB2'])
+
+    def test_cached_reference_list_follows_writes(self):
+        DmRoles.objects.create(role_code='CACHED', role_name='Cached', created_by=0)
+        self.assertIn('CACHED', [role['role_code'] for role in self.get('/data-model/roles/').json()])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('/data-model/roles/')
+        self.assertIn('CACHED', [role['role_code'] for role in response.json()])
+        self.assertFalse(any('FROM "dm_roles"' in query['sql'] for query in queries))
+
+        DmRoles.objects.create(role_code='LATER', role_name='Later', created_by=0)
+        self.assertIn('LATER', [role['role_code'] for role in self.get('/data-model/roles/').json()])
+
+
+# ============== MASTER DATA IMPORT ==============
+def _row(**values):
+    return {column: values.get(column) for column in importer.COLUMNS}
+
+
+class MasterDataImportTests(TestCase):
+    def test_rows_rejected_by_the_database_are_reported_per_row(self):
+        process_chunk = importer._process_chunk
+
+        def process_with_dangling_fk(chunk, report, seen, dry_run):
+            levels = process_chunk(chunk, report, seen, dry_run)
+            if any(row['factory_code'] == 'BAD' for _, row in chunk):
+                DmMachine.objects.create(branch_code_id='NO-SUCH-BRANCH', machine_code='M-BAD', machine_name='x')
+                levels[2].changed.append('M-BAD')
+            return levels
+
+        rows = [
+            _row(factory_code='F1', factory_name='One', branch_code='B1', branch_type='T', branch_name='B'),
+            _row(factory_code='BAD', factory_name='Bad'),
+            _row(factory_code='F2', factory_name='Two'),
+        ]
+        with mock.patch.object(importer, '_process_chunk', process_with_dangling_fk):
+            report = importer.import_master_data(rows)
+
+        self.assertEqual([error['row'] for error in report.errors], [3])
+        self.assertIn('Rejected by the database', report.errors[0]['error'])
+        self.assertEqual(report.counts['factories']['created'], 2)
+        self.assertEqual(sorted(DmFactory.objects.values_list('factory_code', flat=True)), ['F1', 'F2'])
+        self.assertFalse(DmMachine.objects.exists())
+
+    def test_csv_file_is_closed(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('factory_code,factory_name\nF1,One\n')
+        self.addCleanup(os.remove, handle.name)
+
+        opened = []
+
+        def recording_open(*args, **kwargs):
+            opened.append(open(*args, **kwargs))
+            return opened[-1]
+
+        with mock.patch.object(importer, 'open', recording_open, create=True):
+            report = importer.import_master_data(importer.open_rows(handle.name))
+        self.assertEqual(report.counts['factories']['created'], 1)
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+    def test_paths_are_indexed_for_created_and_moved_nodes_only(self):
+        importer.import_master_data([
+            _row(factory_code='F1', factory_name='One', branch_code='B1', branch_type='T', branch_name='B',
+                 machine_code='M1', machine_name='M', line_code='L1', line_name='L'),
+            _row(factory_code='F2', factory_name='Two'),
+        ])
+        line = DmMachineLine.objects.get(line_code='L1')
+        self.assertEqual(hierarchy.ancestors(DmPlantPath.NODE_LINE, line.pk).path, f"/F1/B1/M1/{line.pk}/")
+
+        with CaptureQueriesContext(connection) as renamed:
+            importer.import_master_data([_row(factory_code='F1', branch_code='B1', branch_name='Renamed')])
+        self.assertFalse([query for query in renamed if 'dm_plant_path' in query['sql']])
+
+        importer.import_master_data([_row(factory_code='F2', branch_code='B1')])
+        self.assertEqual(hierarchy.ancestors(DmPlantPath.NODE_LINE, line.pk).path, f"/F2/B1/M1/{line.pk}/")
+        self.assertEqual(DmPlantPath.objects.count(), 5)
+
+
+class MasterDataImportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = DmRoles.objects.create(role_code='IMPORT', role_name='Import', created_by=0)
+        cls.manager = UserAccounts.objects.create(user_id='U-import', account_id='importer', account_role=role)
+        cls.clerk = UserAccounts.objects.create(user_id='U-import-2', account_id='import-clerk', account_role=role)
+        grant_manager(cls.manager)
+
+    def setUp(self):
+        resolver.invalidate()
+
+    def upload(self, name, content, account=None):
+        access = get_tokens_for_user(account or self.manager)['access']
+        return self.client.post(
+            '/data-model/import/', {'file': SimpleUploadedFile(name, content)},
+            HTTP_AUTHORIZATION=f"Bearer {access}",
+        )
+
+    def test_requires_the_manager_permission(self):
+        content = b'factory_code,factory_name\nF1,One\n'
+        self.assertEqual(self.upload('plant.csv', content, account=self.clerk).status_code, 403)
+        self.assertFalse(DmFactory.objects.exists())
+        self.assertEqual(self.upload('plant.csv', content).status_code, 200)
+        self.assertTrue(DmFactory.objects.filter(factory_code='F1').exists())
+
+    def test_unreadable_files_are_rejected(self):
+        files = {
+            'malformed csv': ('plant.csv', b'factory_code,factory_name\nF1,"' + b'x' * (csv.field_size_limit() + 1) + b'"\n'),
+            'not utf-8': ('plant.csv', b'factory_code,factory_name\nF1,\xff\xfe\n'),
+            'corrupt xlsx': ('plant.xlsx', b'PK\x03\x04 not really a workbook'),
+        }
+        for case, (name, content) in files.items():
+            with self.subTest(case):
+                response = self.upload(name, content)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Invalid file')
+        self.assertFalse(DmFactory.objects.exists())
+
+
+# ============== PERMISSION RESOLVER ==============
+class PermissionResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = DmRoles.objects.create(role_code='PICKER', role_name='Picker', created_by=0)
+        cls.account = UserAccounts.objects.create(user_id='U-picker', account_id='picker', account_role=cls.role)
+        cls.app = DmAppName.objects.create(app_code='WH', app_name='Warehouse')
+        cls.page = DmAppPageName.objects.create(app_code=cls.app, page_code='WH-STOCK', page_name='Stock')
+        cls.view, cls.edit = (
+            DmPermissions.objects.create(permission_name=name, created_by=0) for name in ('View', 'Edit')
+        )
+        DmMappingRolePermission.objects.create(
+            role_code=cls.role, app_code=cls.app, page_code=cls.page, permission_id=cls.view, created_by=0
+        )
+
+    def setUp(self):
+        resolver.invalidate()
+
+    def grant(self, permission):
+        return ('WH', 'WH-STOCK', permission.pk)
+
+    def test_role_grants_count_only_for_active_apps(self):
+        self.assertFalse(resolver.has_permission('picker', *self.grant(self.view)))
+        mapping = DmMappingAccountApp.objects.create(account_id=self.account, app_code=self.app, created_by=0)
+        self.assertTrue(resolver.has_permission('picker', *self.grant(self.view)))
+        mapping.is_active = False
+        mapping.save()
+        self.assertFalse(resolver.has_app('picker', 'WH'))
+
+    def test_special_deny_beats_role_grant_and_allow_adds_one(self):
+        DmMappingAccountApp.objects.create(account_id=self.account, app_code=self.app, created_by=0)
+        DmMappingAccountSpecialPermission.objects.create(
+            account_id=self.account, page_code=self.page, permission_id=self.view, is_allowed=False, created_by=0
+        )
+        DmMappingAccountSpecialPermission.objects.create(
+            account_id=self.account, page_code=self.page, permission_id=self.edit, created_by=0
+        )
+        permissions = resolver.get_effective_permissions('picker')
+        self.assertEqual(permissions.grants, {self.grant(self.edit)})
+        self.assertEqual(permissions.pages('WH'), {'WH-STOCK'})
+
+    def test_cached_until_a_mapping_changes(self):
+        DmMappingAccountApp.objects.create(account_id=self.account, app_code=self.app, created_by=0)
+        first = resolver.get_effective_permissions('picker')
+        with self.assertNumQueries(0):
+            self.assertIs(resolver.get_effective_permissions('picker'), first)
+
+        # A role grant may concern any account, so it drops every entry
+        DmMappingRolePermission.objects.create(
+            role_code=self.role, app_code=self.app, page_code=self.page, permission_id=self.edit, created_by=0
+        )
+        self.assertTrue(resolver.has_permission('picker', *self.grant(self.edit)))
+
+        other = DmRoles.objects.create(role_code='PACKER', role_name='Packer', created_by=0)
+        DmMappingAccountRole.objects.create(account_id=self.account, role_code=other, created_by=0)
+        self.assertEqual(resolver.get_effective_permissions('picker').roles, {'PICKER', 'PACKER'})
+
+    @override_settings(PERMISSION_CACHE_TTL=0)
+    def test_entries_expire_after_the_ttl(self):
+        first = resolver.get_effective_permissions('picker')
+        self.assertIsNot(resolver.get_effective_permissions('picker'), first)
+
+    def test_result_compiled_across_an_invalidation_is_not_stored(self):
+        compile_permissions = resolver.compile_permissions
+
+        def compile_during_a_write(account_id):
+            entry = compile_permissions(account_id)
+            resolver.invalidate(account_id)
+            return entry
+
+        with mock.patch.object(resolver, 'compile_permissions', compile_during_a_write):
+            resolver.get_effective_permissions('picker')
+        self.assertNotIn('picker', resolver._cache)
@@ -0,0 +1,128 @@
+"""
+Pre-encoded factory -> branch -> machine -> line tree.
+
+The tree is built with one values() query per level and kept as JSON bytes,
+together with a blob per factory and per branch for filtered requests. It is
+rebuilt only when the DmCollectionVersion of one of the four tables moves,
+so serving it costs a single version lookup, shared with the ETag check.
+Callers limited to some branches get render_scoped(): the blobs of their
+branches joined under the pre-encoded head of each factory.
+"""
+import json
+import threading
+
+from .models import DmBranch, DmFactory, DmMachine, DmMachineLine
+from .versions import get_versions
+
+
+TREE_COLLECTIONS = ('factory', 'branch', 'machine', 'machine_line')
+
+
+class TreeSnapshot:
+    __slots__ = ('versions', 'full', 'factories', 'branches', 'factory_heads')
+
+    def __init__(self, versions, full, factories, branches, factory_heads):
+        self.versions = versions
+        self.full = full
+        self.factories = factories
+        self.branches = branches
+        # {factory_code: (JSON up to the opening of its branch list, [branch_code])}, in tree order
+        self.factory_heads = factory_heads
+
+    def render_scoped(self, branch_codes, factory_code=None):
+        """
+        JSON of the tree, or of one factory, keeping only ``branch_codes``;
+        None when none of them falls under the requested factory
+        """
+        factory_codes = [factory_code] if factory_code is not None else self.factory_heads
+        parts = []
+        for code in factory_codes:
+            head, branches = self.factory_heads.get(code, (None, ()))
+            allowed = [self.branches[branch] for branch in branches if branch in branch_codes]
+            if allowed:
+                parts.append(head + b','.join(allowed) + b']}')
+        if factory_code is not None:
+            return parts[0] if parts else None
+        return b'[' + b','.join(parts) + b']'
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def build_tree():
+    """Return the nested hierarchy as a list of factory dicts"""
+    lines_by_machine = {}
+    for line in (
+        DmMachineLine.objects
+        .order_by('machine_code', 'line_code')
+        .values('id', 'machine_code', 'line_code', 'line_name')
+    ):
+        lines_by_machine.setdefault(line.pop('machine_code'), []).append(line)
+
+    machines_by_branch = {}
+    for machine in (
+        DmMachine.objects
+        .order_by('branch_code', 'machine_code')
+        .values('id', 'branch_code', 'machine_code', 'machine_name')
+    ):
+        machine['lines'] = lines_by_machine.get(machine['machine_code'], [])
+        machines_by_branch.setdefault(machine.pop('branch_code'), []).append(machine)
+
+    branches_by_factory = {}
+    for branch in (
+        DmBranch.objects
+        .order_by('factory_code', 'branch_code')
+        .values('id', 'factory_code', 'branch_type', 'branch_code', 'branch_name')
+    ):
+        branch['machines'] = machines_by_branch.get(branch['branch_code'], [])
+        branches_by_factory.setdefault(branch.pop('factory_code'), []).append(branch)
+
+    factories = []
+    for factory in DmFactory.objects.order_by('factory_code').values('factory_code', 'factory_name'):
+        factory['branches'] = branches_by_factory.get(factory['factory_code'], [])
+        factories.append(factory)
+    return factories
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_snapshot(versions=None):
+    """
+    Return the current TreeSnapshot, rebuilding it if any level changed.
+    ``versions`` are collection versions the caller already read (see
+    versions.conditional); they are looked up when not given.
+    """
+    global _snapshot
+    if versions is None:
+        versions, _ = get_versions(*TREE_COLLECTIONS)
+    key = tuple(versions[collection] for collection in TREE_COLLECTIONS)
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.versions == key:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and _snapshot.versions == key:
+            return _snapshot
+        tree = build_tree()
+        snapshot = TreeSnapshot(
+            versions=key,
+            full=_encode(tree),
+            factories={factory['factory_code']: _encode(factory) for factory in tree},
+            branches={
+                branch['branch_code']: _encode(branch)
+                for factory in tree for branch in factory['branches']
+            },
+            factory_heads={
+                factory['factory_code']: (
+                    _encode({**factory, 'branches': []})[:-2],
+                    [branch['branch_code'] for branch in factory['branches']],
+                )
+                for factory in tree
+            },
+        )
+        _snapshot = snapshot
+        return snapshot
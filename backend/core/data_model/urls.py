@@ -2,6 +2,10 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    # Plant hierarchy
+    path('tree/', views.plant_tree, name='plant-tree'),
+    path('import/', views.master_data_import, name='master-data-import'),
+    
     # Factory
     path('factories/', views.factory_list, name='factory-list'),
     path('factories/<str:factory_code>/', views.factory_detail, name='factory-detail'),
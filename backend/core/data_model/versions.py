@@ -0,0 +1,171 @@
+"""
+Collection versions for conditional GET.
+
+Every versioned model maps to a collection name. Writes bump the collection's
+row in DmCollectionVersion (see core.data_model.signals); views turn the
+current version into an ETag and its timestamp into Last-Modified. Code that
+writes through QuerySet.update() or bulk_create() bypasses the signals and
+must call bump_version() itself. Other apps version their own models with
+register_collection() (see core.user.signals).
+
+Since the versions live in the database, every worker sees a bump at once,
+which also makes them safe cache keys: conditional(..., cache=True) keeps the
+rendered body in Django's cache under the current ETag, so a write simply
+moves readers on to a new key whatever the cache backend.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from configs.metrics import CACHE_LOOKUPS
+from .models import (
+    DmAppName,
+    DmAppPageName,
+    DmBranch,
+    DmCollectionVersion,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+    DmMappingAccountRole,
+    DmPermissions,
+    DmRoles,
+)
+
+
+COLLECTIONS = {
+    DmFactory: 'factory',
+    DmBranch: 'branch',
+    DmMachine: 'machine',
+    DmMachineLine: 'machine_line',
+    DmRoles: 'role',
+    DmPermissions: 'permission',
+    DmAppName: 'app',
+    DmAppPageName: 'app_page',
+    DmMappingAccountRole: 'mapping_account_role',
+    DmMappingAccountApp: 'mapping_account_app',
+    DmMappingAccountBranch: 'mapping_account_branch',
+}
+
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def bump_version(*collections):
+    now = timezone.now()
+    for collection in collections:
+        updated = (
+            DmCollectionVersion.objects
+            .filter(collection=collection)
+            .update(version=F('version') + 1, updated_at=now)
+        )
+        if not updated:
+            _, created = DmCollectionVersion.objects.get_or_create(
+                collection=collection, defaults={'version': 1}
+            )
+            if not created:
+                DmCollectionVersion.objects.filter(collection=collection).update(
+                    version=F('version') + 1, updated_at=now
+                )
+
+
+def bump_collection_version(sender, **kwargs):
+    bump_version(COLLECTIONS[sender])
+
+
+def register_collection(model, collection):
+    """Version ``model`` as ``collection``, bumped by every ORM save and delete"""
+    COLLECTIONS[model] = collection
+    post_save.connect(bump_collection_version, sender=model, dispatch_uid=f"bump_version_save_{model.__name__}")
+    post_delete.connect(bump_collection_version, sender=model, dispatch_uid=f"bump_version_delete_{model.__name__}")
+
+
+def get_versions(*collections):
+    """Return ({collection: version}, latest updated_at or None) in one query"""
+    rows = DmCollectionVersion.objects.filter(collection__in=collections).values_list(
+        'collection', 'version', 'updated_at'
+    )
+    versions = {collection: 0 for collection in collections}
+    last_modified = None
+    for collection, version, updated_at in rows:
+        versions[collection] = version
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def _cached_view(view, request, tag, args, kwargs):
+    """Serve the rendered body stored for ``tag``, rendering and storing it on a miss"""
+    cache = caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')]
+    digest = hashlib.sha1(f"{request.get_full_path()}|{tag}".encode()).hexdigest()
+    cache_key = f"refdata:{digest}"
+
+    body = cache.get(cache_key)
+    if body is not None:
+        CACHE_LOOKUPS.inc(cache='reference_data', result='hit')
+        return HttpResponse(body, content_type='application/json')
+
+    CACHE_LOOKUPS.inc(cache='reference_data', result='miss')
+    response = view(request, *args, **kwargs)
+    if response.status_code != 200 or not isinstance(response, Response):
+        return response
+    # The API's own JSON renderer, as the response would have been rendered with
+    body = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(response.data)
+    cache.set(cache_key, body, getattr(settings, 'REFERENCE_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return HttpResponse(body, content_type='application/json')
+
+
+def conditional(*collections, key=None, vary=None, cache=False):
+    """
+    Answer GET/HEAD with 304 when the client already holds the current
+    version of ``collections``; otherwise run the view and stamp ETag and
+    Last-Modified on its response. ``key`` names a URL kwarg (e.g. 'pk') that
+    is folded into the ETag for detail views. ``vary`` is a callable of the
+    request whose result is folded in too, for responses that differ per
+    caller (e.g. core.data_model.scoping.branch_scope_tag). With ``cache``
+    the JSON body is kept in Django's cache under the ETag, for small
+    reference tables read far more often than written. The versions read
+    are left on ``request.collection_versions`` for the view.
+
+    Apply it under @api_view so authentication still runs first.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            versions, last_modified = get_versions(*collections)
+            request.collection_versions = versions
+            tag = '.'.join(f"{collection}-{versions[collection]}" for collection in collections)
+            if key is not None:
+                tag = f"{tag}:{kwargs[key]}"
+            if vary is not None:
+                tag = f"{tag};{vary(request)}"
+            etag = quote_etag(tag)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                if cache:
+                    response = _cached_view(view, request, tag, args, kwargs)
+                else:
+                    response = view(request, *args, **kwargs)
+            if 200 <= response.status_code < 300 or response.status_code == 304:
+                response.headers.setdefault('ETag', etag)
+                if timestamp is not None:
+                    response.headers.setdefault('Last-Modified', http_date(timestamp))
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -1,3 +1,386 @@
-from django.shortcuts import render
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from django.db.models import ProtectedError
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
 
-# Create your views here.
+from core.user.fast_serializers import serialize_list
+from core.user.permissions import CanManageAccess
+from .models import (
+    DmFactory,
+    DmBranch,
+    DmMachine,
+    DmMachineLine,
+    DmRoles,
+    DmPermissions,
+    DmAppName,
+    DmAppPageName,
+    DmMappingAccountRole,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+)
+from .serializers import (
+    DmFactorySerializer,
+    DmBranchSerializer,
+    DmMachineSerializer,
+    DmMachineLineSerializer,
+    DmRolesSerializer,
+    DmPermissionsSerializer,
+    DmAppNameSerializer,
+    DmAppPageNameSerializer,
+    DmMappingAccountRoleSerializer,
+    DmMappingAccountAppSerializer,
+    DmMappingAccountBranchSerializer,
+)
+from .importer import ImportFileError, import_master_data, open_rows
+from .scoping import BranchScopeFilter, branch_scope_tag, get_request_branches, in_scope
+from .tree import TREE_COLLECTIONS, get_snapshot
+from .versions import conditional
+
+
+OUT_OF_SCOPE = {'error': 'Forbidden', 'message': 'Branch is outside your scope.'}
+
+
+def _request_user_id(request):
+    return request.user.id if hasattr(request, 'user') else None
+
+
+def _out_of_scope(request, serializer, branch_of):
+    """True when a write would place the row in a branch the caller cannot see"""
+    if branch_of is None:
+        return False
+    branch_code = branch_of(serializer.validated_data)
+    return branch_code is not None and not in_scope(request, branch_code)
+
+
+def _filter_queryset(request, queryset, filter_backends):
+    """Apply DRF filter backends, as GenericAPIView.filter_queryset does"""
+    view = request.parser_context.get('view')
+    for backend in filter_backends:
+        queryset = backend().filter_queryset(request, queryset, view)
+    return queryset
+
+
+def _list_create(request, queryset, serializer_class, audit=False, branch_of=None, filter_backends=()):
+    """
+    GET: List all rows, narrowed by ``filter_backends``
+    POST: Create a row (stamping created_by when the model is audited)
+
+    ``branch_of`` maps validated data to the target branch_code of a
+    branch-scoped model, so writes outside the caller's branches are refused.
+    """
+    if request.method == 'GET':
+        queryset = _filter_queryset(request, queryset, filter_backends)
+        return Response(serialize_list(queryset, serializer_class))
+
+    serializer = serializer_class(data=request.data)
+    if serializer.is_valid():
+        if _out_of_scope(request, serializer, branch_of):
+            return Response(OUT_OF_SCOPE, status=status.HTTP_403_FORBIDDEN)
+        extra = {'created_by': _request_user_id(request) or 0} if audit else {}
+        instance = serializer.save(**extra)
+        return Response(serializer_class(instance).data, status=status.HTTP_201_CREATED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _detail(request, instance, serializer_class, audit=False, branch_of=None):
+    """
+    GET: Retrieve a row
+    PUT: Partially update a row (stamping updated_by when the model is audited)
+    DELETE: Delete a row
+    """
+    if request.method == 'GET':
+        return Response(serializer_class(instance).data)
+
+    if request.method == 'PUT':
+        serializer = serializer_class(instance, data=request.data, partial=True)
+        if serializer.is_valid():
+            if _out_of_scope(request, serializer, branch_of):
+                return Response(OUT_OF_SCOPE, status=status.HTTP_403_FORBIDDEN)
+            extra = {'updated_by': _request_user_id(request)} if audit else {}
+            instance = serializer.save(**extra)
+            return Response(serializer_class(instance).data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        instance.delete()
+    except ProtectedError:
+        return Response(
+            {'error': 'Cannot delete a record that is still referenced by other records.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ============== FACTORY VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@conditional('factory')
+def factory_list(request):
+    return _list_create(request, DmFactory.objects.all(), DmFactorySerializer)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@conditional('factory', key='factory_code')
+def factory_detail(request, factory_code):
+    factory = get_object_or_404(DmFactory, factory_code=factory_code)
+    return _detail(request, factory, DmFactorySerializer)
+
+
+# ============== BRANCH VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@conditional('branch')
+def branch_list(request):
+    return _list_create(request, DmBranch.objects.all(), DmBranchSerializer)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@conditional('branch', key='pk')
+def branch_detail(request, pk):
+    branch = get_object_or_404(DmBranch, pk=pk)
+    return _detail(request, branch, DmBranchSerializer)
+
+
+# ============== MACHINE VIEWS ==============
+def _machine_branch(data):
+    branch = data.get('branch_code')
+    return branch.branch_code if branch is not None else None
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@conditional('machine', vary=branch_scope_tag)
+def machine_list(request):
+    return _list_create(
+        request, DmMachine.objects.select_related('branch_code'), DmMachineSerializer,
+        branch_of=_machine_branch, filter_backends=[BranchScopeFilter],
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@conditional('machine', key='pk', vary=branch_scope_tag)
+def machine_detail(request, pk):
+    machine = get_object_or_404(_filter_queryset(request, DmMachine.objects.all(), [BranchScopeFilter]), pk=pk)
+    return _detail(request, machine, DmMachineSerializer, branch_of=_machine_branch)
+
+
+# ============== MACHINE LINE VIEWS ==============
+def _line_branch(data):
+    machine = data.get('machine_code')
+    return machine.branch_code_id if machine is not None else None
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@conditional('machine_line', vary=branch_scope_tag)
+def machine_line_list(request):
+    return _list_create(
+        request, DmMachineLine.objects.select_related('machine_code'), DmMachineLineSerializer,
+        branch_of=_line_branch, filter_backends=[BranchScopeFilter],
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@conditional('machine_line', key='pk', vary=branch_scope_tag)
+def machine_line_detail(request, pk):
+    line = get_object_or_404(_filter_queryset(request, DmMachineLine.objects.all(), [BranchScopeFilter]), pk=pk)
+    return _detail(request, line, DmMachineLineSerializer, branch_of=_line_branch)
+
+
+# ============== ROLE VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('role', cache=True)
+def role_list(request):
+    return _list_create(request, DmRoles.objects.all(), DmRolesSerializer, audit=True)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('role', key='pk')
+def role_detail(request, pk):
+    role = get_object_or_404(DmRoles, pk=pk)
+    return _detail(request, role, DmRolesSerializer, audit=True)
+
+
+# ============== PERMISSION VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('permission', cache=True)
+def permission_list(request):
+    return _list_create(request, DmPermissions.objects.all(), DmPermissionsSerializer, audit=True)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('permission', key='pk')
+def permission_detail(request, pk):
+    permission = get_object_or_404(DmPermissions, pk=pk)
+    return _detail(request, permission, DmPermissionsSerializer, audit=True)
+
+
+# ============== APP VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('app', cache=True)
+def app_list(request):
+    return _list_create(request, DmAppName.objects.all(), DmAppNameSerializer)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('app', key='pk')
+def app_detail(request, pk):
+    app = get_object_or_404(DmAppName, pk=pk)
+    return _detail(request, app, DmAppNameSerializer)
+
+
+# ============== APP PAGE VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('app_page', cache=True)
+def app_page_list(request):
+    return _list_create(request, DmAppPageName.objects.select_related('app_code'), DmAppPageNameSerializer)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('app_page', key='pk')
+def app_page_detail(request, pk):
+    page = get_object_or_404(DmAppPageName, pk=pk)
+    return _detail(request, page, DmAppPageNameSerializer)
+
+
+# ============== MAPPING ACCOUNT ROLE VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_role')
+def mapping_account_role_list(request):
+    return _list_create(
+        request,
+        DmMappingAccountRole.objects.select_related('account_id', 'role_code'),
+        DmMappingAccountRoleSerializer,
+        audit=True
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_role', key='pk')
+def mapping_account_role_detail(request, pk):
+    mapping = get_object_or_404(DmMappingAccountRole, pk=pk)
+    return _detail(request, mapping, DmMappingAccountRoleSerializer, audit=True)
+
+
+# ============== MAPPING ACCOUNT APP VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_app')
+def mapping_account_app_list(request):
+    return _list_create(
+        request,
+        DmMappingAccountApp.objects.select_related('account_id', 'app_code'),
+        DmMappingAccountAppSerializer,
+        audit=True
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_app', key='pk')
+def mapping_account_app_detail(request, pk):
+    mapping = get_object_or_404(DmMappingAccountApp, pk=pk)
+    return _detail(request, mapping, DmMappingAccountAppSerializer)
+
+
+# ============== MAPPING ACCOUNT BRANCH VIEWS ==============
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_branch')
+def mapping_account_branch_list(request):
+    return _list_create(
+        request,
+        DmMappingAccountBranch.objects.select_related('account_id', 'branch_code', 'role_code'),
+        DmMappingAccountBranchSerializer
+    )
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@conditional('mapping_account_branch', key='pk')
+def mapping_account_branch_detail(request, pk):
+    mapping = get_object_or_404(DmMappingAccountBranch, pk=pk)
+    return _detail(request, mapping, DmMappingAccountBranchSerializer)
+
+
+# ============== PLANT TREE VIEWS ==============
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional(*TREE_COLLECTIONS, vary=branch_scope_tag)
+def plant_tree(request):
+    """
+    Factory -> branch -> machine -> line hierarchy, served from a
+    pre-encoded snapshot and limited to the caller's branches
+    Query (optional): factory=<factory_code> or branch=<branch_code>
+    """
+    snapshot = get_snapshot(request.collection_versions)
+    factory_code = request.query_params.get('factory')
+    branch_code = request.query_params.get('branch')
+    branches = get_request_branches(request)
+
+    if branch_code:
+        if not in_scope(request, branch_code):
+            return Response(OUT_OF_SCOPE, status=status.HTTP_403_FORBIDDEN)
+        blob = snapshot.branches.get(branch_code)
+    elif branches is not None:
+        blob = snapshot.render_scoped(branches, factory_code or None)
+        if blob is None and factory_code in snapshot.factories:
+            return Response(OUT_OF_SCOPE, status=status.HTTP_403_FORBIDDEN)
+    elif factory_code:
+        blob = snapshot.factories.get(factory_code)
+    else:
+        blob = snapshot.full
+
+    if blob is None:
+        return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(blob, content_type='application/json')
+
+
+# ============== MASTER DATA IMPORT VIEWS ==============
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, CanManageAccess])
+@parser_classes([MultiPartParser])
+def master_data_import(request):
+    """
+    Upsert factories, branches, machines and lines from an uploaded file
+    Request (multipart): file=<.csv|.xlsx>, dry_run=true|false
+
+    Response:
+    {
+        "dry_run", "rows",
+        "factories": {"created", "updated", "unchanged"}, "branches": {...},
+        "machines": {...}, "lines": {...},
+        "errors": [{"row", "error"}]
+    }
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'File required'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+    try:
+        report = import_master_data(open_rows(upload.file, filename=upload.name), dry_run=dry_run)
+    except ImportFileError as e:
+        return Response({
+            'error': 'Invalid file',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict())
@@ -0,0 +1,108 @@
+"""
+Async authentication views, served natively when running under configs.asgi.
+
+Hash verification goes through core.user.hashing.password_pool so a burst of
+logins cannot monopolise the worker; once the pool is saturated requests are
+rejected with 503 instead of queueing.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+
+from configs.metrics import LOGINS, LOGIN_OUTCOMES, count_outcomes
+from .hashing import HashQueueFull, password_pool
+from .last_login import last_login_buffer
+from .models import UserAccounts, UserCustomUsers
+from .serializers import LoginSerializer
+from .tokens import get_tokens_for_user
+
+
+RETRY_AFTER_SECONDS = 1
+
+
+@csrf_exempt
+@require_POST
+@count_outcomes(LOGINS, LOGIN_OUTCOMES)
+async def login_async_view(request):
+    """
+    Same contract as views.login_view
+
+    Extra response:
+    503 { "error": "Server busy" } with Retry-After when the hashing queue is full
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        payload = None
+
+    serializer = LoginSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse({
+            'error': 'Invalid input',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    account_id = serializer.validated_data['account_id']
+    password = serializer.validated_data['password']
+
+    try:
+        user_account = await (
+            UserAccounts.objects
+            .select_related('user_account__user_status')
+            .aget(account_id=account_id)
+        )
+    except UserAccounts.DoesNotExist:
+        return JsonResponse({
+            'error': 'Invalid credentials',
+            'message': 'Incorrect username or password'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        is_valid = await password_pool.check(password, user_account.account_password)
+    except HashQueueFull:
+        response = JsonResponse({
+            'error': 'Server busy',
+            'message': 'Too many login attempts in progress. Please retry shortly.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response
+
+    if not is_valid:
+        return JsonResponse({
+            'error': 'Invalid credentials',
+            'message': 'Incorrect username or password'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    try:
+        custom_user = user_account.user_account
+    except UserCustomUsers.DoesNotExist:
+        return JsonResponse({
+            'error': 'User not found',
+            'message': 'User profile not found. Please contact administrator.'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if custom_user.user_status.status_name.lower() != 'active':
+        return JsonResponse({
+            'error': 'Account inactive',
+            'message': 'Your account is not active. Please contact administrator.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    last_login_buffer.record(user_account)
+    tokens = await sync_to_async(get_tokens_for_user)(user_account)
+
+    return JsonResponse({
+        'user_id': custom_user.user_id,
+        'account_id': user_account.account_id,
+        'user_name': custom_user.user_name,
+        'user_full_name': custom_user.user_full_name,
+        'user_email': custom_user.user_email or '',
+        'access_token': tokens['access'],
+        'refresh_token': tokens['refresh'],
+        'token_type': 'Bearer',
+        'expires_in': 3600,  # 1 hour in seconds
+        'last_login': user_account.account_last_login
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,52 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from configs.db_router import primary_alias, set_request_account
+from .cache import TTLCache
+from .models import UserAccounts
+
+
+account_cache = TTLCache(
+    maxsize=getattr(settings, 'ACCOUNT_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'ACCOUNT_CACHE_TTL', 300),
+    name='account',
+)
+
+
+def get_cached_account(account_id):
+    """
+    Return a UserAccounts by account_id, reading through account_cache.
+    Misses read the primary, so a replica's lag never gets cached.
+    """
+    account = account_cache.get(account_id)
+    if account is None:
+        account = UserAccounts.objects.using(primary_alias()).filter(account_id=account_id).first()
+        if account is None:
+            return None
+        account_cache.set(account_id, account)
+    # Hand out a copy so a view mutating request.user never leaks into the cache
+    return copy.copy(account)
+
+
+class UserAccountJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves core.user.models.UserAccounts from the
+    token's account_id claim instead of django.contrib.auth's User table.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            account_id = validated_token['account_id']
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        account = get_cached_account(account_id)
+        if account is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        # Lets the replica router keep an account that just wrote on the primary
+        set_request_account(account_id)
+        return account
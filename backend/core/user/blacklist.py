@@ -0,0 +1,147 @@
+"""
+In-process mirror of rest_framework_simplejwt's token blacklist.
+
+Revocation checks are answered from a dict of ``jti -> expiry`` so they stay
+O(1) however large the BlacklistedToken table grows. The mirror is loaded
+once from the database and then, every BLACKLIST_SYNC_INTERVAL seconds, pulls
+the rows blacklisted since the newest one it has seen, which is how
+revocations made by other workers arrive.
+
+blacklisted_at is stamped before the writing transaction commits, so a row
+can become visible with a timestamp older than rows already pulled. Each pull
+therefore reaches BLACKLIST_SYNC_OVERLAP seconds further back, and the whole
+mirror is reloaded every BLACKLIST_FULL_SYNC_INTERVAL seconds for transactions
+slower than that. Entries are dropped once the token has expired, since an
+expired token is rejected on its exp claim anyway.
+"""
+import threading
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from configs.metrics import TOKENS_BLACKLISTED
+
+
+DEFAULT_SYNC_INTERVAL = 5
+DEFAULT_SYNC_OVERLAP = 60
+DEFAULT_FULL_SYNC_INTERVAL = 300
+
+
+def _epoch(value):
+    if timezone.is_naive(value):
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value.timestamp()
+
+
+class BlacklistCache:
+    def __init__(self, sync_interval, overlap=DEFAULT_SYNC_OVERLAP, full_sync_interval=DEFAULT_FULL_SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.full_sync_interval = full_sync_interval
+        self._revoked = {}
+        self._watermark = None
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, since=None):
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        if since is not None:
+            rows = rows.filter(blacklisted_at__gte=since)
+        return list(rows.values_list('blacklisted_at', 'token__jti', 'token__expires_at'))
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.sync_interval:
+            return
+
+        with self._lock:
+            if not force and now - self._synced_at < self.sync_interval:
+                return
+            full = self._watermark is None or now - self._full_synced_at >= self.full_sync_interval
+            rows = self._load(None if full else self._watermark - self.overlap)
+            if full:
+                self._revoked = {}
+                self._full_synced_at = now
+            for blacklisted_at, jti, expires_at in rows:
+                self._revoked[jti] = _epoch(expires_at)
+                if self._watermark is None or blacklisted_at > self._watermark:
+                    self._watermark = blacklisted_at
+            if self._watermark is None:
+                # Empty table: later pulls start from now, minus the overlap
+                self._watermark = timezone.now()
+            self._prune_locked()
+            self._synced_at = now
+
+    def _prune_locked(self):
+        cutoff = time.time()
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= cutoff]
+        for jti in expired:
+            del self._revoked[jti]
+
+    def is_revoked(self, jti):
+        self.sync()
+        return jti in self._revoked
+
+    def revoke(self, token):
+        """Persist a token to the blacklist and mirror it immediately"""
+        jti = token[api_settings.JTI_CLAIM]
+        exp = token['exp']
+
+        outstanding, _ = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                'token': str(token),
+                'expires_at': datetime_from_epoch(exp),
+            },
+        )
+        blacklisted, created = BlacklistedToken.objects.get_or_create(token=outstanding)
+        if created:
+            TOKENS_BLACKLISTED.inc()
+
+        with self._lock:
+            self._revoked[jti] = float(exp)
+        return blacklisted
+
+    def reset(self):
+        with self._lock:
+            self._revoked = {}
+            self._watermark = None
+            self._synced_at = 0.0
+            self._full_synced_at = 0.0
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+blacklist_cache = BlacklistCache(
+    sync_interval=getattr(settings, 'BLACKLIST_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL),
+    overlap=getattr(settings, 'BLACKLIST_SYNC_OVERLAP', DEFAULT_SYNC_OVERLAP),
+    full_sync_interval=getattr(settings, 'BLACKLIST_FULL_SYNC_INTERVAL', DEFAULT_FULL_SYNC_INTERVAL),
+)
+
+
+def prune_expired_tokens(batch_size=5000, before=None):
+    """
+    Delete expired outstanding tokens and their blacklist rows in batches so
+    no single statement holds the tables for long. Yields the number of rows
+    removed per batch.
+    """
+    before = before or timezone.now()
+    while True:
+        ids = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=before)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        yield len(ids)
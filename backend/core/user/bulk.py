@@ -0,0 +1,211 @@
+"""
+Bulk import of users and accounts.
+
+A batch is validated row by row with BulkImportRowSerializer, then against the
+database with one query per lookup table instead of one per row. Passwords are
+hashed in a thread pool, since PBKDF2 dominates the cost of onboarding and
+hashlib releases the GIL while it runs (see core.user.hashing), and
+everything is written with bulk_create / bulk_update inside one transaction.
+
+Each row describes one person:
+    user_id                                    always required
+    user_name, user_full_name, user_status_id  required when user_id is new
+    user_email                                 optional
+    account_id, password, account_role         optional; creates the login account
+
+When user_id already exists the row must carry an account, which is created
+and linked to that user, mirroring account_list_create.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from core.data_model.models import DmRoles
+from .models import UserAccounts, UserCustomUsers, UserStatus
+from .serializers import BulkImportRowSerializer
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def hash_passwords(raw_passwords, workers=None):
+    """Hash passwords in parallel worker threads, preserving order"""
+    if not raw_passwords:
+        return []
+    workers = workers or getattr(settings, 'BULK_IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+    workers = min(workers, len(raw_passwords))
+    if workers == 1:
+        return [_hash_password(raw) for raw in raw_passwords]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-hash') as executor:
+        return list(executor.map(_hash_password, raw_passwords))
+
+
+class BulkImportResult:
+    def __init__(self):
+        self.created_users = 0
+        self.created_accounts = 0
+        self.linked_accounts = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created_users': self.created_users,
+            'created_accounts': self.created_accounts,
+            'linked_accounts': self.linked_accounts,
+            'errors': sorted(self.errors, key=lambda error: (error['row'] is None, error['row'] or 0)),
+        }
+
+
+def _validate(rows, result):
+    """Field-level then batch-level validation, returning {row_index: data}"""
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = BulkImportRowSerializer(data=row)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            result.add_error(index, serializer.errors)
+
+    def reject(index, field, message):
+        result.add_error(index, {field: [message]})
+        valid.pop(index, None)
+
+    # Duplicates inside the batch
+    for field in ('user_id', 'account_id'):
+        seen = {}
+        for index, data in list(valid.items()):
+            value = data.get(field)
+            if not value:
+                continue
+            if value in seen:
+                reject(index, field, f"Duplicate {field} in batch (row {seen[value]}).")
+            else:
+                seen[value] = index
+
+    user_ids = {data['user_id'] for data in valid.values()}
+    account_ids = {data['account_id'] for data in valid.values() if data.get('account_id')}
+    status_ids = {data['user_status_id'] for data in valid.values() if data.get('user_status_id')}
+    role_codes = {data['account_role'] for data in valid.values() if data.get('account_role')}
+
+    existing_users = dict(
+        UserCustomUsers.objects
+        .filter(user_id__in=user_ids)
+        .values_list('user_id', 'user_account_id')
+    )
+    taken_account_user_ids = set(
+        UserAccounts.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+    )
+    taken_account_ids = set(
+        UserAccounts.objects.filter(account_id__in=account_ids).values_list('account_id', flat=True)
+    )
+    known_statuses = set(
+        UserStatus.objects.filter(status_id__in=status_ids).values_list('status_id', flat=True)
+    )
+    known_roles = set(
+        DmRoles.objects.filter(role_code__in=role_codes).values_list('role_code', flat=True)
+    )
+
+    for index, data in list(valid.items()):
+        user_id = data['user_id']
+        account_id = data.get('account_id')
+        if user_id in existing_users:
+            if not account_id:
+                reject(index, 'user_id', 'User already exists.')
+                continue
+            if existing_users[user_id] is not None:
+                reject(index, 'user_id', 'User already has an account.')
+                continue
+        else:
+            missing = [
+                field for field in ('user_name', 'user_full_name', 'user_status_id')
+                if not data.get(field)
+            ]
+            if missing:
+                result.add_error(index, {field: ['This field is required for a new user.'] for field in missing})
+                valid.pop(index)
+                continue
+            if data['user_status_id'] not in known_statuses:
+                reject(index, 'user_status_id', 'Unknown status.')
+                continue
+        if account_id:
+            if account_id in taken_account_ids:
+                reject(index, 'account_id', 'Account already exists.')
+                continue
+            if user_id in taken_account_user_ids:
+                reject(index, 'user_id', 'An account already exists for this user_id.')
+                continue
+            if data.get('account_role') and data['account_role'] not in known_roles:
+                reject(index, 'account_role', 'Unknown role.')
+                continue
+
+    return valid, existing_users
+
+
+def bulk_import(rows, created_by=0, all_or_nothing=False, hash_workers=None):
+    """
+    Import a batch of rows, returning a BulkImportResult
+
+    With all_or_nothing, any row error rejects the whole batch.
+    """
+    result = BulkImportResult()
+    valid, existing_users = _validate(rows, result)
+    if not valid or (all_or_nothing and result.errors):
+        return result
+
+    account_rows = [(index, data) for index, data in valid.items() if data.get('account_id')]
+    hashes = hash_passwords([data['password'] for _, data in account_rows], workers=hash_workers)
+
+    accounts_by_user = {}
+    for (index, data), encoded in zip(account_rows, hashes):
+        accounts_by_user[data['user_id']] = UserAccounts(
+            user_id=data['user_id'],
+            account_id=data['account_id'],
+            account_password=encoded,
+            account_role_id=data.get('account_role') or None,
+            created_by=created_by,
+        )
+
+    try:
+        with transaction.atomic():
+            UserAccounts.objects.bulk_create(accounts_by_user.values(), batch_size=1000)
+
+            new_users = [
+                UserCustomUsers(
+                    user_id=data['user_id'],
+                    user_name=data['user_name'],
+                    user_full_name=data['user_full_name'],
+                    user_email=data.get('user_email') or None,
+                    user_status_id=data['user_status_id'],
+                    user_account=accounts_by_user.get(data['user_id']),
+                    created_by=created_by,
+                )
+                for data in valid.values() if data['user_id'] not in existing_users
+            ]
+            UserCustomUsers.objects.bulk_create(new_users, batch_size=1000)
+
+            linked = list(
+                UserCustomUsers.objects
+                .filter(user_id__in=[
+                    user_id for user_id in accounts_by_user if user_id in existing_users
+                ])
+                .only('id', 'user_id')
+            )
+            for user in linked:
+                user.user_account = accounts_by_user[user.user_id]
+            UserCustomUsers.objects.bulk_update(linked, ['user_account'], batch_size=1000)
+    except IntegrityError as e:
+        # Lost a race with a concurrent writer; nothing was committed
+        result.add_error(None, {'non_field_errors': [str(e)]})
+        return result
+
+    result.created_accounts = len(accounts_by_user)
+    result.created_users = len(new_users)
+    result.linked_accounts = len(linked)
+    return result
@@ -0,0 +1,60 @@
+"""
+Small in-process caches shared by the user app.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from configs.metrics import CACHE_LOOKUPS
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries expire after ``ttl`` seconds
+
+    Safe to share between request threads; every process keeps its own copy.
+    Lookups are counted on the wms_cache_lookups_total metric under ``name``.
+    """
+    _missing = object()
+
+    def __init__(self, maxsize=1024, ttl=300, name='ttl'):
+        self.maxsize = maxsize
+        self.name = name
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is not self._missing and item[1] < time.monotonic():
+                del self._data[key]
+                item = self._missing
+            if item is not self._missing:
+                self._data.move_to_end(key)
+        CACHE_LOOKUPS.inc(cache=self.name, result='miss' if item is self._missing else 'hit')
+        return default if item is self._missing else item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """Drop every entry whose value satisfies predicate"""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,117 @@
+"""
+Compact authorization claims embedded in access tokens.
+
+The claim is a versioned, zlib-compressed and base64url-encoded JSON object:
+
+    {
+        "v": 1,
+        "r": ["ADM", ...],                        # role codes
+        "a": ["former", ...],                     # active app codes
+        "p": {"former": {"accounts": "6"}, ...},  # app -> page -> hex bitset of permission ids
+        "b": ["B01", ...]                         # branch codes
+    }
+
+Permission ids are small integers, so one bit per id keeps a page's grants in
+a couple of hex digits.
+"""
+import base64
+import json
+import zlib
+from functools import lru_cache
+
+from core.data_model.models import DmMappingAccountBranch
+from core.data_model.resolver import EffectivePermissions, get_effective_permissions
+
+
+CLAIM_NAME = 'perm'
+CLAIM_VERSION = 1
+
+
+class TokenClaims:
+    """Decoded authorization claim of an access token"""
+    __slots__ = ('version', 'permissions', 'branches')
+
+    def __init__(self, version, permissions, branches):
+        self.version = version
+        self.permissions = permissions
+        self.branches = frozenset(branches)
+
+    def has_app(self, app_code):
+        return self.permissions.has_app(app_code)
+
+    def has_permission(self, app_code, page_code, permission_id):
+        return self.permissions.has_permission(app_code, page_code, permission_id)
+
+    def pages(self, app_code):
+        return self.permissions.pages(app_code)
+
+    def has_branch(self, branch_code):
+        return branch_code in self.branches
+
+
+def get_account_branches(account_id):
+    return sorted(set(
+        DmMappingAccountBranch.objects
+        .filter(account_id=account_id)
+        .values_list('branch_code', flat=True)
+    ))
+
+
+def build_claims(account_id):
+    """Build the uncompressed claim dict of an account"""
+    effective = get_effective_permissions(account_id)
+
+    pages = {}
+    for app_code, page_code, permission_id in effective.grants:
+        app_pages = pages.setdefault(app_code, {})
+        app_pages[page_code] = app_pages.get(page_code, 0) | (1 << permission_id)
+
+    return {
+        'v': CLAIM_VERSION,
+        'r': sorted(effective.roles),
+        'a': sorted(effective.apps),
+        'p': {
+            app_code: {page_code: format(mask, 'x') for page_code, mask in app_pages.items()}
+            for app_code, app_pages in pages.items()
+        },
+        'b': get_account_branches(account_id),
+    }
+
+
+def encode_claims(account_id):
+    raw = json.dumps(build_claims(account_id), separators=(',', ':'), sort_keys=True)
+    packed = zlib.compress(raw.encode('utf-8'), 9)
+    return base64.urlsafe_b64encode(packed).rstrip(b'=').decode('ascii')
+
+
+@lru_cache(maxsize=4096)
+def decode_claims(value, account_id=None):
+    """
+    Decode a claim string into TokenClaims.
+
+    Returns None for malformed values and unknown versions so callers can fall
+    back to the database-backed resolver.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        packed = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        data = json.loads(zlib.decompress(packed))
+        if data.get('v') != CLAIM_VERSION:
+            return None
+
+        grants = set()
+        for app_code, app_pages in data.get('p', {}).items():
+            for page_code, hex_mask in app_pages.items():
+                mask = int(hex_mask, 16)
+                permission_id = 0
+                while mask:
+                    if mask & 1:
+                        grants.add((app_code, page_code, permission_id))
+                    mask >>= 1
+                    permission_id += 1
+    except (AttributeError, TypeError, ValueError, zlib.error):
+        return None
+
+    permissions = EffectivePermissions(account_id, data.get('r', ()), data.get('a', ()), grants)
+    return TokenClaims(data['v'], permissions, data.get('b', ()))
@@ -0,0 +1,71 @@
+"""
+Streaming NDJSON / CSV export of list serializer output.
+
+Rows are read with QuerySet.iterator() and rendered one at a time through a
+single serializer instance, so memory use does not depend on the row count
+and the field set always matches the list endpoints.
+"""
+import csv
+
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _columns(serializer, prefix=''):
+    """Flattened column names of a serializer, nested fields joined with '.'"""
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.Serializer):
+            columns.extend(_columns(field, f"{prefix}{name}."))
+        else:
+            columns.append(prefix + name)
+    return columns
+
+
+def _flatten(data, prefix='', out=None):
+    out = {} if out is None else out
+    for key, value in data.items():
+        if isinstance(value, dict):
+            _flatten(value, f"{prefix}{key}.", out)
+        else:
+            out[prefix + key] = value
+    return out
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(queryset, serializer_class, chunk_size=EXPORT_CHUNK_SIZE):
+    serializer = serializer_class()
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield encoder.encode(serializer.to_representation(instance)) + '\n'
+
+
+def iter_csv(queryset, serializer_class, chunk_size=EXPORT_CHUNK_SIZE):
+    serializer = serializer_class()
+    columns = _columns(serializer)
+    writer = csv.DictWriter(_Echo(), fieldnames=columns, restval='', extrasaction='ignore')
+    yield writer.writeheader()
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow(_flatten(serializer.to_representation(instance)))
+
+
+EXPORTERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
@@ -0,0 +1,161 @@
+"""
+Fast-path rendering of list endpoints.
+
+A FastListSerializer is compiled once from an existing DRF serializer class:
+every readable field becomes a column of a single ``values_list()`` query and
+rows are turned into dicts directly, skipping model instantiation and DRF's
+per-instance field machinery. The output has the same keys, order and values
+as ``serializer_class(queryset, many=True).data``.
+
+Only what can be read straight from columns is compiled: model fields, dotted
+sources through forward foreign keys, primary-key / slug related fields and
+nested serializers over forward foreign keys. Any other field (method fields,
+properties, reverse relations, '*' sources) makes the serializer unsupported
+and serialize_list() falls back to DRF. Set FAST_LIST_SERIALIZERS = False to
+always use DRF.
+"""
+import threading
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+# to_representation implementations that return database values unchanged
+_IDENTITY = {
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.BooleanField.to_representation,
+    serializers.ReadOnlyField.to_representation,
+}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _resolve(model, attrs):
+    """Walk ``attrs`` over forward relations; return (model field, nullable path)"""
+    nullable = False
+    field = None
+    for position, attr in enumerate(attrs):
+        if field is not None:
+            if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                raise Unsupported(f"{attr} is not reachable through a forward relation")
+            nullable = nullable or field.null
+            model = field.related_model
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            raise Unsupported(f"{model.__name__}.{attr} is not a model field")
+        if not field.concrete:
+            raise Unsupported(f"{model.__name__}.{attr} is not a concrete field")
+    return field, nullable
+
+
+class FastListSerializer:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.lookups = []
+        serializer = serializer_class()
+        self._plan = self._compile(serializer, serializer.Meta.model, [])
+
+    def _column(self, attrs):
+        lookup = '__'.join(attrs)
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def _compile(self, serializer, model, prefix):
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*':
+                raise Unsupported(f"{name} uses source='*'")
+            attrs = prefix + list(field.source_attrs)
+            model_field, nullable = _resolve(model, field.source_attrs)
+
+            if isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer) or not model_field.is_relation:
+                    raise Unsupported(f"{name} is not a nested forward relation")
+                nested = self._compile(field, model_field.related_model, attrs)
+                plan.append((name, self._column(attrs), None, nested))
+                continue
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    raise Unsupported(f"{name} uses pk_field")
+                target = model_field.target_field
+                column = attrs if target.primary_key else attrs + [model_field.related_model._meta.pk.name]
+                converter = None
+            elif isinstance(field, serializers.SlugRelatedField):
+                target = model_field.target_field
+                column = attrs if target.name == field.slug_field else attrs + field.slug_field.split('.')
+                converter = None
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                raise Unsupported(f"{name} is an unsupported relation")
+            else:
+                if nullable and not field.allow_null:
+                    # DRF would drop the key when the relation is null
+                    raise Unsupported(f"{name} crosses a nullable relation")
+                column = attrs
+                to_representation = type(field).to_representation
+                converter = None if to_representation in _IDENTITY else field.to_representation
+            plan.append((name, self._column(column), converter, None))
+        return plan
+
+    def _render(self, plan, row):
+        data = {}
+        for name, index, converter, nested in plan:
+            value = row[index]
+            if value is None:
+                data[name] = None
+            elif nested is not None:
+                data[name] = self._render(nested, row)
+            elif converter is None:
+                data[name] = value
+            else:
+                data[name] = converter(value)
+        return data
+
+    def values(self, queryset, *extra):
+        """Named values_list() rows of queryset, including any ``extra`` lookups"""
+        lookups = self.lookups + [lookup for lookup in extra if lookup not in self.lookups]
+        return queryset.values_list(*lookups, named=True)
+
+    def render(self, rows):
+        plan = self._plan
+        return [self._render(plan, row) for row in rows]
+
+    def serialize(self, queryset):
+        return self.render(self.values(queryset))
+
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get_fast_serializer(serializer_class):
+    """Compiled FastListSerializer of serializer_class, or None when unsupported or disabled"""
+    if not getattr(settings, 'FAST_LIST_SERIALIZERS', True):
+        return None
+    try:
+        return _compiled[serializer_class]
+    except KeyError:
+        pass
+    try:
+        fast = FastListSerializer(serializer_class)
+    except Unsupported:
+        fast = None
+    with _lock:
+        _compiled[serializer_class] = fast
+    return fast
+
+
+def serialize_list(queryset, serializer_class):
+    """List representation of queryset, through the fast path when possible"""
+    fast = get_fast_serializer(serializer_class)
+    if fast is None:
+        return serializer_class(queryset, many=True).data
+    return fast.serialize(queryset)
@@ -0,0 +1,43 @@
+"""
+Server-side filters for the user and account list endpoints.
+
+Each function takes a queryset and the validated data of the matching
+*ListQuerySerializer and narrows the queryset in SQL.
+"""
+from django.db.models import Exists, OuterRef
+
+from core.data_model.models import DmMappingAccountBranch
+
+
+def _account_in_branch(branch_code, account_ref):
+    return Exists(
+        DmMappingAccountBranch.objects.filter(account_id=OuterRef(account_ref), branch_code=branch_code)
+    )
+
+
+def _created_range(queryset, params):
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=params['created_after'])
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lt=params['created_before'])
+    return queryset
+
+
+def filter_users(queryset, params):
+    if params.get('status'):
+        queryset = queryset.filter(user_status_id=params['status'])
+    if params.get('role'):
+        queryset = queryset.filter(user_account__account_role=params['role'])
+    if params.get('branch'):
+        queryset = queryset.filter(_account_in_branch(params['branch'], 'user_account__account_id'))
+    return _created_range(queryset, params)
+
+
+def filter_accounts(queryset, params):
+    if params.get('status'):
+        queryset = queryset.filter(user_account__user_status_id=params['status'])
+    if params.get('role'):
+        queryset = queryset.filter(account_role=params['role'])
+    if params.get('branch'):
+        queryset = queryset.filter(_account_in_branch(params['branch'], 'account_id'))
+    return _created_range(queryset, params)
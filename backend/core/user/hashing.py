@@ -0,0 +1,94 @@
+"""
+Bounded executor for password hash verification.
+
+PBKDF2 in hashlib releases the GIL, so a thread pool gives real parallelism
+without the pickling and Django start-up cost of worker processes. Admission
+is capped at PASSWORD_HASH_WORKERS running plus PASSWORD_HASH_QUEUE waiting
+checks; anything beyond that fails fast with HashQueueFull instead of piling
+up behind the hashes already in flight.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+
+from configs.metrics import PASSWORD_HASH_SECONDS
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 64
+
+
+def timed_check_password(raw_password, encoded):
+    """check_password, recording its duration on wms_password_hash_seconds"""
+    started = time.perf_counter()
+    try:
+        return check_password(raw_password, encoded)
+    finally:
+        PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started)
+
+
+class HashQueueFull(Exception):
+    """Raised when the hashing queue is at capacity"""
+
+
+class PasswordHashPool:
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='password-hash'
+                )
+        return self._executor
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise HashQueueFull()
+            self._in_flight += 1
+
+    def _release(self, *args):
+        with self._lock:
+            self._in_flight -= 1
+
+    def submit(self, raw_password, encoded):
+        """Queue a check_password call, returning a concurrent Future"""
+        executor = self.start()
+        self._admit()
+        try:
+            future = executor.submit(timed_check_password, raw_password, encoded)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def check(self, raw_password, encoded):
+        """Await a password check without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(raw_password, encoded))
+
+
+password_pool = PasswordHashPool(
+    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+    queue_size=getattr(settings, 'PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+)
@@ -0,0 +1,98 @@
+"""
+Write-behind buffer for UserAccounts.account_last_login.
+
+Logins record their timestamp in memory; a background thread writes the
+pending timestamps with one bulk UPDATE every LAST_LOGIN_FLUSH_INTERVAL
+seconds, or as soon as LAST_LOGIN_FLUSH_SIZE accounts are waiting. Pending
+entries are flushed at interpreter exit so a graceful worker shutdown does
+not lose them. bulk_update sends no post_save, so a flush drops the written
+accounts from the authentication account_cache itself.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .authentication import account_cache
+from .models import UserAccounts
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_FLUSH_SIZE = 500
+
+
+class LastLoginBuffer:
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, account, when=None):
+        """Stamp account.account_last_login now and queue the write"""
+        when = when or timezone.now()
+        account.account_last_login = when
+        with self._lock:
+            self._pending[account.pk] = when
+            size = len(self._pending)
+        self._ensure_started()
+        if size >= self.flush_size:
+            self._wakeup.set()
+        return when
+
+    def flush(self):
+        """Write all pending timestamps, returning the number of accounts updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                UserAccounts.objects.bulk_update(
+                    [UserAccounts(pk=pk, account_last_login=when) for pk, when in pending.items()],
+                    ['account_last_login'],
+                    batch_size=self.flush_size,
+                )
+            except Exception:
+                logger.exception('Failed to flush %d last-login timestamps', len(pending))
+                # Put them back without overwriting anything newer
+                with self._lock:
+                    for pk, when in pending.items():
+                        self._pending.setdefault(pk, when)
+                return 0
+            account_cache.delete_matching(lambda account: account.pk in pending)
+            return len(pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            connections.close_all()
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval=getattr(settings, 'LAST_LOGIN_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+    flush_size=getattr(settings, 'LAST_LOGIN_FLUSH_SIZE', DEFAULT_FLUSH_SIZE),
+)
+
+atexit.register(last_login_buffer.flush)
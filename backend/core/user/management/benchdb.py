@@ -0,0 +1,40 @@
+"""
+Throwaway database for the bench* management commands.
+
+throwaway_database() creates a test database in a temporary directory and
+points every DATABASES alias at it, so reads routed to a replica (see
+configs.db_router) hit the same seeded rows and never the real databases.
+The file and its directory are removed on exit.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+
+@contextmanager
+def throwaway_database(prefix):
+    others = [alias for alias in connections if alias != DEFAULT_DB_ALIAS]
+    if any(connections[alias].vendor != 'sqlite' for alias in [DEFAULT_DB_ALIAS, *others]):
+        raise CommandError('Benchmarks run on a throwaway SQLite file; every DATABASES alias must be SQLite.')
+
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    try:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        old_names = {alias: connections[alias].settings_dict['NAME'] for alias in others}
+        try:
+            for alias in others:
+                connections[alias].close()
+                connections[alias].settings_dict['NAME'] = connection.settings_dict['NAME']
+            yield
+        finally:
+            for alias, name in old_names.items():
+                connections[alias].close()
+                connections[alias].settings_dict['NAME'] = name
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.data_model.models import (
+    DmBranch,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountBranch,
+    DmRoles,
+)
+from core.user.last_login import last_login_buffer
+from core.user.management.benchdb import throwaway_database
+from core.user.models import UserAccounts, UserCustomUsers, UserStatus
+from core.user.permissions import grant_manager
+from core.user.tokens import get_tokens_for_user
+
+
+BENCH_ACCOUNT = 'bench'
+BENCH_PASSWORD = 'bench-password'
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the auth and CRUD endpoints in-process against a throwaway database, '
+        'report throughput and latency percentiles, and compare them with a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint before measuring')
+        parser.add_argument('--rows', type=int, default=1000, help='Users / accounts / machines seeded')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run this endpoint (repeatable)')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare with')
+        parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Allowed regression as a fraction: p95 latency up or throughput down by more fails',
+        )
+
+    def handle(self, *args, **options):
+        # Keep per-request query logs (configs.profiling) out of the report
+        logging.getLogger('wms.queries').setLevel(logging.WARNING)
+
+        # Run against a throwaway file database so the real ones are never touched
+        with throwaway_database(prefix='bench-'):
+            setup_test_environment()
+            try:
+                caches['default'].clear()
+                self._seed(options['rows'])
+                endpoints = self._endpoints(options['requests'] + options['warmup'])
+                if options['endpoints']:
+                    unknown = set(options['endpoints']) - set(endpoints)
+                    if unknown:
+                        raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+                    endpoints = {name: endpoints[name] for name in options['endpoints']}
+                results = {
+                    name: self._run(make_request, options['requests'], options['concurrency'], options['warmup'])
+                    for name, make_request in endpoints.items()
+                }
+            finally:
+                # Drain buffered writes into the bench database, not the real one
+                last_login_buffer.flush()
+                teardown_test_environment()
+
+        report = {
+            'meta': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'concurrency': options['concurrency'],
+                'rows': options['rows'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'created_at': timezone.now().isoformat(),
+            },
+            'endpoints': results,
+        }
+        self._print(results)
+
+        if options['output']:
+            self._write(options['output'], report)
+        if options['save']:
+            self._write(options['baseline'], report)
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+            return
+        if os.path.exists(options['baseline']):
+            self._compare(report, options['baseline'], options['threshold'])
+
+    # ============== SEED ==============
+    def _seed(self, rows):
+        active = UserStatus.objects.create(status_name='Active', created_by=0)
+        UserStatus.objects.create(status_name='Inactive', created_by=0)
+        role = DmRoles.objects.create(role_code='BENCH', role_name='Bench', created_by=0)
+
+        # One hash for every seeded account: hashing thousands would dominate the setup
+        password = make_password(BENCH_PASSWORD)
+        accounts = UserAccounts.objects.bulk_create([
+            UserAccounts(
+                user_id=f"U{i:06d}", account_id=BENCH_ACCOUNT if i == 0 else f"bench-{i}",
+                account_password=password, account_role=role,
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+        UserCustomUsers.objects.bulk_create([
+            UserCustomUsers(
+                user_id=f"U{i:06d}", user_name=f"user{i}", user_full_name=f"Bench User {i}",
+                user_email=f"user{i}@example.com", user_status=active, user_account=account,
+            )
+            for i, account in enumerate(accounts)
+        ], batch_size=1000)
+
+        factory = DmFactory.objects.create(factory_code='BF', factory_name='Bench factory')
+        branches = [
+            DmBranch.objects.create(factory_code=factory, branch_type='T', branch_code=f"BB{i}", branch_name=f"Branch {i}")
+            for i in range(4)
+        ]
+        machines = DmMachine.objects.bulk_create([
+            DmMachine(branch_code=branches[i % len(branches)], machine_code=f"BM{i}", machine_name=f"Machine {i}")
+            for i in range(rows)
+        ], batch_size=1000)
+        DmMachineLine.objects.bulk_create([
+            DmMachineLine(machine_code=machine, line_code=f"L{j}", line_name=f"Line {j}")
+            for machine in machines[:rows // 10] for j in range(5)
+        ], batch_size=1000)
+        DmMappingAccountBranch.objects.create(account_id=accounts[0], branch_code=branches[0], role_code=role)
+
+        # Let the bench account through the manager pages guarding /user/users/ and /user/accounts/
+        grant_manager(accounts[0])
+        self.account = accounts[0]
+
+    # ============== ENDPOINTS ==============
+    def _endpoints(self, total):
+        access = get_tokens_for_user(self.account)['access']
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {access}"}
+        # Refresh tokens rotate, so every refresh request needs its own
+        refresh_tokens = iter([get_tokens_for_user(self.account)['refresh'] for _ in range(total)])
+        login_body = {'account_id': BENCH_ACCOUNT, 'password': BENCH_PASSWORD}
+
+        def get(path):
+            return lambda client: client.get(path, **auth)
+
+        return {
+            'login': lambda client: client.post('/user/login/', login_body, content_type='application/json'),
+            'refresh': lambda client: client.post(
+                '/user/refresh/', {'refresh_token': next(refresh_tokens)}, content_type='application/json'
+            ),
+            'users': get('/user/users/'),
+            'users_page': get('/user/users/?page_size=100'),
+            'accounts': get('/user/accounts/'),
+            'statuses': get('/user/statuses/'),
+            'machines': get('/data-model/machines/'),
+            'machine_lines': get('/data-model/machine-lines/'),
+            'roles': get('/data-model/roles/'),
+            'tree': get('/data-model/tree/'),
+        }
+
+    # ============== RUN ==============
+    def _run(self, make_request, total, concurrency, warmup):
+        def call(_):
+            client = Client()
+            started = time.perf_counter()
+            response = make_request(client)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            return time.perf_counter() - started, response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, range(warmup)))
+            started = time.perf_counter()
+            outcomes = list(executor.map(call, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in outcomes)
+        statuses = Counter(code for _, code in outcomes)
+        return {
+            'rps': round(total / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(self._percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(self._percentile(latencies, 0.99) * 1000, 2),
+            'errors': sum(count for code, count in statuses.items() if code >= 400),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+
+    def _percentile(self, ordered, fraction):
+        return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * fraction) - 1))]
+
+    # ============== REPORT ==============
+    def _print(self, results):
+        self.stdout.write(f"{'endpoint':<14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  errors")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<14} {result['rps']:9.1f} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                f"{result['p99_ms']:9.2f}  {result['errors']}"
+            )
+
+    def _write(self, path, report):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2)
+            handle.write('\n')
+
+    def _compare(self, report, path, threshold):
+        with open(path) as handle:
+            baseline = json.load(handle)
+
+        for key in ('requests', 'concurrency', 'rows', 'cpus'):
+            if baseline['meta'].get(key) != report['meta'][key]:
+                self.stderr.write(
+                    f"Warning: baseline {key}={baseline['meta'].get(key)} differs from this run "
+                    f"({report['meta'][key]}); the comparison may not be meaningful."
+                )
+
+        regressions = []
+        for name, result in report['endpoints'].items():
+            base = baseline['endpoints'].get(name)
+            if base is None:
+                continue
+            if result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(f"{name}: p95 {base['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+            if result['rps'] < base['rps'] * (1 - threshold):
+                regressions.append(f"{name}: throughput {base['rps']:.1f} -> {result['rps']:.1f} req/s")
+            if result['errors'] > base['errors']:
+                regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+
+        if regressions:
+            raise CommandError(
+                f"Regression beyond {threshold:.0%} against {path}:\n  " + '\n  '.join(regressions)
+            )
+        self.stdout.write(f"No regression beyond {threshold:.0%} against {path}")
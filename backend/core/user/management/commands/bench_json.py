@@ -0,0 +1,98 @@
+import io
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.data_model.models import DmRoles
+from core.user.models import UserAccounts, UserCustomUsers, UserStatus
+from core.user.parsers import FastJSONParser
+from core.user.renderers import FastJSONRenderer, fast_json_enabled
+from core.user.serializers import UserCustomUsersListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the stdlib and orjson renderer / parser on UserCustomUsersListSerializer output'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Users in the payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        if not fast_json_enabled():
+            raise CommandError('orjson is not installed or FAST_JSON is off; nothing to compare.')
+
+        self._check_types()
+        data = UserCustomUsersListSerializer(self._users(options['rows']), many=True).data
+        repeat = options['repeat']
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        body = stdlib.render(data)
+        if fast.render(data) != body:
+            raise CommandError('FastJSONRenderer output differs from JSONRenderer')
+        if FastJSONParser().parse(io.BytesIO(body)) != JSONParser().parse(io.BytesIO(body)):
+            raise CommandError('FastJSONParser result differs from JSONParser')
+
+        self._report('render', self._best(lambda: stdlib.render(data), repeat), self._best(lambda: fast.render(data), repeat))
+        self._report(
+            'parse',
+            self._best(lambda: JSONParser().parse(io.BytesIO(body)), repeat),
+            self._best(lambda: FastJSONParser().parse(io.BytesIO(body)), repeat),
+        )
+        self.stdout.write(f"payload {len(data)} users, {len(body) / 1024:.0f} KiB (identical output)")
+
+    def _users(self, rows):
+        """Unsaved users with related objects, so no database is needed"""
+        now = datetime(2026, 1, 1, 8, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        role = DmRoles(role_code='BENCH', role_name='Bench')
+        status = UserStatus(status_id=1, status_name='Active', created_at=now, updated_at=now)
+        users = []
+        for i in range(rows):
+            account = None
+            if i % 4:
+                account = UserAccounts(
+                    id=i, user_id=f"U{i:06d}", account_id=f"bench-{i}", account_role=role if i % 2 else None,
+                    account_last_login=now if i % 3 else None, created_at=now, updated_at=now,
+                )
+            users.append(UserCustomUsers(
+                id=i, user_id=f"U{i:06d}", user_name=f"user{i}", user_full_name=f"Bench Üser {i}  ",
+                user_email=f"user{i}@example.com" if i % 3 else None,
+                user_status=status, user_account=account, created_at=now, updated_at=now + timedelta(microseconds=i),
+            ))
+        return users
+
+    def _check_types(self):
+        payload = {
+            'datetime_utc': datetime(2026, 1, 1, 8, 30, tzinfo=dt_timezone.utc),
+            'datetime_offset': datetime(2026, 1, 1, 8, 30, 0, 5, tzinfo=dt_timezone(timedelta(hours=7))),
+            'datetime_naive': datetime(2026, 1, 1, 8, 30),
+            'date': date(2026, 1, 1),
+            'time': dt_time(8, 30, 0, 250),
+            'timedelta': timedelta(hours=1, microseconds=5),
+            'decimal': Decimal('12.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'lazy': gettext_lazy('Active'),
+            1: 'int key',
+        }
+        # The second payload exercises the stdlib fallback
+        for data in (payload, {'big': 2 ** 70}):
+            if FastJSONRenderer().render(data) != JSONRenderer().render(data):
+                raise CommandError(f"FastJSONRenderer differs from JSONRenderer on {sorted(map(str, data))}")
+
+    def _best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def _report(self, label, stdlib, fast):
+        self.stdout.write(
+            f"{label:<7} stdlib {stdlib * 1000:8.1f} ms  orjson {fast * 1000:8.1f} ms  speedup {stdlib / fast:5.1f}x"
+        )
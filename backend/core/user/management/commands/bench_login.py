@@ -0,0 +1,97 @@
+import asyncio
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.user.last_login import last_login_buffer
+from core.user.management.benchdb import throwaway_database
+from core.user.models import UserAccounts, UserCustomUsers, UserStatus
+
+
+BENCH_ACCOUNT = 'bench-login'
+BENCH_PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Compare login throughput of the sync login view and the async pooled login view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Logins per run')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        # Run against a throwaway file database so the real ones are never touched
+        with throwaway_database(prefix='bench-login-'):
+            setup_test_environment()
+            try:
+                self._seed()
+                results = [
+                    ('sync  /user/login/', self._run_sync(total, concurrency)),
+                    ('async /user/login/async/', self._run_async(total, concurrency)),
+                ]
+            finally:
+                # Drain buffered writes into the bench database, not the real one
+                last_login_buffer.flush()
+                teardown_test_environment()
+
+        for label, (elapsed, latencies, statuses) in results:
+            latencies.sort()
+            self.stdout.write(
+                f"{label:<26} {len(latencies) / elapsed:8.1f} logins/s  "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms  "
+                f"statuses {dict(statuses)}"
+            )
+
+    def _seed(self):
+        active = UserStatus.objects.create(status_name='Active', created_by=0)
+        account = UserAccounts.objects.create(
+            user_id='BENCH', account_id=BENCH_ACCOUNT, account_password=make_password(BENCH_PASSWORD)
+        )
+        UserCustomUsers.objects.create(
+            user_account=account, user_id='BENCH', user_name='bench',
+            user_full_name='Bench User', user_status=active
+        )
+
+    def _run_sync(self, total, concurrency):
+        body = {'account_id': BENCH_ACCOUNT, 'password': BENCH_PASSWORD}
+
+        def login(_):
+            started = time.perf_counter()
+            response = Client().post('/user/login/', body, content_type='application/json')
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(login, range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [latency for latency, _ in outcomes], Counter(code for _, code in outcomes)
+
+    def _run_async(self, total, concurrency):
+        body = {'account_id': BENCH_ACCOUNT, 'password': BENCH_PASSWORD}
+
+        async def run():
+            client = AsyncClient()
+            gate = asyncio.Semaphore(concurrency)
+
+            async def login():
+                async with gate:
+                    started = time.perf_counter()
+                    response = await client.post('/user/login/async/', body, content_type='application/json')
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(login() for _ in range(total)))
+
+        started = time.perf_counter()
+        outcomes = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        return elapsed, [latency for latency, _ in outcomes], Counter(code for _, code in outcomes)
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.data_model.models import DmBranch, DmFactory, DmMachine, DmRoles
+from core.data_model.serializers import DmMachineSerializer
+from core.user.fast_serializers import FastListSerializer
+from core.user.management.benchdb import throwaway_database
+from core.user.models import UserAccounts, UserCustomUsers, UserStatus
+from core.user.serializers import (
+    UserAccountListSerializer,
+    UserCustomUsersListSerializer,
+    UserStatusSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF and fast-path list serialization, checking the rendered JSON is identical'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per list')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        # Run against a throwaway file database so the real ones are never touched
+        with throwaway_database(prefix='bench-serializers-'):
+            self._seed(rows)
+            cases = [
+                ('users', UserCustomUsers.objects.select_related('user_status', 'user_account'), UserCustomUsersListSerializer),
+                ('accounts', UserAccounts.objects.select_related('account_role'), UserAccountListSerializer),
+                ('statuses', UserStatus.objects.all(), UserStatusSerializer),
+                ('machines', DmMachine.objects.select_related('branch_code'), DmMachineSerializer),
+            ]
+            results = [(label, *self._compare(queryset, serializer_class, repeat)) for label, queryset, serializer_class in cases]
+
+        for label, count, drf, fast in results:
+            self.stdout.write(
+                f"{label:<10} {count:>6} rows  drf {drf * 1000:8.1f} ms  "
+                f"fast {fast * 1000:8.1f} ms  speedup {drf / fast:5.1f}x  (identical JSON)"
+            )
+
+    def _seed(self, rows):
+        statuses = UserStatus.objects.bulk_create(
+            [UserStatus(status_name=f"Status {i}", created_by=0) for i in range(5)]
+        )
+        role = DmRoles.objects.create(role_code='BENCH', role_name='Bench', created_by=0)
+        accounts = UserAccounts.objects.bulk_create([
+            UserAccounts(
+                user_id=f"U{i:06d}", account_id=f"bench-{i}", account_password='!',
+                account_role=role if i % 2 else None,
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+        UserCustomUsers.objects.bulk_create([
+            UserCustomUsers(
+                user_id=f"U{i:06d}", user_name=f"user{i}", user_full_name=f"Bench User {i}",
+                user_email=f"user{i}@example.com" if i % 3 else None,
+                user_status=statuses[i % len(statuses)],
+                # Every fourth user has no account, exercising the null nested path
+                user_account=accounts[i] if i % 4 else None,
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+        factory = DmFactory.objects.create(factory_code='BF', factory_name='Bench factory')
+        branch = DmBranch.objects.create(factory_code=factory, branch_type='T', branch_code='BB', branch_name='Bench branch')
+        DmMachine.objects.bulk_create(
+            [DmMachine(branch_code=branch, machine_code=f"BM{i}", machine_name=f"Machine {i}") for i in range(rows)],
+            batch_size=1000,
+        )
+
+    def _compare(self, queryset, serializer_class, repeat):
+        renderer = JSONRenderer()
+        fast_serializer = FastListSerializer(serializer_class)
+
+        def drf():
+            return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+        def fast():
+            return renderer.render(fast_serializer.serialize(queryset.all()))
+
+        expected, actual = drf(), fast()
+        if expected != actual:
+            raise CommandError(f"{serializer_class.__name__}: fast-path output differs from DRF")
+        count = queryset.count()
+        return count, self._best(drf, repeat), self._best(fast, repeat)
+
+    def _best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,100 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from configs.sqlite import READER_PRAGMAS, WRITER_PRAGMAS, init_command
+
+
+PROFILES = {
+    # What Django opens with no OPTIONS: rollback journal, synchronous=FULL
+    'default': ({}, {}),
+    'production': (WRITER_PRAGMAS, READER_PRAGMAS),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare reader/writer throughput of the default and production SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads')
+        parser.add_argument('--writers', type=int, default=1, help='Writer threads')
+        parser.add_argument('--rows', type=int, default=10000, help='Rows in the benchmark table')
+
+    def handle(self, *args, **options):
+        for label, (writer_pragmas, reader_pragmas) in PROFILES.items():
+            workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+            path = os.path.join(workdir, 'bench.sqlite3')
+            try:
+                self._seed(path, writer_pragmas, options['rows'])
+                reads, writes, errors = self._run(path, writer_pragmas, reader_pragmas, options)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            seconds = options['seconds']
+            self.stdout.write(
+                f"{label:<11} reads {reads / seconds:9.0f}/s  writes {writes / seconds:7.0f}/s  "
+                f"locked errors {errors}"
+            )
+
+    def _connect(self, path, pragmas):
+        # isolation_level=None: autocommit, transactions are explicit as in Django
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        command = init_command(pragmas)
+        for statement in command.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _seed(self, path, pragmas, rows):
+        conn = self._connect(path, pragmas)
+        conn.execute('CREATE TABLE account (id INTEGER PRIMARY KEY, account_id TEXT, last_login REAL)')
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO account (id, account_id, last_login) VALUES (?, ?, NULL)',
+            ((i, f"account-{i}") for i in range(rows)),
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def _run(self, path, writer_pragmas, reader_pragmas, options):
+        rows = options['rows']
+        deadline = time.monotonic() + options['seconds']
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def work(pragmas, write):
+            conn = self._connect(path, pragmas)
+            done = failed = 0
+            while time.monotonic() < deadline:
+                account = random.randrange(rows)
+                try:
+                    if write:
+                        # A login's last-login update, one transaction each
+                        conn.execute('BEGIN IMMEDIATE')
+                        conn.execute('UPDATE account SET last_login = ? WHERE id = ?', (time.time(), account))
+                        conn.execute('COMMIT')
+                    else:
+                        conn.execute('SELECT account_id, last_login FROM account WHERE id = ?', (account,)).fetchone()
+                    done += 1
+                except sqlite3.OperationalError:
+                    failed += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                counts['writes' if write else 'reads'] += done
+                counts['errors'] += failed
+
+        threads = [threading.Thread(target=work, args=(reader_pragmas, False)) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=work, args=(writer_pragmas, True)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts['reads'], counts['writes'], counts['errors']
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.user.models import UserAccounts
+from core.user.permissions import MANAGER_APP, MANAGER_ROLE, grant_manager
+
+
+class Command(BaseCommand):
+    help = (
+        'Let accounts use the user, account and access-control endpoints: map them to the '
+        'manager app and its administrator role (run once after deploy for the first admin)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_ids', nargs='+', help='account_id of each account to grant')
+
+    def handle(self, *args, **options):
+        accounts = {account.account_id: account for account in
+                    UserAccounts.objects.filter(account_id__in=options['account_ids'])}
+        missing = [account_id for account_id in options['account_ids'] if account_id not in accounts]
+        if missing:
+            raise CommandError(f"Unknown account(s): {', '.join(missing)}")
+
+        with transaction.atomic():
+            for account in accounts.values():
+                grant_manager(account)
+        for account_id in accounts:
+            self.stdout.write(self.style.SUCCESS(f"{account_id}: granted {MANAGER_ROLE} on {MANAGER_APP}"))
@@ -0,0 +1,61 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.user.bulk import bulk_import
+
+
+def _read_rows(path):
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            for row in csv.DictReader(handle):
+                yield {key: value for key, value in row.items() if value not in ('', None)}
+    elif path.endswith('.ndjson') or path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith('.json'):
+        with open(path, encoding='utf-8') as handle:
+            yield from json.load(handle)
+    else:
+        raise CommandError('Unsupported file type; use .csv, .json, .ndjson or .jsonl')
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users and accounts from a CSV / JSON / NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per transaction')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing threads')
+        parser.add_argument('--all-or-nothing', action='store_true', help='Reject a batch on any row error')
+
+    def handle(self, *args, **options):
+        rows = _read_rows(options['path'])
+        offset = 0
+        totals = {'created_users': 0, 'created_accounts': 0, 'linked_accounts': 0, 'errors': 0}
+
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            result = bulk_import(
+                batch,
+                all_or_nothing=options['all_or_nothing'],
+                hash_workers=options['workers'],
+            ).as_dict()
+            for error in result['errors']:
+                row = 'batch' if error['row'] is None else offset + error['row'] + 1
+                self.stderr.write(f"row {row}: {json.dumps(error['errors'], ensure_ascii=False)}")
+            for key in ('created_users', 'created_accounts', 'linked_accounts'):
+                totals[key] += result[key]
+            totals['errors'] += len(result['errors'])
+            offset += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Users created: {totals['created_users']}, accounts created: {totals['created_accounts']}, "
+            f"accounts linked: {totals['linked_accounts']}, rows with errors: {totals['errors']}"
+        ))
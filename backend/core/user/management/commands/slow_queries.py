@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from configs.profiling import normalize_sql
+from configs.slow_queries import read_log
+
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total_ms'],
+    'count': lambda entry: entry['count'],
+    'max': lambda entry: entry['max_ms'],
+    'mean': lambda entry: entry['mean_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Summarise the slow-query log (configs.slow_queries): top offenders by SQL fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=getattr(settings, 'SLOW_QUERY_LOG_FILE', None),
+                            help='Slow-query log; every process file and rotated backup beside it is read')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total')
+        parser.add_argument('--since', type=float, help='Only records from the last N hours')
+        parser.add_argument('--view', help='Only queries run by this view name')
+        parser.add_argument('--plans', action='store_true', help='Print the latest plan and stack of each entry')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('No slow-query log configured; pass --file.')
+        since = time.time() - options['since'] * 3600 if options['since'] else None
+
+        groups = {}
+        for record in read_log(str(options['file'])):
+            if since is not None and record.get('at', 0) < since:
+                continue
+            if options['view'] and record.get('view') != options['view']:
+                continue
+            entry = groups.get(record['fingerprint'])
+            if entry is None:
+                entry = groups[record['fingerprint']] = {
+                    'fingerprint': record['fingerprint'],
+                    'sql': normalize_sql(record['sql']),
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'views': {},
+                    'last_seen': 0,
+                }
+            duration = record['duration_ms']
+            entry['count'] += 1
+            entry['total_ms'] += duration
+            entry['max_ms'] = max(entry['max_ms'], duration)
+            view = record.get('view') or '-'
+            entry['views'][view] = entry['views'].get(view, 0) + 1
+            if record.get('at', 0) >= entry['last_seen']:
+                entry['last_seen'] = record.get('at', 0)
+                entry['plan'] = record.get('plan')
+                entry['stack'] = record.get('stack')
+                entry['params'] = record.get('params')
+
+        for entry in groups.values():
+            entry['total_ms'] = round(entry['total_ms'], 2)
+            entry['mean_ms'] = round(entry['total_ms'] / entry['count'], 2)
+        top = sorted(groups.values(), key=SORT_KEYS[options['sort']], reverse=True)[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(top, indent=2))
+            return
+        if not top:
+            self.stdout.write('No slow queries logged.')
+            return
+
+        self.stdout.write(f"{'fingerprint':<16} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  views")
+        for entry in top:
+            views = ', '.join(f"{view} ({count})" for view, count in
+                              sorted(entry['views'].items(), key=lambda item: -item[1]))
+            self.stdout.write(
+                f"{entry['fingerprint']:<16} {entry['count']:>6} {entry['total_ms']:>10.1f} "
+                f"{entry['mean_ms']:>9.1f} {entry['max_ms']:>9.1f}  {views}"
+            )
+            self.stdout.write(f"    {entry['sql'][:200]}")
+            if options['plans']:
+                for line in entry['plan'] or ['(no plan captured)']:
+                    self.stdout.write(f"      plan: {line}")
+                for frame in entry['stack'] or []:
+                    self.stdout.write(f"      at {frame}")
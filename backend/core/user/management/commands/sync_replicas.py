@@ -0,0 +1,36 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Refresh local SQLite stand-in replicas (DATABASE_REPLICAS) from the primary'
+
+    def handle(self, *args, **options):
+        primary = getattr(settings, 'DATABASE_PRIMARY', 'default')
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas:
+            raise CommandError('DATABASE_REPLICAS is empty.')
+        if connections[primary].vendor != 'sqlite':
+            raise CommandError('Only SQLite primaries can be copied; real replicas sync through replication.')
+
+        source = sqlite3.connect(connections.settings[primary]['NAME'])
+        try:
+            for alias in replicas:
+                if connections[alias].vendor != 'sqlite':
+                    raise CommandError(f"Replica {alias} is not SQLite.")
+                if connections.settings[alias]['NAME'] == connections.settings[primary]['NAME']:
+                    self.stdout.write(f"{alias}: reads the primary's file, nothing to copy")
+                    continue
+                connections[alias].close()
+                target = sqlite3.connect(connections.settings[alias]['NAME'])
+                try:
+                    # Online backup: consistent even while the primary is being written
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"{alias}: copied from {primary}")
+        finally:
+            source.close()
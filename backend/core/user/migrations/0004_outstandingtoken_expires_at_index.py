@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_rename_last_login_useraccounts_account_last_login_and_more'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    # token_blacklist ships without an index on expires_at, which prune_tokens
+    # and the blacklist mirror filter on.
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS idx_outstanding_token_expires ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX IF EXISTS idx_outstanding_token_expires',
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
-from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.hashers import make_password
+
+from .hashing import timed_check_password
 
 class UserStatus(models.Model):
     status_id = models.AutoField(primary_key=True)
@@ -38,14 +40,22 @@ class UserAccounts(models.Model):
     def __str__(self):
         return self.account_id
 
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
     def set_password(self, raw_password):
         self.account_password = make_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password(raw_password, self.account_password)
+        return timed_check_password(raw_password, self.account_password)
 
     def update_last_login(self):
-        self.last_login = timezone.now()
+        self.account_last_login = timezone.now()
         self.save(update_fields=['account_last_login'])
 
 
@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the last row's (ordering value, id) rather than an
+offset, so fetching page N costs the same indexed range scan as page 1. The
+cursor is an opaque base64url JSON token handed back as ``next_cursor``.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value, pk], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(pk, int):
+        raise InvalidCursor('Invalid cursor')
+    return value, pk
+
+
+def paginate_keyset(queryset, ordering='id', page_size=DEFAULT_PAGE_SIZE, cursor=None):
+    """
+    Return (rows, next_cursor) for one page of queryset.
+
+    ``ordering`` is a single non-null model field, optionally prefixed with
+    '-'; the primary key is appended as a tie-breaker so the order is total
+    and stable. Rows may be model instances or named values_list() rows that
+    include both columns.
+    """
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    pk_name = queryset.model._meta.pk.name
+
+    if field == pk_name:
+        order_by = [ordering]
+    else:
+        order_by = [ordering, f"-{pk_name}" if descending else pk_name]
+    queryset = queryset.order_by(*order_by)
+
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        if field == pk_name:
+            queryset = queryset.filter(**{f"{pk_name}__{op}": pk})
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"{pk_name}__{op}": pk})
+            )
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), getattr(last, pk_name))
+    return rows, next_cursor
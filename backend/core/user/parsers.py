@@ -0,0 +1,26 @@
+"""
+orjson-backed JSON parser, the counterpart of core.user.renderers.
+
+Bodies that orjson cannot decode, or that are not UTF-8, are handed to DRF's
+JSONParser, so accepted input and error messages stay the same.
+"""
+import io
+
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, fast_json_enabled, orjson
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding') or 'utf-8'
+        if not fast_json_enabled() or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        raw = stream.read()
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(raw), media_type, parser_context)
@@ -0,0 +1,121 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from core.data_model.resolver import get_effective_permissions
+from .claims import CLAIM_NAME, decode_claims
+
+
+def get_request_permissions(request):
+    """
+    Resolve the caller's permissions from the access token.
+
+    Uses the embedded claim when present and falls back to the cached
+    resolver keyed by the token's account_id otherwise.
+    """
+    token = request.auth
+    if token is None:
+        return None
+
+    account_id = token.get('account_id')
+    claims = decode_claims(token.get(CLAIM_NAME), account_id)
+    if claims is not None:
+        return claims
+    if account_id is None:
+        return None
+    return get_effective_permissions(account_id)
+
+
+class HasAppPagePermission(BasePermission):
+    """
+    Authorize against an app, page and permission id
+
+    Use require() to build a configured class:
+        @permission_classes([IsAuthenticated, HasAppPagePermission.require('former', 'accounts', 1)])
+
+    With writes_only=True, safe methods (GET, HEAD, OPTIONS) are let through.
+    """
+    app_code = None
+    page_code = None
+    permission_id = None
+    writes_only = False
+    message = 'You do not have permission to access this page.'
+
+    @classmethod
+    def require(cls, app_code, page_code=None, permission_id=None, writes_only=False):
+        name = f"{cls.__name__}_{app_code}_{page_code or 'any'}_{permission_id or 'any'}"
+        if writes_only:
+            name += '_writes'
+        return type(name, (cls,), {
+            'app_code': app_code,
+            'page_code': page_code,
+            'permission_id': permission_id,
+            'writes_only': writes_only,
+        })
+
+    def has_permission(self, request, view):
+        if self.writes_only and request.method in SAFE_METHODS:
+            return True
+        permissions = get_request_permissions(request)
+        if permissions is None:
+            return False
+
+        if self.page_code is None:
+            return permissions.has_app(self.app_code)
+        if self.permission_id is None:
+            return self.page_code in permissions.pages(self.app_code)
+        return permissions.has_permission(self.app_code, self.page_code, self.permission_id)
+
+
+# Screens of the manager app (frontend apps/manager) guarding the user and
+# account endpoints; holding any permission on the page grants access. The
+# app, its pages and the grants of MANAGER_ROLE are created by migration
+# data_model 0008; `manage.py grant_manager <account_id>` hands them out.
+MANAGER_APP = getattr(settings, 'MANAGER_APP_CODE', 'manager')
+MANAGER_ROLE = getattr(settings, 'MANAGER_ROLE_CODE', 'ADMIN')
+MANAGER_PAGES = {'users': 'Users', 'accounts': 'Accounts'}
+CanManageUsers = HasAppPagePermission.require(MANAGER_APP, 'users')
+CanManageAccounts = HasAppPagePermission.require(MANAGER_APP, 'accounts')
+# Roles, permissions, apps, pages and account mappings decide what every
+# other check allows, so changing them takes the accounts page as well
+CanManageAccess = HasAppPagePermission.require(MANAGER_APP, 'accounts', writes_only=True)
+
+
+def grant_manager(account, created_by=0):
+    """
+    Give an account MANAGER_ROLE and the manager app, creating the app, its
+    pages and the role's grants when they are missing
+    """
+    from core.data_model.models import (
+        DmAppName,
+        DmAppPageName,
+        DmMappingAccountApp,
+        DmMappingAccountRole,
+        DmMappingRolePermission,
+        DmPermissions,
+        DmRoles,
+    )
+
+    app, _ = DmAppName.objects.get_or_create(app_code=MANAGER_APP, defaults={'app_name': 'Manager'})
+    role, _ = DmRoles.objects.get_or_create(
+        role_code=MANAGER_ROLE, defaults={'role_name': 'Administrator', 'created_by': created_by}
+    )
+    permission = DmPermissions.objects.filter(permission_name='Manage').first()
+    if permission is None:
+        permission = DmPermissions.objects.create(permission_name='Manage', created_by=created_by)
+    for page_code, page_name in MANAGER_PAGES.items():
+        page, _ = DmAppPageName.objects.get_or_create(
+            page_code=page_code, defaults={'app_code': app, 'page_name': page_name}
+        )
+        DmMappingRolePermission.objects.get_or_create(
+            role_code=role, app_code=app, page_code=page, permission_id=permission,
+            defaults={'created_by': created_by},
+        )
+    DmMappingAccountRole.objects.get_or_create(
+        account_id=account, role_code=role, defaults={'created_by': created_by}
+    )
+    mapping, created = DmMappingAccountApp.objects.get_or_create(
+        account_id=account, app_code=app, defaults={'created_by': created_by}
+    )
+    if not created and not mapping.is_active:
+        mapping.is_active = True
+        mapping.save(update_fields=['is_active'])
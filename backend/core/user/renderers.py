@@ -0,0 +1,43 @@
+"""
+orjson-backed JSON renderer.
+
+Renders the same bytes as DRF's JSONRenderer for the compact, unicode output
+this API uses: datetimes as ISO 8601 with 'Z' for UTC, Decimals as floats,
+UUIDs as strings, and every other type through DRF's JSONEncoder. It falls
+back to the stdlib renderer when orjson is not installed, FAST_JSON is off,
+indented output is requested or orjson rejects the data (e.g. integers
+beyond 64 bits). NaN and infinities render as null rather than raising.
+"""
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fast_json_enabled():
+    return orjson is not None and getattr(settings, 'FAST_JSON', True)
+
+
+class FastJSONRenderer(JSONRenderer):
+    # Types orjson does not know natively (Decimal, lazy strings, ...) go through DRF's encoder
+    _default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            not fast_json_enabled() or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping of the JavaScript line terminators as JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
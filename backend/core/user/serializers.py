@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import UserAccounts, UserCustomUsers, UserStatus
+from .pagination import MAX_PAGE_SIZE
 
 
 class LoginSerializer(serializers.Serializer):
@@ -131,3 +132,63 @@ class UserCustomUsersUpdateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         return instance
+
+
+# ============== LIST QUERY SERIALIZERS ==============
+class ListQuerySerializer(serializers.Serializer):
+    """Query parameters shared by the user and account list endpoints"""
+    status = serializers.IntegerField(required=False)
+    role = serializers.CharField(required=False, max_length=50)
+    branch = serializers.CharField(required=False, max_length=50)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    # Keyset pagination is opt-in: it is used only when page_size or cursor is sent
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=MAX_PAGE_SIZE)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    ordering = serializers.ChoiceField(choices=[], required=False)
+
+    ordering_fields = ('id',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ordering'].choices = [
+            prefix + field for field in self.ordering_fields for prefix in ('', '-')
+        ]
+
+    @property
+    def is_paginated(self):
+        return 'page_size' in self.validated_data or 'cursor' in self.validated_data
+
+
+class UserListQuerySerializer(ListQuerySerializer):
+    ordering_fields = ('id', 'user_id')
+
+
+class AccountListQuerySerializer(ListQuerySerializer):
+    ordering_fields = ('id', 'account_id', 'user_id')
+
+
+# ============== BULK IMPORT SERIALIZERS ==============
+class BulkImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk import; uniqueness and foreign keys are checked per
+    batch in core.user.bulk rather than per row here
+    """
+    user_id = serializers.CharField(max_length=20)
+    user_name = serializers.CharField(max_length=255, required=False)
+    user_full_name = serializers.CharField(max_length=255, required=False)
+    user_email = serializers.EmailField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    user_status_id = serializers.IntegerField(required=False)
+    account_id = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    password = serializers.CharField(write_only=True, min_length=6, required=False)
+    account_role = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if data.get('account_id') and not data.get('password'):
+            raise serializers.ValidationError({'password': ['Password is required when account_id is given.']})
+        return data
+
+
+class BulkImportSerializer(serializers.Serializer):
+    rows = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=10000)
+    all_or_nothing = serializers.BooleanField(default=False)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.data_model.versions import register_collection
+from .authentication import account_cache
+from .models import UserAccounts, UserStatus
+
+
+# ============== ACCOUNT CACHE INVALIDATION ==============
+@receiver([post_save, post_delete], sender=UserAccounts)
+def invalidate_cached_account(sender, instance, **kwargs):
+    account_cache.delete(instance.account_id)
+    # account_id itself may have been renamed; drop the entry under the old key too
+    account_cache.delete_matching(lambda account: account.pk == instance.pk)
+
+
+# ============== COLLECTION VERSIONS ==============
+register_collection(UserStatus, 'user_status')
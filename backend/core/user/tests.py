@@ -0,0 +1,637 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from configs import metrics
+from core.data_model import resolver, serializers as dm_serializers
+from core.data_model.models import (
+    DmAppName,
+    DmAppPageName,
+    DmBranch,
+    DmFactory,
+    DmMachine,
+    DmMachineLine,
+    DmMappingAccountApp,
+    DmMappingAccountBranch,
+    DmMappingAccountRole,
+    DmPermissions,
+    DmRoles,
+)
+from .fast_serializers import get_fast_serializer
+from .authentication import account_cache, get_cached_account
+from .blacklist import BlacklistCache
+from .bulk import hash_passwords
+from .cache import TTLCache
+from .last_login import last_login_buffer
+from .models import UserAccounts, UserCustomUsers, UserStatus
+from .pagination import encode_cursor, paginate_keyset
+from .permissions import MANAGER_APP, MANAGER_ROLE, grant_manager
+from .serializers import UserAccountListSerializer, UserCustomUsersListSerializer, UserStatusSerializer
+from .tokens import get_tokens_for_user
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+# ============== LOGIN ==============
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginQueryCountTests(TestCase):
+    """Every login outcome costs exactly one query: account, profile and status together"""
+
+    @classmethod
+    def setUpTestData(cls):
+        active = UserStatus.objects.create(status_name='Active', created_by=0)
+        inactive = UserStatus.objects.create(status_name='Inactive', created_by=0)
+        role = DmRoles.objects.create(role_code='R1', role_name='Role', created_by=0)
+
+        def account(account_id, status=None):
+            user_account = UserAccounts(user_id=f"U-{account_id}", account_id=account_id, account_role=role)
+            user_account.set_password('secret')
+            user_account.save()
+            if status is not None:
+                UserCustomUsers.objects.create(
+                    user_id=f"U-{account_id}", user_name=account_id, user_full_name=account_id,
+                    user_status=status, user_account=user_account,
+                )
+            return user_account
+
+        account('active', active)
+        account('inactive', inactive)
+        account('no-profile')
+
+    def tearDown(self):
+        # Keep buffered last-login writes from reaching the next test
+        last_login_buffer.flush()
+
+    def login(self, path, account_id, password):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                path, {'account_id': account_id, 'password': password}, content_type='application/json'
+            )
+        return response, len(queries)
+
+    def assertLogin(self, account_id, password, status_code, error=None):
+        for path in ('/user/login/', '/user/login/async/'):
+            with self.subTest(path=path):
+                response, queries = self.login(path, account_id, password)
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(queries, 1)
+                if error is not None:
+                    self.assertEqual(response.json()['error'], error)
+        return response
+
+    def test_success(self):
+        response = self.assertLogin('active', 'secret', 200)
+        data = response.json()
+        self.assertEqual(data['account_id'], 'active')
+        self.assertEqual(data['user_id'], 'U-active')
+        self.assertTrue(data['access_token'])
+        self.assertTrue(data['refresh_token'])
+
+    def test_bad_password(self):
+        self.assertLogin('active', 'wrong', 401, 'Invalid credentials')
+
+    def test_unknown_account(self):
+        self.assertLogin('nobody', 'secret', 401, 'Invalid credentials')
+
+    def test_inactive_account(self):
+        self.assertLogin('inactive', 'secret', 403, 'Account inactive')
+
+    def test_missing_profile(self):
+        self.assertLogin('no-profile', 'secret', 404, 'User not found')
+
+
+class LastLoginBufferTests(TestCase):
+    def test_flush_refreshes_the_account_cache(self):
+        account = UserAccounts.objects.create(user_id='U-buffered', account_id='buffered')
+        account_cache.clear()
+        self.assertIsNone(get_cached_account('buffered').account_last_login)
+
+        when = last_login_buffer.record(account)
+        self.assertEqual(last_login_buffer.flush(), 1)
+        self.assertEqual(UserAccounts.objects.get(pk=account.pk).account_last_login, when)
+        self.assertEqual(get_cached_account('buffered').account_last_login, when)
+
+
+# ============== AUTHENTICATION ==============
+class TTLCacheTests(SimpleTestCase):
+    def test_entries_expire_after_the_ttl(self):
+        cache = TTLCache(ttl=10)
+        with mock.patch('core.user.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('core.user.cache.time.monotonic', return_value=109):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('core.user.cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+
+class AccountCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = UserAccounts.objects.create(user_id='U-cached', account_id='cached')
+
+    def setUp(self):
+        account_cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {get_tokens_for_user(self.account)['access']}"}
+
+    def test_requests_after_the_first_authenticate_without_a_query(self):
+        self.client.get('/user/statuses/', **self.auth)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/user/statuses/', **self.auth).status_code, 200)
+        self.assertFalse([query for query in queries if 'FROM "user_account"' in query['sql']])
+
+    def test_callers_get_copies(self):
+        first = get_cached_account('cached')
+        first.account_id = 'changed'
+        self.assertEqual(get_cached_account('cached').account_id, 'cached')
+
+    def test_saving_or_deleting_an_account_drops_its_entry(self):
+        get_cached_account('cached')
+        account = UserAccounts.objects.get(account_id='cached')
+        account.account_id = 'renamed'
+        account.save()
+        self.assertIsNone(get_cached_account('cached'))
+        self.assertEqual(get_cached_account('renamed').pk, account.pk)
+
+        account.delete()
+        self.assertIsNone(get_cached_account('renamed'))
+        # The token still names the old account_id
+        self.assertEqual(self.client.get('/user/statuses/', **self.auth).status_code, 401)
+
+
+# ============== TOKEN BLACKLIST ==============
+class BlacklistCacheTests(TestCase):
+    def setUp(self):
+        self.cache = BlacklistCache(sync_interval=0, overlap=60, full_sync_interval=300)
+        self.now = timezone.now()
+
+    def blacklist(self, jti, seconds_ago=0, expires_in=3600):
+        token = OutstandingToken.objects.create(
+            jti=jti, token=jti, expires_at=self.now + timedelta(seconds=expires_in)
+        )
+        blacklisted = BlacklistedToken.objects.create(token=token)
+        # As if the writing transaction stamped the row this long before it committed
+        BlacklistedToken.objects.filter(pk=blacklisted.pk).update(
+            blacklisted_at=self.now - timedelta(seconds=seconds_ago)
+        )
+
+    def sync(self, monotonic):
+        with mock.patch('core.user.blacklist.time.monotonic', return_value=monotonic):
+            self.cache.sync(force=True)
+
+    def test_pulls_reach_back_by_the_overlap(self):
+        self.blacklist('first')
+        self.sync(1000)
+        self.assertIn('first', self.cache._revoked)
+
+        self.blacklist('late', seconds_ago=30)
+        self.blacklist('too-late', seconds_ago=120)
+        self.sync(1001)
+        self.assertIn('late', self.cache._revoked)
+        self.assertNotIn('too-late', self.cache._revoked)
+
+        # The periodic full reload catches what the overlap missed
+        self.sync(1000 + 300)
+        self.assertIn('too-late', self.cache._revoked)
+
+    def test_full_reload_drops_pruned_and_expired_tokens(self):
+        self.blacklist('kept')
+        self.blacklist('pruned')
+        self.blacklist('expiring', expires_in=5)
+        self.sync(1000)
+        self.assertEqual(len(self.cache), 3)
+
+        OutstandingToken.objects.filter(jti='pruned').delete()
+        with mock.patch('core.user.blacklist.time.time', return_value=self.now.timestamp() + 10):
+            self.sync(1000 + 300)
+        self.assertEqual(set(self.cache._revoked), {'kept'})
+
+    def test_revoke_persists_and_mirrors_at_once(self):
+        token = RefreshToken()
+        token['exp'] = int(self.now.timestamp()) + 3600
+        before = metrics.registry.samples[metrics.TOKENS_BLACKLISTED.name].get((), 0)
+        self.cache.sync_interval = 60
+        self.sync(1000)
+        self.cache.revoke(token)
+        self.cache.revoke(token)
+
+        with self.assertNumQueries(0), mock.patch('core.user.blacklist.time.monotonic', return_value=1001):
+            self.assertTrue(self.cache.is_revoked(token['jti']))
+        self.assertEqual(BlacklistedToken.objects.filter(token__jti=token['jti']).count(), 1)
+        self.assertEqual(metrics.registry.samples[metrics.TOKENS_BLACKLISTED.name].get((), 0) - before, 1)
+
+
+# ============== LIST PAGINATION ==============
+class AccountListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = DmRoles.objects.create(role_code='LISTED', role_name='Listed', created_by=0)
+        cls.manager = UserAccounts.objects.create(user_id='U-lister', account_id='lister')
+        grant_manager(cls.manager)
+        for i in range(5):
+            UserAccounts.objects.create(
+                user_id=f"U-acct-{4 - i}", account_id=f"acct-{i}", account_role=cls.role if i % 2 else None
+            )
+        branch = DmBranch.objects.create(
+            factory_code=DmFactory.objects.create(factory_code='LF', factory_name='LF'),
+            branch_type='T', branch_code='LB', branch_name='LB',
+        )
+        DmMappingAccountBranch.objects.create(account_id_id='acct-2', branch_code=branch, role_code=cls.role)
+
+    def setUp(self):
+        resolver.invalidate()
+        account_cache.clear()
+
+    def get(self, **params):
+        access = get_tokens_for_user(self.manager)['access']
+        return self.client.get('/user/accounts/', params, HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def account_ids(self, rows):
+        return [row['account_id'] for row in rows]
+
+    def test_pages_hold_every_row_once_in_order(self):
+        for ordering in ('id', '-account_id', 'user_id'):
+            with self.subTest(ordering=ordering):
+                expected = self.account_ids(self.get(ordering=ordering).json())
+                seen, cursor, pages = [], '', 0
+                while True:
+                    body = self.get(ordering=ordering, page_size=2, cursor=cursor).json()
+                    seen += self.account_ids(body['results'])
+                    pages += 1
+                    cursor = body['next_cursor']
+                    if cursor is None:
+                        break
+                self.assertEqual(seen, expected)
+                self.assertEqual(pages, 3)
+
+    def test_ties_are_broken_by_id(self):
+        for created_by in (1, 1, 1, 2, 2):
+            UserStatus.objects.create(status_name=f"S{created_by}", created_by=created_by)
+        statuses = UserStatus.objects.filter(created_by__gt=0)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = paginate_keyset(statuses, ordering='-created_by', page_size=2, cursor=cursor)
+            seen += [status.pk for status in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(statuses.order_by('-created_by', '-status_id').values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ('not-a-cursor', encode_cursor('acct-1', 'x')):
+            with self.subTest(cursor=cursor):
+                response = self.get(cursor=cursor)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+    def test_filters(self):
+        self.assertEqual(self.account_ids(self.get(role='LISTED', ordering='account_id').json()), ['acct-1', 'acct-3'])
+        self.assertEqual(self.account_ids(self.get(branch='LB').json()), ['acct-2'])
+        self.assertEqual(self.get(ordering='name').status_code, 400)
+
+
+# ============== EXPORTS ==============
+class UserExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = UserAccounts.objects.create(user_id='U-exporter', account_id='exporter')
+        grant_manager(cls.manager)
+        cls.active = UserStatus.objects.create(status_name='Active', created_by=0)
+        inactive = UserStatus.objects.create(status_name='Inactive', created_by=0)
+        for i in range(3):
+            UserCustomUsers.objects.create(
+                user_id=f"U-export-{i}", user_name=f"export{i}", user_full_name=f'Export "{i}", Jr',
+                user_status=cls.active if i < 2 else inactive,
+                user_account=cls.manager if i == 0 else None,
+            )
+
+    def setUp(self):
+        resolver.invalidate()
+        account_cache.clear()
+
+    def get(self, path, **params):
+        access = get_tokens_for_user(self.manager)['access']
+        return self.client.get(path, params, HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_ndjson_holds_the_list_rows(self):
+        response = self.get('/user/users/export/', status=self.active.pk)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="users.ndjson"')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, self.get('/user/users/', status=self.active.pk, ordering='id').json())
+        self.assertEqual(len(rows), 2)
+
+    def test_csv_flattens_nested_rows(self):
+        response = self.get('/user/users/export/', output='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['user_full_name'] for row in rows], ['Export "0", Jr', 'Export "1", Jr', 'Export "2", Jr'])
+        self.assertEqual(rows[0]['user_status.status_name'], 'Active')
+        self.assertEqual(rows[0]['user_account.account_id'], 'exporter')
+        # No account: the nested columns are blank rather than missing
+        self.assertEqual(rows[1]['user_account.account_id'], '')
+        self.assertNotIn('user_account.account_password', rows[0])
+
+    def test_unknown_output_is_a_bad_request(self):
+        self.assertEqual(self.get('/user/accounts/export/', output='xml').status_code, 400)
+
+
+# ============== BULK IMPORT ==============
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = UserAccounts.objects.create(user_id='U-importer', account_id='importer')
+        grant_manager(cls.manager)
+        cls.active = UserStatus.objects.create(status_name='Active', created_by=0)
+        cls.role = DmRoles.objects.create(role_code='IMPORTED', role_name='Imported', created_by=0)
+        UserCustomUsers.objects.create(
+            user_id='U-existing', user_name='existing', user_full_name='Existing', user_status=cls.active
+        )
+
+    def setUp(self):
+        resolver.invalidate()
+        account_cache.clear()
+
+    def post(self, rows, account=None, **options):
+        access = get_tokens_for_user(account or self.manager)['access']
+        return self.client.post(
+            '/user/users/import/', {'rows': rows, **options},
+            content_type='application/json', HTTP_AUTHORIZATION=f"Bearer {access}",
+        )
+
+    def new_user(self, user_id, **fields):
+        return {
+            'user_id': user_id, 'user_name': user_id.lower(), 'user_full_name': f"Imported {user_id}",
+            'user_status_id': self.active.pk, **fields,
+        }
+
+    def test_hashes_keep_the_order_of_the_passwords(self):
+        raw = [f"password-{i}" for i in range(8)]
+        hashes = hash_passwords(raw, workers=4)
+        self.assertEqual(len(hashes), len(raw))
+        for password, encoded in zip(raw, hashes):
+            self.assertTrue(check_password(password, encoded))
+        self.assertEqual(hash_passwords([]), [])
+
+    def test_creates_users_and_accounts_that_can_log_in(self):
+        response = self.post([
+            self.new_user('U-new-1', account_id='new-1', password='secret-1', account_role='IMPORTED'),
+            self.new_user('U-new-2'),
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {
+            'created_users': 2, 'created_accounts': 1, 'linked_accounts': 0, 'errors': [],
+        })
+        user = UserCustomUsers.objects.select_related('user_account').get(user_id='U-new-1')
+        self.assertEqual(user.user_account.account_id, 'new-1')
+        self.assertEqual(user.user_account.account_role_id, 'IMPORTED')
+        self.assertTrue(user.user_account.check_password('secret-1'))
+        self.assertIsNone(UserCustomUsers.objects.get(user_id='U-new-2').user_account)
+
+        # The login is buffered for last_login; write it here rather than in a later test
+        self.addCleanup(last_login_buffer.flush)
+        login = self.client.post(
+            '/user/login/', {'account_id': 'new-1', 'password': 'secret-1'}, content_type='application/json'
+        )
+        self.assertEqual(login.status_code, 200)
+
+    def test_links_an_account_to_an_existing_user(self):
+        response = self.post([{'user_id': 'U-existing', 'account_id': 'existing', 'password': 'secret-1'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['linked_accounts'], 1)
+        self.assertEqual(response.json()['created_users'], 0)
+        self.assertEqual(UserCustomUsers.objects.get(user_id='U-existing').user_account.account_id, 'existing')
+
+    def test_reports_errors_per_row_and_keeps_the_valid_ones(self):
+        response = self.post([
+            self.new_user('U-ok'),
+            {'user_id': 'U-existing'},
+            self.new_user('U-bad-status', user_status_id=999999),
+            self.new_user('U-no-password', account_id='no-password'),
+            self.new_user('U-ok'),
+            self.new_user('U-taken', account_id='importer', password='secret-1'),
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['created_users'], 1)
+        self.assertEqual(
+            {error['row']: sorted(error['errors']) for error in body['errors']},
+            {1: ['user_id'], 2: ['user_status_id'], 3: ['password'], 4: ['user_id'], 5: ['account_id']},
+        )
+        self.assertEqual(
+            list(UserCustomUsers.objects.filter(user_id__startswith='U-').exclude(user_id='U-existing')
+                 .values_list('user_id', flat=True)),
+            ['U-ok'],
+        )
+
+    def test_all_or_nothing_rejects_the_batch_on_any_error(self):
+        response = self.post(
+            [self.new_user('U-kept', account_id='kept', password='secret-1'), {'user_id': 'U-existing'}],
+            all_or_nothing=True,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created_users'], 0)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [1])
+        self.assertFalse(UserCustomUsers.objects.filter(user_id='U-kept').exists())
+        self.assertFalse(UserAccounts.objects.filter(account_id='kept').exists())
+
+    def test_invalid_body_is_rejected(self):
+        response = self.post([])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid input')
+
+    def test_requires_a_manager(self):
+        clerk = UserAccounts.objects.create(user_id='U-clerk', account_id='clerk')
+        response = self.post([self.new_user('U-sneaky')], account=clerk)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UserCustomUsers.objects.filter(user_id='U-sneaky').exists())
+
+
+# ============== FAST LIST SERIALIZERS ==============
+class FastListSerializerTests(TestCase):
+    """The fast path renders every list endpoint byte for byte like DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = DmRoles.objects.create(role_code='R1', role_name='Role', role_description='Described', created_by=1)
+        DmRoles.objects.create(role_code='R2', role_name='Bare', created_by=1, updated_by=2)
+        DmPermissions.objects.create(permission_name='view', created_by=1)
+        DmPermissions.objects.create(permission_name='edit', permission_description='Edit', created_by=1)
+        app = DmAppName.objects.create(app_code='A1', app_name='App')
+        DmAppPageName.objects.create(app_code=app, page_code='P1', page_name='Page')
+
+        factory = DmFactory.objects.create(factory_code='F1', factory_name='Factory')
+        branch = DmBranch.objects.create(factory_code=factory, branch_type='T', branch_code='B1', branch_name='Branch')
+        machine = DmMachine.objects.create(branch_code=branch, machine_code='M1', machine_name='Machine')
+        DmMachineLine.objects.create(machine_code=machine, line_code='L1', line_name='Line')
+
+        status = UserStatus.objects.create(status_name='Active', created_by=0)
+        UserStatus.objects.create(status_name='Inactive', created_by=0)
+        with_role = UserAccounts.objects.create(user_id='U1', account_id='with-role', account_role=role)
+        # Null foreign key, rendered as null and as a null role_name
+        without_role = UserAccounts.objects.create(user_id='U2', account_id='without-role')
+        UserCustomUsers.objects.create(
+            user_id='U1', user_name='one', user_full_name='One', user_email='one@example.com',
+            user_status=status, user_account=with_role,
+        )
+        UserCustomUsers.objects.create(
+            user_id='U2', user_name='two', user_full_name='Two', user_status=status, user_account=without_role,
+        )
+        # Null nested object
+        UserCustomUsers.objects.create(user_id='U3', user_name='three', user_full_name='Three', user_status=status)
+
+        DmMappingAccountRole.objects.create(account_id=with_role, role_code=role, created_by=1)
+        DmMappingAccountApp.objects.create(account_id=with_role, app_code=app, created_by=1)
+        DmMappingAccountBranch.objects.create(account_id=with_role, branch_code=branch, role_code=role)
+
+    def assertSameAsDRF(self, queryset, serializer_class):
+        fast = get_fast_serializer(serializer_class)
+        self.assertIsNotNone(fast, f"{serializer_class.__name__} is not compiled")
+        queryset = queryset.order_by('pk')
+        self.assertTrue(queryset.exists())
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(fast.serialize(queryset)),
+            renderer.render(serializer_class(queryset, many=True).data),
+        )
+
+    def test_every_list_serializer(self):
+        cases = [
+            (DmFactory.objects.all(), dm_serializers.DmFactorySerializer),
+            (DmBranch.objects.all(), dm_serializers.DmBranchSerializer),
+            (DmMachine.objects.all(), dm_serializers.DmMachineSerializer),
+            (DmMachineLine.objects.all(), dm_serializers.DmMachineLineSerializer),
+            (DmRoles.objects.all(), dm_serializers.DmRolesSerializer),
+            (DmPermissions.objects.all(), dm_serializers.DmPermissionsSerializer),
+            (DmAppName.objects.all(), dm_serializers.DmAppNameSerializer),
+            (DmAppPageName.objects.all(), dm_serializers.DmAppPageNameSerializer),
+            (DmMappingAccountRole.objects.all(), dm_serializers.DmMappingAccountRoleSerializer),
+            (DmMappingAccountApp.objects.all(), dm_serializers.DmMappingAccountAppSerializer),
+            (DmMappingAccountBranch.objects.all(), dm_serializers.DmMappingAccountBranchSerializer),
+            (UserStatus.objects.all(), UserStatusSerializer),
+            (UserAccounts.objects.select_related('account_role'), UserAccountListSerializer),
+            (UserCustomUsers.objects.select_related('user_status', 'user_account__account_role'),
+             UserCustomUsersListSerializer),
+        ]
+        for queryset, serializer_class in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertSameAsDRF(queryset, serializer_class)
+
+    def test_null_relations(self):
+        accounts = get_fast_serializer(UserAccountListSerializer).serialize(
+            UserAccounts.objects.filter(account_id='without-role')
+        )
+        self.assertIsNone(accounts[0]['account_role'])
+        self.assertIsNone(accounts[0]['role_name'])
+        users = get_fast_serializer(UserCustomUsersListSerializer).serialize(
+            UserCustomUsers.objects.filter(user_id='U3')
+        )
+        self.assertIsNone(users[0]['user_account'])
+        self.assertEqual(users[0]['user_status']['status_name'], 'Active')
+
+
+# ============== MANAGER ACCESS ==============
+class ManagerAccessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = DmRoles.objects.create(role_code='CLERK', role_name='Clerk', created_by=0)
+        cls.account = UserAccounts.objects.create(user_id='U-clerk', account_id='clerk', account_role=cls.role)
+
+    def setUp(self):
+        # In-process caches outlive the rolled-back rows of other tests
+        resolver.invalidate()
+        account_cache.clear()
+
+    def request(self, method, path, data=None):
+        access = get_tokens_for_user(self.account)['access']
+        return getattr(self.client, method)(
+            path, data, content_type='application/json', HTTP_AUTHORIZATION=f"Bearer {access}"
+        )
+
+    def test_migration_creates_the_manager_app_and_grants(self):
+        self.assertTrue(DmAppName.objects.filter(app_code=MANAGER_APP).exists())
+        self.assertEqual(
+            set(DmAppPageName.objects.filter(app_code=MANAGER_APP).values_list('page_code', flat=True)),
+            {'users', 'accounts'},
+        )
+        self.assertTrue(DmRoles.objects.filter(role_code=MANAGER_ROLE).exists())
+
+    def test_account_without_grant_is_refused(self):
+        self.assertEqual(self.request('get', '/user/users/').status_code, 403)
+        self.assertEqual(self.request('get', '/user/accounts/').status_code, 403)
+        # Nor can it grant itself the manager app, a role or a branch
+        grants = [
+            ('/data-model/mapping-account-apps/', {'account_id': 'clerk', 'app_code': MANAGER_APP}),
+            ('/data-model/mapping-account-roles/', {'account_id': 'clerk', 'role_code': MANAGER_ROLE}),
+            ('/data-model/roles/', {'role_code': 'NEW', 'role_name': 'New'}),
+        ]
+        for path, body in grants:
+            with self.subTest(path=path):
+                self.assertEqual(self.request('post', path, body).status_code, 403)
+        self.assertFalse(DmMappingAccountApp.objects.filter(account_id='clerk').exists())
+        # Reading reference data stays open
+        self.assertEqual(self.request('get', '/data-model/roles/').status_code, 200)
+
+    def test_granted_account_is_allowed(self):
+        call_command('grant_manager', 'clerk', stdout=StringIO())
+        self.assertEqual(self.request('get', '/user/users/').status_code, 200)
+        self.assertEqual(self.request('get', '/user/accounts/').status_code, 200)
+        response = self.request('post', '/data-model/roles/', {'role_code': 'NEW', 'role_name': 'New'})
+        self.assertEqual(response.status_code, 201)
+
+
+# ============== REFERENCE DATA ==============
+class UserStatusCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        UserStatus.objects.create(status_name='Active', created_by=0)
+        cls.account = UserAccounts.objects.create(user_id='U-statuses', account_id='statuses')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {get_tokens_for_user(self.account)['access']}"}
+
+    def lookups(self, result):
+        return metrics.CACHE_LOOKUPS.registry.samples[metrics.CACHE_LOOKUPS.name].get(('reference_data', result), 0)
+
+    def test_list_is_served_from_the_cache_until_a_status_changes(self):
+        hits, misses = self.lookups('hit'), self.lookups('miss')
+        first = self.client.get('/user/statuses/', **self.auth)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get('/user/statuses/', **self.auth)
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([query for query in queries if 'FROM "user_status"' in query['sql']])
+        self.assertEqual((self.lookups('hit') - hits, self.lookups('miss') - misses), (1, 1))
+
+        not_modified = self.client.get('/user/statuses/', HTTP_IF_NONE_MATCH=first['ETag'], **self.auth)
+        self.assertEqual(not_modified.status_code, 304)
+
+        # Registered from core.user.signals, so saving a status moves the version
+        UserStatus.objects.create(status_name='Inactive', created_by=0)
+        third = self.client.get('/user/statuses/', HTTP_IF_NONE_MATCH=first['ETag'], **self.auth)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+        self.assertEqual([row['status_name'] for row in third.json()], ['Active', 'Inactive'])
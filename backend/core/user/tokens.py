@@ -1,4 +1,53 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from configs.metrics import BLACKLIST_REJECTIONS
+from .blacklist import blacklist_cache
+from .claims import CLAIM_NAME, encode_claims
+
+
+class RefreshToken(BaseRefreshToken):
+    """RefreshToken whose blacklist checks are served by blacklist_cache"""
+
+    def check_blacklist(self):
+        if blacklist_cache.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            BLACKLIST_REJECTIONS.inc()
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        return blacklist_cache.revoke(self)
+
+
+def rotate_refresh_token(refresh):
+    """
+    Apply ROTATE_REFRESH_TOKENS / BLACKLIST_AFTER_ROTATION to a verified
+    refresh token in place, the way simplejwt's TokenRefreshSerializer does
+    """
+    if not api_settings.ROTATE_REFRESH_TOKENS:
+        return refresh
+    if api_settings.BLACKLIST_AFTER_ROTATION:
+        refresh.blacklist()
+    refresh.set_jti()
+    refresh.set_exp()
+    refresh.set_iat()
+    return refresh
+
+
+def get_access_token(refresh):
+    """
+    Derive the access token of a RefreshToken
+
+    With JWT_EMBED_PERMISSION_CLAIMS on, the account's roles, page permissions
+    and branches are packed into the access token so protected views can
+    authorize without touching the database.
+    """
+    access = refresh.access_token
+    if getattr(settings, 'JWT_EMBED_PERMISSION_CLAIMS', False) and 'account_id' in refresh:
+        access[CLAIM_NAME] = encode_claims(refresh['account_id'])
+    return access
 
 
 def get_tokens_for_user(user_account):
@@ -18,5 +67,5 @@ def get_tokens_for_user(user_account):
     
     return {
         'refresh': str(refresh),
-        'access': str(refresh.access_token),
+        'access': str(get_access_token(refresh)),
     }
@@ -1,11 +1,12 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'user'
 
 urlpatterns = [
     # Authentication
     path('login/', views.login_view, name='login'),
+    path('login/async/', async_views.login_async_view, name='login_async'),
     path('logout/', views.logout_view, name='logout'),
     path('refresh/', views.refresh_token_view, name='refresh_token'),
     
@@ -14,10 +15,13 @@ urlpatterns = [
     
     # Users CRUD
     path('users/', views.user_list_create, name='user_list_create'),
+    path('users/export/', views.user_export, name='user_export'),
+    path('users/import/', views.bulk_import_view, name='user_bulk_import'),
     path('users/<int:pk>/', views.user_detail, name='user_detail'),
     
     # Accounts CRUD
     path('accounts/', views.account_list_create, name='account_list_create'),
+    path('accounts/export/', views.account_export, name='account_export'),
     path('accounts/<int:pk>/', views.account_detail, name='account_detail'),
     path('accounts/<int:pk>/reset-password/', views.account_reset_password, name='account_reset_password'),
 ]
@@ -2,9 +2,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
+from configs.metrics import LOGINS, LOGIN_OUTCOMES, REFRESH_OUTCOMES, TOKEN_REFRESHES, count_outcomes
+from core.data_model.versions import conditional
 from .models import UserAccounts, UserCustomUsers, UserStatus
 from .serializers import (
     LoginSerializer,
@@ -16,12 +18,23 @@ from .serializers import (
     UserCustomUsersListSerializer,
     UserCustomUsersCreateSerializer,
     UserCustomUsersUpdateSerializer,
+    UserListQuerySerializer,
+    AccountListQuerySerializer,
+    BulkImportSerializer,
 )
-from .tokens import get_tokens_for_user
+from .bulk import bulk_import
+from .exports import CONTENT_TYPES, EXPORTERS
+from .fast_serializers import get_fast_serializer, serialize_list
+from .filters import filter_accounts, filter_users
+from .permissions import CanManageAccounts, CanManageUsers
+from .pagination import DEFAULT_PAGE_SIZE, InvalidCursor, paginate_keyset
+from .last_login import last_login_buffer
+from .tokens import RefreshToken, get_access_token, get_tokens_for_user, rotate_refresh_token
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@count_outcomes(LOGINS, LOGIN_OUTCOMES)
 def login_view(request):
     """    
     Request:
@@ -53,8 +66,12 @@ def login_view(request):
     password = serializer.validated_data['password']
     
     try:
-        # Find user account
-        user_account = UserAccounts.objects.get(account_id=account_id)
+        # Find user account together with its profile and status in one query
+        user_account = (
+            UserAccounts.objects
+            .select_related('user_account__user_status')
+            .get(account_id=account_id)
+        )
         
         # Check password
         if not user_account.check_password(password):
@@ -65,7 +82,7 @@ def login_view(request):
         
         # Get user details
         try:
-            custom_user = UserCustomUsers.objects.get(user_account=user_account)
+            custom_user = user_account.user_account
             
             # Check if user is active
             if custom_user.user_status.status_name.lower() != 'active':
@@ -74,8 +91,8 @@ def login_view(request):
                     'message': 'Your account is not active. Please contact administrator.'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Update last login
-            user_account.update_last_login()
+            # Update last login (written behind by last_login_buffer)
+            last_login_buffer.record(user_account)
             
             # Generate JWT tokens using custom generator
             tokens = get_tokens_for_user(user_account)
@@ -91,7 +108,7 @@ def login_view(request):
                 'refresh_token': tokens['refresh'],
                 'token_type': 'Bearer',
                 'expires_in': 3600,  # 1 hour in seconds
-                'last_login': user_account.last_login
+                'last_login': user_account.account_last_login
             }
             
             return Response(response_data, status=status.HTTP_200_OK)
@@ -148,6 +165,7 @@ def logout_view(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@count_outcomes(TOKEN_REFRESHES, REFRESH_OUTCOMES)
 def refresh_token_view(request):
     """   
     Request body:
@@ -173,10 +191,12 @@ def refresh_token_view(request):
         
         # Create new tokens from refresh token
         token = RefreshToken(refresh_token)
+        access_token = get_access_token(token)
+        rotate_refresh_token(token)
         
         # Get new access and refresh tokens
         response_data = {
-            'access_token': str(token.access_token),
+            'access_token': str(access_token),
             'refresh_token': str(token),  # New refresh token due to ROTATE_REFRESH_TOKENS
             'token_type': 'Bearer',
             'expires_in': 3600,  # 1 hour in seconds
@@ -194,25 +214,72 @@ def refresh_token_view(request):
 # ============== USER STATUS VIEWS ==============
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('user_status', cache=True)
 def user_status_list(request):
     """Get all user statuses"""
     statuses = UserStatus.objects.all()
-    serializer = UserStatusSerializer(statuses, many=True)
-    return Response(serializer.data)
+    return Response(serialize_list(statuses, UserStatusSerializer))
+
+
+def _list_response(queryset, query, serializer_class):
+    """
+    Serialize a filtered list, as a plain array by default or as a keyset
+    page { "results", "next_cursor" } when page_size or cursor is sent
+    """
+    params = query.validated_data
+    ordering = params.get('ordering')
+
+    if not query.is_paginated:
+        if ordering:
+            queryset = queryset.order_by(ordering, 'id')
+        return Response(serialize_list(queryset, serializer_class))
+
+    fast = get_fast_serializer(serializer_class)
+    if fast is not None:
+        queryset = fast.values(queryset, (ordering or 'id').lstrip('-'), 'id')
+    try:
+        rows, next_cursor = paginate_keyset(
+            queryset,
+            ordering=ordering or 'id',
+            page_size=params.get('page_size', DEFAULT_PAGE_SIZE),
+            cursor=params.get('cursor'),
+        )
+    except InvalidCursor as e:
+        return Response({
+            'error': 'Invalid cursor',
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'results': fast.render(rows) if fast is not None else serializer_class(rows, many=True).data,
+        'next_cursor': next_cursor,
+    })
 
 
 # ============== USER VIEWS (CRUD) ==============
 @api_view(['GET', 'POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageUsers])
 def user_list_create(request):
     """
-    GET: List all users
+    GET: List users
+        Filters: status, role, branch, created_after, created_before
+        Ordering: ordering=id|user_id (prefix '-' for descending)
+        Pagination (opt-in): page_size, cursor
     POST: Create a new user
     """
     if request.method == 'GET':
-        users = UserCustomUsers.objects.select_related('user_status', 'user_account').all()
-        serializer = UserCustomUsersListSerializer(users, many=True)
-        return Response(serializer.data)
+        query = UserListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                'error': 'Invalid query',
+                'details': query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        users = filter_users(
+            UserCustomUsers.objects.select_related('user_status', 'user_account'),
+            query.validated_data
+        )
+        return _list_response(users, query, UserCustomUsersListSerializer)
     
     elif request.method == 'POST':
         serializer = UserCustomUsersCreateSerializer(data=request.data)
@@ -226,7 +293,7 @@ def user_list_create(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageUsers])
 def user_detail(request, pk):
     """
     GET: Retrieve a user
@@ -259,16 +326,28 @@ def user_detail(request, pk):
 
 # ============== ACCOUNT VIEWS (CRUD) ==============
 @api_view(['GET', 'POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageAccounts])
 def account_list_create(request):
     """
-    GET: List all accounts
+    GET: List accounts
+        Filters: status, role, branch, created_after, created_before
+        Ordering: ordering=id|account_id|user_id (prefix '-' for descending)
+        Pagination (opt-in): page_size, cursor
     POST: Create a new account
     """
     if request.method == 'GET':
-        accounts = UserAccounts.objects.select_related('account_role').all()
-        serializer = UserAccountListSerializer(accounts, many=True)
-        return Response(serializer.data)
+        query = AccountListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                'error': 'Invalid query',
+                'details': query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        accounts = filter_accounts(
+            UserAccounts.objects.select_related('account_role'),
+            query.validated_data
+        )
+        return _list_response(accounts, query, UserAccountListSerializer)
     
     elif request.method == 'POST':
         serializer = UserAccountCreateSerializer(data=request.data)
@@ -289,7 +368,7 @@ def account_list_create(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageAccounts])
 def account_detail(request, pk):
     """
     GET: Retrieve an account
@@ -322,7 +401,7 @@ def account_detail(request, pk):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, CanManageAccounts])
 def account_reset_password(request, pk):
     """
     Reset password for an account
@@ -337,3 +416,102 @@ def account_reset_password(request, pk):
         account.save()
         return Response({'message': 'Password reset successfully'})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# ============== EXPORT VIEWS ==============
+def _export_response(request, queryset, query_serializer_class, filter_func, serializer_class, filename):
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORTERS:
+        return Response({
+            'error': 'Invalid output',
+            'message': f"output must be one of: {', '.join(EXPORTERS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    query = query_serializer_class(data=request.query_params)
+    if not query.is_valid():
+        return Response({
+            'error': 'Invalid query',
+            'details': query.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = filter_func(queryset, query.validated_data).order_by('id')
+    response = StreamingHttpResponse(
+        EXPORTERS[output](queryset, serializer_class),
+        content_type=CONTENT_TYPES[output]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, CanManageUsers])
+def user_export(request):
+    """
+    Stream all users as NDJSON (default) or CSV
+    Query: output=ndjson|csv plus the filters of user_list_create
+    """
+    return _export_response(
+        request,
+        UserCustomUsers.objects.select_related('user_status', 'user_account', 'user_account__account_role'),
+        UserListQuerySerializer,
+        filter_users,
+        UserCustomUsersListSerializer,
+        'users'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, CanManageAccounts])
+def account_export(request):
+    """
+    Stream all accounts as NDJSON (default) or CSV
+    Query: output=ndjson|csv plus the filters of account_list_create
+    """
+    return _export_response(
+        request,
+        UserAccounts.objects.select_related('account_role'),
+        AccountListQuerySerializer,
+        filter_accounts,
+        UserAccountListSerializer,
+        'accounts'
+    )
+
+
+# ============== BULK IMPORT VIEWS ==============
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, CanManageUsers])
+def bulk_import_view(request):
+    """
+    Create users and their accounts in bulk
+    Request:
+    {
+        "rows": [
+            {"user_id", "user_name", "user_full_name", "user_email", "user_status_id",
+             "account_id", "password", "account_role"}
+        ],
+        "all_or_nothing": false
+    }
+
+    Response:
+    {
+        "created_users", "created_accounts", "linked_accounts",
+        "errors": [{"row": 0, "errors": {"field": ["message"]}}]
+    }
+    """
+    serializer = BulkImportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'error': 'Invalid input',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    result = bulk_import(
+        serializer.validated_data['rows'],
+        created_by=request.user.id if hasattr(request, 'user') else 0,
+        all_or_nothing=serializer.validated_data['all_or_nothing'],
+    )
+    created = result.created_users or result.created_accounts
+    return Response(
+        result.as_dict(),
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    )